@@ -0,0 +1,41 @@
+"""add replay_snapshots table
+
+Revision ID: add_replay_snapshots_table
+Revises: add_wishlist_table
+Create Date: 2025-11-26
+
+To run this migration manually:
+  cd backend
+  uv run alembic upgrade head
+
+The migration will also run automatically when starting the backend via docker-compose.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "add_replay_snapshots_table"
+down_revision: Union[str, Sequence[str], None] = "add_wishlist_table"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "replay_snapshots",
+        sa.Column("tender_id", sa.String(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("event_count", sa.Integer(), nullable=False),
+        sa.Column("source_event_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("tender_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("replay_snapshots")
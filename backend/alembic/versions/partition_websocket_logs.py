@@ -0,0 +1,123 @@
+"""partition websocket_logs by month
+
+Revision ID: partition_websocket_logs
+Revises: add_replay_snapshots_table
+Create Date: 2025-11-27
+
+Rebuilds websocket_logs as a table partitioned by month on created_at:
+- primary key becomes (id, created_at), as Postgres requires the partition key in it
+- the two single-column tender_id indexes and the created_at index are replaced by
+  one composite (tender_id, created_at) index, which serves both the existence
+  check and the ordered replay query
+- one partition per month from the oldest row up to two months ahead, plus a
+  default partition as a safety net
+
+New monthly partitions and retention are handled at runtime by
+app/services/websocket_log_partitions.py.
+
+To run this migration manually:
+  cd backend
+  uv run alembic upgrade head
+
+The migration will also run automatically when starting the backend via docker-compose.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "partition_websocket_logs"
+down_revision: Union[str, Sequence[str], None] = "add_replay_snapshots_table"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE websocket_logs RENAME TO websocket_logs_unpartitioned")
+    op.execute("ALTER SEQUENCE websocket_logs_id_seq RENAME TO websocket_logs_unpartitioned_id_seq")
+    op.execute("DROP INDEX IF EXISTS ix_websocket_logs_tender_id")
+    op.execute("DROP INDEX IF EXISTS ix_websocket_logs_created_at")
+
+    op.execute(
+        """
+        CREATE TABLE websocket_logs (
+            id BIGSERIAL NOT NULL,
+            tender_id VARCHAR NOT NULL,
+            message_data JSONB NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute(
+        "CREATE INDEX ix_websocket_logs_tender_id_created_at "
+        "ON websocket_logs (tender_id, created_at)"
+    )
+
+    # Monthly partitions covering existing rows and the next two months
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month_start DATE;
+            last_month DATE := date_trunc('month', now() + interval '2 months')::date;
+        BEGIN
+            SELECT COALESCE(date_trunc('month', min(created_at)), date_trunc('month', now()))::date
+              INTO month_start
+              FROM websocket_logs_unpartitioned;
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF websocket_logs FOR VALUES FROM (%L) TO (%L)',
+                    'websocket_logs_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute("CREATE TABLE websocket_logs_default PARTITION OF websocket_logs DEFAULT")
+
+    op.execute(
+        """
+        INSERT INTO websocket_logs (id, tender_id, message_data, created_at)
+        SELECT id, tender_id, message_data, created_at FROM websocket_logs_unpartitioned
+        """
+    )
+    op.execute(
+        "SELECT setval('websocket_logs_id_seq', COALESCE((SELECT max(id) FROM websocket_logs), 0) + 1, false)"
+    )
+    op.execute("DROP TABLE websocket_logs_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE websocket_logs RENAME TO websocket_logs_partitioned")
+    op.execute("ALTER SEQUENCE websocket_logs_id_seq RENAME TO websocket_logs_partitioned_id_seq")
+    op.execute(
+        """
+        CREATE TABLE websocket_logs (
+            id SERIAL NOT NULL,
+            tender_id VARCHAR NOT NULL,
+            message_data JSONB NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO websocket_logs (id, tender_id, message_data, created_at)
+        SELECT id, tender_id, message_data, created_at FROM websocket_logs_partitioned
+        """
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('websocket_logs', 'id'), "
+        "COALESCE((SELECT max(id) FROM websocket_logs), 0) + 1, false)"
+    )
+    op.execute("DROP TABLE websocket_logs_partitioned")
+    op.create_index("ix_websocket_logs_created_at", "websocket_logs", ["created_at"], unique=False)
+    op.create_index("ix_websocket_logs_tender_id", "websocket_logs", ["tender_id"], unique=False)
@@ -2,23 +2,49 @@
 Fraud Detection Agent - Deep investigation of individual tenders for fraud indicators
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from typing_extensions import NotRequired
 
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentState
 from langchain.agents.structured_output import ToolStrategy
+from langchain.messages import HumanMessage, SystemMessage, ToolMessage
 
 from app.config import settings
+from app.utils.llm_cache import get_llm_cache
+from app.utils.llm_pool import PooledChatOpenAI
 from app.prompts import fraud_detection_agent
-from app.schemas import FraudDetectionInput, FraudDetectionOutput
+from app.schemas import FraudDetectionInput, FraudDetectionOutput, RankingInput
 from app.tools.get_plan import get_plan
 from app.tools.read_buyer_attachments_table import read_buyer_attachments_table
 from app.tools.read_buyer_attachment_doc import read_buyer_attachment_doc
 from app.tools.read_award_result import read_award_result
 from app.tools.read_award_result_attachment_doc import read_award_result_attachment_doc
-from app.middleware import WebSocketStreamingMiddleware
+from app.tools.search_tender_documents import search_tender_documents
+from app.middleware import (
+    WebSocketStreamingMiddleware,
+    BudgetGovernorMiddleware,
+    CancellationMiddleware,
+    EvidenceStoreMiddleware,
+    PromptCachingMiddleware,
+    ToolOutputGovernorMiddleware,
+    HistoryCompactionMiddleware,
+    ToolConcurrencyMiddleware,
+    TerminationPolicyMiddleware,
+    supports_cache_control,
+)
+from app.utils.investigation_budget import (
+    InvestigationBudget,
+    CancellationToken,
+    InvestigationCancelledError,
+)
+from app.utils.evidence_store import EvidenceStore
+from app.utils.evidence_prefetch import format_document_inventory
+from app.utils.tool_output_governor import ToolOutputGovernor
+from app.utils.tool_concurrency import get_tool_limiter
+from app.utils.termination_policy import TerminationPolicy
+from app.utils.partial_salvage import build_evidence_transcript
+from app.utils.task_plans import build_task_plan, get_task_plan
 
 
 # Custom state schema para pasar session_id y task_info al middleware
@@ -61,6 +87,11 @@ class FraudDetectionAgent:
         temperature: float = 0.7,
         max_iterations: int = None,
         max_execution_time: int = None,
+        budget: InvestigationBudget = None,
+        cancellation: CancellationToken = None,
+        tender_prompt: str = None,
+        evidence: EvidenceStore = None,
+        subtasks: List[str] = None,
     ):
         """
         Initialize the Fraud Detection Agent.
@@ -70,36 +101,72 @@ class FraudDetectionAgent:
             temperature: Temperature for model responses (0.0-1.0)
             max_iterations: Maximum number of tool calls allowed (default from config)
             max_execution_time: Maximum execution time in seconds (default from config)
+            budget: Optional budget shared with the other agents of the same investigation
+            cancellation: Optional token that aborts the agent at its next step when cancelled
+            tender_prompt: Optional tender context shared by all agents of the investigation
+                (see build_tender_prompt), appended to the system prompt
+            evidence: Optional tool result store shared with the other agents of the same investigation
+            subtasks: Optional subtasks of the task; the agent is asked to finish once all have
+                recorded evidence (see TerminationPolicy)
         """
         self.model_name = model_name
         self.temperature = temperature
         self.max_iterations = max_iterations or settings.fraud_detection_max_iterations
         self.max_execution_time = max_execution_time or settings.fraud_detection_max_execution_time
+        self.budget = budget
 
         # Initialize model
-        model = ChatOpenAI(
+        model = PooledChatOpenAI(
             model=model_name,
             temperature=temperature,
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.openrouter_api_key,
+            cache=get_llm_cache(temperature),
         )
+        self.model = model
 
         # Define comprehensive investigation tools
         tools = [
             get_plan,
             read_buyer_attachments_table,
             read_buyer_attachment_doc,
+            search_tender_documents,
             read_award_result,
             read_award_result_attachment_doc,
         ]
 
+        middleware = [WebSocketStreamingMiddleware()]
+        if settings.tool_output_governor_enabled:
+            middleware.append(ToolOutputGovernorMiddleware(ToolOutputGovernor()))
+        if settings.history_compaction_enabled:
+            middleware.append(HistoryCompactionMiddleware())
+        self.termination_policy = None
+        if settings.termination_policy_enabled:
+            self.termination_policy = TerminationPolicy(
+                subtasks,
+                max_steps_without_evidence=settings.termination_max_steps_without_evidence,
+            )
+            middleware.append(TerminationPolicyMiddleware(self.termination_policy))
+        if evidence is not None:
+            middleware.append(EvidenceStoreMiddleware(evidence))
+        if budget is not None:
+            middleware.append(BudgetGovernorMiddleware(budget))
+        if cancellation is not None:
+            middleware.append(CancellationMiddleware(cancellation))
+        middleware.append(ToolConcurrencyMiddleware(get_tool_limiter()))
+
+        # Identical for every agent of the investigation, so providers can cache it
+        self.system_prompt = self.build_system_prompt() + (tender_prompt or "")
+        if settings.prompt_caching_enabled and supports_cache_control(model_name):
+            middleware.append(PromptCachingMiddleware(self.system_prompt))
+
         # Create fraud detection agent with structured output and middleware
         self.agent = create_agent(
             model=model,
             tools=tools,
-            system_prompt=fraud_detection_agent.SYS_PROMPT,
+            system_prompt=self.system_prompt,
             response_format=ToolStrategy(FraudDetectionOutput),
-            middleware=[WebSocketStreamingMiddleware()],
+            middleware=middleware,
             state_schema=FraudAgentState,
         )
 
@@ -138,8 +205,8 @@ class FraudDetectionAgent:
             ...     for anomaly in result.anomalies:
             ...         print(f"- {anomaly.anomaly_name}: {anomaly.description}")
         """
-        # Format the investigation request
-        message = f"""Conduct deep fraud investigation for tender:
+        # Format the investigation request (the tender context may already be in the system prompt)
+        message = input_data.task_prompt or f"""Conduct deep fraud investigation for tender:
 
 TENDER ID: {input_data.tender_id}
 
@@ -172,10 +239,15 @@ Investigate systematically and return detailed anomalies with evidence.
         config = {
             "recursion_limit": self.max_iterations,
             "max_execution_time": self.max_execution_time,
+            # Tool calls of one step run concurrently, up to this many at a time
+            "max_concurrency": settings.agent_parallel_tool_calls,
         }
 
+        # Stream the state so the evidence gathered is still available if the limit is hit
+        result = state
         try:
-            result = self.agent.invoke(state, config=config)
+            for result in self.agent.stream(state, config=config, stream_mode="values"):
+                pass
 
             # Return the structured response
             if "structured_response" not in result:
@@ -192,12 +264,15 @@ Investigate systematically and return detailed anomalies with evidence.
             if hasattr(output, "total_iterations"):
                 # Count actual iterations from messages
                 # Messages are LangChain objects, not dicts - use hasattr/getattr
-                from langchain_core.messages import ToolMessage
                 messages = result.get("messages", [])
                 output.total_iterations = len([m for m in messages if isinstance(m, ToolMessage)])
 
             return output
 
+        except InvestigationCancelledError:
+            # Cancelled or past its deadline - let the caller build the partial result
+            raise
+
         except Exception as e:
             # Check if this is a recursion limit error
             error_str = str(e).lower()
@@ -205,8 +280,21 @@ Investigate systematically and return detailed anomalies with evidence.
 
             if is_limit_error:
                 print(f"⚠️  Investigation hit iteration limit ({self.max_iterations}) for tender {input_data.tender_id}")
+                messages = result.get("messages", [])
+                iterations = len([m for m in messages if isinstance(m, ToolMessage)])
+
+                # Salvage findings from the evidence gathered so far
+                salvaged = self._salvage_partial_result(input_data, message, messages)
+                if salvaged is not None:
+                    salvaged.iteration_limit_reached = True
+                    salvaged.total_iterations = iterations
+                    salvaged.investigation_summary = (
+                        f"Investigation incomplete - reached maximum iteration limit ({self.max_iterations}). "
+                        f"Findings are based on the evidence gathered before the limit. "
+                        f"{salvaged.investigation_summary}"
+                    )
+                    return salvaged
 
-                # Try to extract partial results from the agent state
                 partial_summary = f"Investigation incomplete - reached maximum iteration limit ({self.max_iterations} tool calls). "
                 partial_summary += "Results shown are based on partial analysis. Consider reviewing this tender manually."
 
@@ -217,12 +305,152 @@ Investigate systematically and return detailed anomalies with evidence.
                     anomalies=[],  # No anomalies since investigation incomplete
                     investigation_summary=partial_summary,
                     iteration_limit_reached=True,
-                    total_iterations=self.max_iterations,
+                    total_iterations=iterations,
                 )
             else:
                 # Re-raise other errors
                 raise
 
+    def _salvage_partial_result(
+        self,
+        input_data: FraudDetectionInput,
+        task_message: str,
+        messages: List[Any],
+    ) -> Optional[FraudDetectionOutput]:
+        """
+        Produce a structured result from the evidence of a run that hit its iteration limit.
+
+        Makes one structured-output call without tools over a condensed
+        transcript of the agent's messages (see build_evidence_transcript).
+
+        Args:
+            input_data: Investigation input
+            task_message: Task message the agent was given
+            messages: Agent messages at the time of the limit
+
+        Returns:
+            FraudDetectionOutput, or None if salvage is disabled, there is no evidence or the call fails
+        """
+        if not settings.salvage_enabled or not any(isinstance(m, ToolMessage) for m in messages):
+            return None
+
+        transcript = build_evidence_transcript(
+            messages,
+            max_chars=settings.salvage_max_transcript_chars,
+            subtask_results=self.termination_policy.results if self.termination_policy else None,
+        )
+        prompt = fraud_detection_agent.SALVAGE_PROMPT.format(
+            task_prompt=task_message,
+            tender_id=input_data.tender_id,
+            transcript=transcript,
+        )
+        try:
+            model = self.model.with_structured_output(
+                FraudDetectionOutput, method="function_calling", include_raw=True
+            )
+            response = model.invoke([
+                SystemMessage(content=self.system_prompt),
+                HumanMessage(content=prompt),
+            ])
+        except Exception as e:
+            print(f"⚠️  Partial result salvage failed for tender {input_data.tender_id}: {e}")
+            return None
+
+        usage = getattr(response["raw"], "usage_metadata", None)
+        if self.budget is not None and usage:
+            self.budget.charge_tokens(usage.get("total_tokens", 0))
+        output = response["parsed"]
+        if output is None:
+            print(f"⚠️  Partial result salvage returned no parsable output: {response['parsing_error']}")
+            return None
+        print(f"Salvaged {len(output.anomalies)} anomalies from partial investigation of {input_data.tender_id}")
+        return output
+
+    @staticmethod
+    def build_system_prompt() -> str:
+        """
+        Build the system prompt, advertising only the tools registered with the current settings.
+
+        Returns:
+            str: System prompt (without the tender context)
+        """
+        prompts = fraud_detection_agent
+        record_subtasks = settings.termination_policy_enabled
+        optional_tools = [prompts.RECORD_SUBTASK_TOOL_PROMPT] if record_subtasks else []
+        if settings.tool_output_governor_enabled:
+            optional_tools.append(prompts.READ_TOOL_OUTPUT_PROMPT)
+        if settings.history_compaction_enabled:
+            optional_tools.append(prompts.EXPAND_TOOL_OUTPUT_PROMPT)
+        return prompts.SYS_PROMPT.format(
+            optional_tools="".join(
+                tool.format(number=number) for number, tool in enumerate(optional_tools, start=7)
+            ),
+            record_step=prompts.RECORD_SUBTASK_STEP_PROMPT if record_subtasks else "",
+            record_reminder=prompts.RECORD_SUBTASK_REMINDER_PROMPT if record_subtasks else "",
+        )
+
+    @staticmethod
+    def build_tender_prompt(
+        tender_context: RankingInput,
+        tender_documents: List[Dict[str, Any]],
+        document_inventory: List[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Build the tender context shared by all task agents of one investigation.
+
+        Assembled once per investigation and passed as tender_prompt, so the
+        system prompt is byte-identical across the parallel branches.
+
+        Args:
+            tender_context: RankingInput with the tender metadata and bases
+            tender_documents: Extracted tender documents
+            document_inventory: Optional prefetched attachments (row ids, types, pages),
+                listed instead of the extracted documents when available
+
+        Returns:
+            str: Tender context section of the system prompt
+        """
+        if document_inventory:
+            documents = format_document_inventory(document_inventory)
+        else:
+            documents = "\n".join(
+                f"- {doc.get('name', 'Unknown')}" for doc in tender_documents
+            )
+        return fraud_detection_agent.TENDER_CONTEXT_PROMPT.format(
+            tender_id=tender_context.tender_id,
+            tender_name=tender_context.tender_name,
+            organization=tender_context.additional_context.get("organization", "Unknown"),
+            documents=documents or "- No documents available",
+            bases=tender_context.bases[:1000],
+        )
+
+    @staticmethod
+    def build_task_prompt(task: Dict[str, Any]) -> str:
+        """
+        Build the per-task user message for an investigation task.
+
+        Args:
+            task: Investigation task (as in INVESTIGATION_TASKS)
+
+        Returns:
+            str: Task instructions
+        """
+        return fraud_detection_agent.TASK_PROMPT.format(
+            task_id=task.get("id", 0),
+            task_code=task.get("code", "Unknown"),
+            task_name=task.get("name", "Unknown task"),
+            task_desc=task.get("desc", "No description"),
+            task_where=task.get("where_to_look", "Not specified"),
+            task_severity=task.get("severity", "Unknown"),
+            subtasks="\n".join(
+                f"{i + 1}. {subtask}" for i, subtask in enumerate(task.get("subtasks", []))
+            ),
+            plan="\n".join(
+                f"{i + 1}. {step}"
+                for i, step in enumerate(get_task_plan(task.get("code")) or build_task_plan(task))
+            ),
+        )
+
     def _format_context(self, context: Dict[str, Any]) -> str:
         """
         Format the context dictionary for readable presentation.
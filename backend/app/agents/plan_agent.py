@@ -5,11 +5,12 @@ Plan Agent - Generates structured task plans from user requests using LangChain
 from typing import List
 
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 from langchain.agents.structured_output import ToolStrategy
 
 from app.config import settings
+from app.utils.llm_cache import get_llm_cache
+from app.utils.llm_pool import PooledChatOpenAI
 from app.prompts import plan_agent
 
 
@@ -50,11 +51,12 @@ class PlanAgent:
         self.temperature = temperature
 
         # Initialize model
-        model = ChatOpenAI(
+        model = PooledChatOpenAI(
             model=model_name,
             temperature=temperature,
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.openrouter_api_key,
+            cache=get_llm_cache(temperature),
         )
 
         # Create agent with structured output using ProviderStrategy
@@ -5,12 +5,13 @@ Ranking Agent - Ranks procurement tenders by fraud risk indicators
 from typing import Dict, Any
 from typing_extensions import NotRequired
 
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentState
 from langchain.agents.structured_output import ToolStrategy
 
 from app.config import settings
+from app.utils.llm_cache import get_llm_cache
+from app.utils.llm_pool import PooledChatOpenAI
 from app.prompts import ranking_agent
 from app.schemas import RankingInput, RankingOutput, TaskClassificationOutput
 from app.tools.read_buyer_attachments_table import read_buyer_attachments_table
@@ -70,11 +71,12 @@ class RankingAgent:
         self.max_iterations = max_iterations or settings.ranking_max_iterations
 
         # Initialize model
-        model = ChatOpenAI(
+        model = PooledChatOpenAI(
             model=model_name,
             temperature=temperature,
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.openrouter_api_key,
+            cache=get_llm_cache(temperature),
         )
 
         # Define tools for risk assessment
@@ -6,12 +6,13 @@ from typing import List, Dict, Any
 from typing_extensions import NotRequired
 import json
 
-from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentState
 from langchain.agents.structured_output import ToolStrategy
 
 from app.config import settings
+from app.utils.llm_cache import get_llm_cache
+from app.utils.llm_pool import PooledChatOpenAI
 from app.prompts import summary_agent
 from app.schemas import TaskInvestigationOutput, SummaryOutput
 from app.middleware import WebSocketStreamingMiddleware
@@ -63,11 +64,12 @@ class SummaryAgent:
         self.temperature = temperature
 
         # Initialize model
-        model = ChatOpenAI(
+        model = PooledChatOpenAI(
             model=model_name,
             temperature=temperature,
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.openrouter_api_key,
+            cache=get_llm_cache(temperature),
         )
 
         # Create summary agent with NO tools (only analyzes provided data)
@@ -5,15 +5,16 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
-import asyncio
-import time
 import logging
-from datetime import datetime
 
-from app.workflow import FraudDetectionWorkflow
+from app.workflow import FraudDetectionWorkflow, serialize_task_result
 from app.utils.websocket_manager import manager
-from app.services.websocket_log_service import get_websocket_messages, has_websocket_messages
+from app.services.websocket_log_service import delete_websocket_messages, has_websocket_messages, log_writer
+from app.services.replay_service import start_replay
+from app.services.session_control_service import send_control
+from app.services.replay_snapshot_service import build_replay_snapshot, has_replay_snapshot
 from app.config import settings
+from app.database import pool_stats
 
 logger = logging.getLogger(__name__)
 
@@ -39,82 +40,21 @@ class InvestigationResponse(BaseModel):
     message: str = Field(..., description="Status message")
 
 
-def replay_websocket_messages(session_id: str, tender_id: str, replay_speed: float):
-    """
-    Replay saved websocket messages for a tender_id, simulating the original execution.
-    
-    This function reads all saved messages from the database and sends them through
-    the websocket with timing scaled by replay_speed.
+class ReplaySeekRequest(BaseModel):
+    """Request body for seeking within a replay"""
+    position: int = Field(..., ge=0, description="Index of the saved message to continue the replay from")
 
-    Args:
-        session_id: The session ID for WebSocket communication
-        tender_id: The tender ID to replay messages for
-        replay_speed: Speed multiplier (e.g., 4.0 means 4x faster)
-    """
-    try:
-        # Register tender_id for this session in replay mode (so messages aren't saved again during replay)
-        manager.register_tender_id(session_id, tender_id, is_replay=True)
-        
-        # Get all messages for this tender_id
-        messages = get_websocket_messages(tender_id)
-        
-        if not messages:
-            logger.warning(f"No messages found for tender {tender_id}")
-            asyncio.run(manager.send_observation(session_id, {
-                "type": "error",
-                "message": "No saved messages found for replay",
-                "status": "error"
-            }))
-            return
-        
-        logger.info(f"Replaying {len(messages)} messages for tender {tender_id} at {replay_speed}x speed")
-        
-        # Send first message immediately
-        first_message = messages[0]
-        # Remove the _db_timestamp we added
-        first_message_clean = {k: v for k, v in first_message.items() if k != '_db_timestamp'}
-        asyncio.run(manager.send_observation(session_id, first_message_clean))
-        
-        # Process remaining messages with timing
-        for i in range(1, len(messages)):
-            current_msg = messages[i]
-            previous_msg = messages[i - 1]
-            
-            # Get timestamps
-            current_timestamp = current_msg.get('_db_timestamp') or current_msg.get('timestamp')
-            previous_timestamp = previous_msg.get('_db_timestamp') or previous_msg.get('timestamp')
-            
-            # Calculate sleep duration
-            if current_timestamp and previous_timestamp:
-                try:
-                    current_dt = datetime.fromisoformat(current_timestamp.replace('Z', '+00:00'))
-                    previous_dt = datetime.fromisoformat(previous_timestamp.replace('Z', '+00:00'))
-                    time_diff = (current_dt - previous_dt).total_seconds()
-                    sleep_duration = max(0, time_diff / replay_speed)
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Error parsing timestamps, using default delay: {e}")
-                    sleep_duration = 0.1 / replay_speed  # Default 100ms scaled
-            else:
-                # Fallback: use a small default delay
-                sleep_duration = 0.1 / replay_speed
-            
-            # Sleep to simulate timing
-            if sleep_duration > 0:
-                time.sleep(sleep_duration)
-            
-            # Send message (remove _db_timestamp)
-            message_clean = {k: v for k, v in current_msg.items() if k != '_db_timestamp'}
-            asyncio.run(manager.send_observation(session_id, message_clean))
-        
-        logger.info(f"Replay completed for tender {tender_id}")
-        
-    except Exception as e:
-        logger.error(f"Error replaying messages for tender {tender_id}: {e}", exc_info=True)
-        asyncio.run(manager.send_observation(session_id, {
-            "type": "error",
-            "message": f"Replay failed: {str(e)}",
-            "status": "error"
-        }))
+
+class ReplayControlResponse(BaseModel):
+    """Response from controlling a replay"""
+    session_id: str = Field(..., description="Session ID of the replay")
+    message: str = Field(..., description="Status message")
+
+
+class CancelInvestigationResponse(BaseModel):
+    """Response from cancelling an investigation"""
+    session_id: str = Field(..., description="Session ID of the cancelled investigation")
+    message: str = Field(..., description="Status message")
 
 
 def run_workflow_sync(session_id: str, tender_id: str):
@@ -128,6 +68,8 @@ def run_workflow_sync(session_id: str, tender_id: str):
         session_id: The session ID for WebSocket communication
         tender_id: The tender ID to investigate
     """
+    finished = False
+    cancelled = False
     try:
         # Register tender_id for message logging
         manager.register_tender_id(session_id, tender_id)
@@ -139,33 +81,38 @@ def run_workflow_sync(session_id: str, tender_id: str):
         result = workflow.run(tender_id=tender_id, session_id=session_id)
 
         # Send final result via WebSocket
-        asyncio.run(manager.send_observation(session_id, {
+        cancelled = bool(result.get("budget_usage", {}).get("cancelled"))
+        manager.publish(session_id, {
             "type": "result",
-            "message": "Investigation completed",
-            "tasks_by_id": [
-                {
-                    "task_id": task.task_id,
-                    "task_code": task.task_code,
-                    "task_name": task.task_name,
-                    "validation_passed": task.validation_passed,
-                    "findings_count": len(task.findings),
-                    "investigation_summary": task.investigation_summary
-                }
-                for task in result["tasks_by_id"]
-            ],
+            "message": "Investigation cancelled" if cancelled else "Investigation completed",
+            "tasks_by_id": [serialize_task_result(task) for task in result["tasks_by_id"]],
             "workflow_summary": result["workflow_summary"],
-            "status": "completed"
-        }))
+            "budget_usage": result.get("budget_usage", {}),
+            "status": "cancelled" if cancelled else "completed"
+        })
+        finished = True
 
     except Exception as e:
         logger.error(f"Error in investigation {session_id}: {e}", exc_info=True)
 
         # Send error to client
-        asyncio.run(manager.send_observation(session_id, {
+        manager.publish(session_id, {
             "type": "error",
             "message": f"Investigation failed: {str(e)}",
             "status": "error"
-        }))
+        })
+
+    finally:
+        # Persist any buffered log rows so the investigation can be replayed right away
+        flushed = log_writer.flush()
+        if not flushed:
+            logger.warning(f"Timed out flushing websocket logs for investigation {session_id}")
+        if cancelled:
+            # A cancelled run is partial: drop its log so the next request investigates again
+            delete_websocket_messages(tender_id)
+        elif finished and flushed:
+            # Compact the log so later replays are served from a single snapshot
+            build_replay_snapshot(tender_id)
 
 
 @router.post("/investigate", response_model=InvestigationResponse)
@@ -204,16 +151,11 @@ async def start_investigation(
     # Generate session ID if not provided
     session_id = request.session_id or str(uuid.uuid4())
 
-    # Check if messages exist for this tender_id
-    if has_websocket_messages(request.tender_id):
+    # Check if messages (or a compacted replay of them) exist for this tender_id
+    if await has_replay_snapshot(request.tender_id) or await has_websocket_messages(request.tender_id):
         # Replay existing messages instead of running workflow
         logger.info(f"Found existing messages for tender {request.tender_id}, starting replay")
-        background_tasks.add_task(
-            replay_websocket_messages, 
-            session_id, 
-            request.tender_id, 
-            settings.websocket_replay_speed
-        )
+        start_replay(session_id, request.tender_id, settings.websocket_replay_speed)
         return InvestigationResponse(
             session_id=session_id,
             message=f"Replay started. Connect to WebSocket at /ws/{session_id} for real-time updates."
@@ -228,7 +170,100 @@ async def start_investigation(
         )
 
 
+@router.post("/investigate/{session_id}/cancel", response_model=CancelInvestigationResponse)
+async def cancel_investigation_endpoint(session_id: str):
+    """
+    Cancel a running investigation and free its capacity.
+
+    Running task agents stop at their next step, branches that are still in
+    progress return partial results marked as cancelled, and the summary step
+    is skipped. The final result is still sent via WebSocket with status "cancelled".
+
+    With several workers, the request is forwarded over the websocket backplane
+    to the worker running the investigation.
+
+    Args:
+        session_id: Session ID returned by POST /investigate
+
+    Example:
+        POST /api/investigate/abc-123-def/cancel
+
+        Response:
+        {
+            "session_id": "abc-123-def",
+            "message": "Cancellation requested. Running agents will stop at their next step."
+        }
+    """
+    if not await send_control(session_id, {"action": "cancel"}):
+        raise HTTPException(status_code=404, detail=f"No running investigation for session {session_id}")
+
+    logger.info(f"Cancellation requested for investigation {session_id}")
+    return CancelInvestigationResponse(
+        session_id=session_id,
+        message="Cancellation requested. Running agents will stop at their next step."
+    )
+
+
+@router.post("/replay/{session_id}/seek", response_model=ReplayControlResponse)
+async def seek_replay(session_id: str, request: ReplaySeekRequest):
+    """
+    Continue a running replay from a given message index.
+
+    Args:
+        session_id: Session ID returned by POST /investigate
+        request: Seek request containing the message position
+
+    Example:
+        POST /api/replay/abc-123-def/seek
+        {"position": 120}
+    """
+    if not await send_control(session_id, {"action": "seek", "position": request.position}):
+        raise HTTPException(status_code=404, detail=f"No running replay for session {session_id}")
+
+    return ReplayControlResponse(
+        session_id=session_id,
+        message=f"Replay continuing from message {request.position}."
+    )
+
+
+@router.post("/replay/{session_id}/skip", response_model=ReplayControlResponse)
+async def skip_replay(session_id: str):
+    """
+    Skip to the end of a running replay and send the final result immediately.
+
+    Args:
+        session_id: Session ID returned by POST /investigate
+
+    Example:
+        POST /api/replay/abc-123-def/skip
+    """
+    if not await send_control(session_id, {"action": "skip"}):
+        raise HTTPException(status_code=404, detail=f"No running replay for session {session_id}")
+
+    return ReplayControlResponse(
+        session_id=session_id,
+        message="Skipping to the final result."
+    )
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for the agent API"""
     return {"status": "ok", "service": "agent-api"}
+
+
+@router.get("/metrics/database")
+async def database_metrics():
+    """
+    Connection pool statistics for the sync and async database engines.
+
+    Example:
+        GET /api/metrics/database
+
+        Response:
+        {
+            "sync": {"size": 10, "checked_out": 3, "checked_in": 7, "overflow": -7, "max_overflow": 20},
+            "async": {...}
+        }
+    """
+    return pool_stats()
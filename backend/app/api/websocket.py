@@ -1,8 +1,12 @@
 """
-WebSocket API endpoints for real-time agent observations
+Real-time event stream endpoints for agent observations (WebSocket, SSE and long-poll)
 """
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Header, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from app.utils.websocket_manager import manager
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,17 +14,24 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# Seconds between SSE keep-alive comments
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+
 @router.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
+async def websocket_endpoint(websocket: WebSocket, session_id: str, last_event_id: Optional[int] = None):
     """
     WebSocket endpoint for receiving real-time agent observations.
 
     Clients connect with a session_id and receive observations for that session.
-    Multiple clients can connect to the same session.
+    Multiple clients can connect to the same session. Every observation carries an
+    event_id; reconnecting clients pass the last one they saw as ?last_event_id=N
+    and first receive the events they missed.
 
     Args:
         websocket: The WebSocket connection
         session_id: Unique identifier for the agent workflow session
+        last_event_id: Last event_id received before reconnecting (optional)
 
     Example usage from frontend:
         const ws = new WebSocket('ws://localhost:8000/api/ws/my-session-id');
@@ -29,7 +40,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             console.log('Received observation:', observation);
         };
     """
-    await manager.connect(websocket, session_id)
+    await manager.connect(websocket, session_id, last_event_id)
 
     try:
         # Keep connection alive and handle incoming messages if needed
@@ -46,3 +57,89 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     except Exception as e:
         logger.error(f"WebSocket error in session {session_id}: {e}")
         manager.disconnect(websocket, session_id)
+
+
+def _format_sse(event: dict) -> str:
+    """Format an observation as a Server-Sent Event"""
+    lines = []
+    if "event_id" in event:
+        lines.append(f"id: {event['event_id']}")
+    lines.append(f"data: {json.dumps(event, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/events/{session_id}")
+async def sse_endpoint(
+    session_id: str,
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    last_event_id: Optional[int] = Query(None),
+):
+    """
+    Server-Sent Events stream of real-time agent observations.
+
+    Same events as the WebSocket endpoint. Browsers' EventSource reconnects on its
+    own and sends the Last-Event-ID header, so missed events are resumed from the
+    session buffer.
+
+    Args:
+        session_id: Unique identifier for the agent workflow session
+        last_event_id_header: Last-Event-ID header sent by EventSource on reconnect
+        last_event_id: Same as the header, for clients that cannot set headers
+
+    Example usage from frontend:
+        const events = new EventSource('http://localhost:8000/api/events/my-session-id');
+        events.onmessage = (event) => console.log(JSON.parse(event.data));
+    """
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    channel = manager.subscribe(session_id, resume_from)
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(channel.next_event(), timeout=SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if "_text" in event:
+                    continue
+                yield _format_sse(event)
+        finally:
+            manager.unsubscribe(channel, session_id)
+            logger.info(f"SSE client disconnected from session {session_id}")
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events/{session_id}/poll")
+async def long_poll_endpoint(
+    session_id: str,
+    last_event_id: Optional[int] = Query(None),
+    timeout: float = Query(25.0, ge=0, le=60),
+):
+    """
+    Long-poll for real-time agent observations.
+
+    Returns immediately with the events after last_event_id if there are any,
+    otherwise waits up to timeout seconds for new ones.
+
+    Args:
+        session_id: Unique identifier for the agent workflow session
+        last_event_id: Last event_id received (omit to get all buffered events)
+        timeout: Maximum seconds to wait for new events
+
+    Example:
+        GET /api/events/abc-123-def/poll?last_event_id=41
+
+        Response:
+        {"events": [{"event_id": 42, "type": "log", ...}], "last_event_id": 42}
+    """
+    events = await manager.wait_for_events(session_id, last_event_id, timeout)
+    return {
+        "events": events,
+        "last_event_id": events[-1]["event_id"] if events else last_event_id,
+    }
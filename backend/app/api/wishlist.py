@@ -2,13 +2,14 @@
 Wishlist API endpoints
 """
 from fastapi import APIRouter, HTTPException, Depends, Header
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 import logging
 import httpx
 from typing import List
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Wishlist
 from app.schemas import WishlistCreate, WishlistResponse
 from app.config import settings
@@ -69,7 +70,7 @@ async def send_discord_notification(email: str, reason: str):
 @router.post("/wishlist", response_model=WishlistResponse, status_code=201)
 async def create_wishlist_entry(
     wishlist_data: WishlistCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new wishlist entry.
@@ -92,8 +93,8 @@ async def create_wishlist_entry(
         )
 
         db.add(db_wishlist)
-        db.commit()
-        db.refresh(db_wishlist)
+        await db.commit()
+        await db.refresh(db_wishlist)
 
         logger.info(f"Wishlist entry created for email: {wishlist_data.email}")
 
@@ -103,14 +104,14 @@ async def create_wishlist_entry(
         return db_wishlist
 
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         logger.warning(f"Duplicate wishlist entry attempted for email: {wishlist_data.email}")
         raise HTTPException(
             status_code=409,
             detail="Este correo electrónico ya está registrado en la lista de espera"
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating wishlist entry: {str(e)}")
         raise HTTPException(
             status_code=500,
@@ -119,9 +120,9 @@ async def create_wishlist_entry(
 
 
 @router.get("/wishlist", response_model=List[WishlistResponse])
-def list_wishlist_entries(
+async def list_wishlist_entries(
     x_api_key: str = Header(..., alias="X-API-Key"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List all wishlist entries. Protected by API key.
@@ -146,7 +147,9 @@ def list_wishlist_entries(
 
     try:
         # Fetch all wishlist entries ordered by creation date (newest first)
-        wishlist_entries = db.query(Wishlist).order_by(Wishlist.created_at.desc()).all()
+        wishlist_entries = (await db.execute(
+            select(Wishlist).order_by(Wishlist.created_at.desc())
+        )).scalars().all()
         logger.info(f"Retrieved {len(wishlist_entries)} wishlist entries")
         return wishlist_entries
 
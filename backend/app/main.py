@@ -1,9 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import agent, websocket, wishlist
+from app.database import async_engine
+from app.services.websocket_log_service import log_writer
+from app.services.websocket_log_partitions import run_partition_maintenance
+from app.services.session_control_service import apply_control
+from app.utils.websocket_manager import manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Events published from worker threads are delivered on this loop
+    manager.bind_loop(asyncio.get_running_loop())
+    # Keep monthly websocket log partitions ahead of time and apply retention
+    maintenance = asyncio.create_task(run_partition_maintenance())
+    # Receive events published by other workers for clients connected here,
+    # and control commands for the investigations and replays running here
+    if manager.backplane is not None:
+        await manager.backplane.start(manager.deliver_remote, apply_control)
+    yield
+    maintenance.cancel()
+    if manager.backplane is not None:
+        await manager.backplane.stop()
+    # Write any buffered websocket log rows before the process exits
+    log_writer.flush(timeout=10.0)
+    await async_engine.dispose()
+
 
-app = FastAPI(title="Procurement Fraud Investigation API")
+app = FastAPI(title="Procurement Fraud Investigation API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
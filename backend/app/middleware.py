@@ -7,20 +7,27 @@ when agents are executing, including:
 - Before/after executing tools
 """
 
-import asyncio
 import json
-import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable
+from typing import Annotated, Any, Callable
 
-from langchain.agents.middleware import AgentMiddleware, AgentState
-from langchain.messages import ToolMessage
+from langchain.agents.middleware import AgentMiddleware, AgentState, ModelRequest, ModelResponse
+from langchain.messages import SystemMessage, ToolMessage
+from langchain.tools import InjectedState, tool
 from langchain.tools.tool_node import ToolCallRequest
 from langgraph.runtime import Runtime
 from langgraph.types import Command
+from pydantic import BaseModel, Field
 
+from app.config import settings
 from app.utils.websocket_manager import manager
+from app.utils.investigation_budget import CancellationToken
+from app.utils.evidence_store import EvidenceStore, evidence_key, is_storable_evidence
+from app.utils.tool_output_governor import ToolOutputGovernor
+from app.utils.tool_concurrency import ToolConcurrencyLimiter
+from app.utils.termination_policy import TerminationPolicy
+from app.utils.history_compaction import compact_messages, find_tool_output
 
 TASK_MAP_PATH = Path(__file__).parent / "task_map.json"
 with open(TASK_MAP_PATH, "r", encoding="utf-8") as f:
@@ -29,31 +36,10 @@ with open(TASK_MAP_PATH, "r", encoding="utf-8") as f:
 
 def send_ws_event_sync(session_id: str, event: dict):
     """
-    Helper function to send WebSocket events synchronously from sync context.
-    Creates a new event loop in a thread if needed.
+    Helper function to send WebSocket events from the agent's (sync) thread.
+    Publishes to the connection manager's event bus, which delivers on the server loop.
     """
-    try:
-        # Try to get the current event loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If loop is running, create a new thread to send the event
-            def send_in_thread():
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                new_loop.run_until_complete(manager.send_observation(session_id, event))
-                new_loop.close()
-
-            thread = threading.Thread(target=send_in_thread)
-            thread.start()
-        else:
-            # If no loop is running, we can use run_until_complete
-            loop.run_until_complete(manager.send_observation(session_id, event))
-    except RuntimeError:
-        # No event loop, create one
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(manager.send_observation(session_id, event))
-        loop.close()
+    manager.publish(session_id, event)
 
 
 class WebSocketStreamingMiddleware(AgentMiddleware):
@@ -75,6 +61,10 @@ class WebSocketStreamingMiddleware(AgentMiddleware):
     TOOL_MESSAGES = {
         "read_buyer_attachments_table": "Consultando documentos del tender...",
         "read_buyer_attachment_doc": "Leyendo contenido del documento...",
+        "search_tender_documents": "Buscando en los documentos del tender...",
+        "read_tool_output": "Leyendo resultado completo del tool...",
+        "expand_tool_output": "Recuperando resultado anterior...",
+        "record_subtask_result": "Registrando resultado de subtarea...",
         "read_award_result": "Verificando resultado de adjudicación...",
         "read_award_result_attachment_doc": "Analizando documentos de adjudicación...",
         "get_plan": "Generando plan de investigación...",
@@ -275,3 +265,527 @@ class WebSocketStreamingMiddleware(AgentMiddleware):
                 traceback.print_exc()
 
         return result
+
+
+# Tools whose results report pages newly sent to the OCR API ("ocr_new_pages")
+OCR_TOOLS = {"read_buyer_attachment_doc", "read_award_result_attachment_doc"}
+
+BUDGET_EXHAUSTED_PROMPT = """
+
+## BUDGET EXHAUSTED
+
+The resource budget for this investigation has been exhausted ({reason}).
+Do NOT call any more investigation tools. Return your structured response NOW,
+based only on the evidence you have already gathered. Mention in the summary
+that the investigation was cut short by the budget.
+"""
+
+
+def _ocr_pages_from_result(result: ToolMessage | Command) -> int:
+    """Extract the number of newly OCR'd pages from a tool result (0 if unknown)"""
+    if not isinstance(result, ToolMessage):
+        return 0
+    try:
+        data = json.loads(result.content) if isinstance(result.content, str) else {}
+        return int(data.get("ocr_new_pages", 0) or 0)
+    except (ValueError, TypeError, AttributeError):
+        return 0
+
+
+class BudgetGovernorMiddleware(AgentMiddleware):
+    """
+    Middleware that enforces a shared InvestigationBudget on an agent.
+
+    All parallel task agents of one workflow run share the same budget. This
+    middleware implements two hooks:
+    1. wrap_model_call: Charges tokens and, once the budget is exhausted, removes
+       the investigation tools so the model can only return its structured output
+    2. wrap_tool_call: Charges outbound requests and OCR pages, and skips tool
+       execution when the budget is already exhausted
+    """
+
+    def __init__(self, budget):
+        super().__init__()
+        self.budget = budget
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        """
+        Hook que envuelve CADA llamada al LLM.
+
+        Si el presupuesto está agotado, quita los tools del request para forzar
+        la respuesta estructurada (degradación controlada en vez de abortar).
+
+        Args:
+            request: Request del modelo (mensajes, tools, response_format)
+            handler: Función que ejecuta la llamada al modelo
+
+        Returns:
+            La respuesta del modelo
+        """
+        reason = self.budget.exhausted_reason()
+        if reason and request.tools:
+            self.budget.record_forced_finish()
+            print(f"[BUDGET] Forcing structured output: {reason}")
+            request = request.override(
+                tools=[],
+                system_prompt=(request.system_prompt or "")
+                + BUDGET_EXHAUSTED_PROMPT.format(reason=reason),
+            )
+
+        response = handler(request)
+
+        for message in response.result:
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                self.budget.charge_tokens(usage.get("total_tokens", 0))
+
+        return response
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        """
+        Hook que envuelve CADA ejecución de tool.
+
+        Si el presupuesto está agotado, no ejecuta el tool y devuelve un
+        ToolMessage indicando al agente que debe terminar.
+
+        Args:
+            request: Request del tool con información del tool_call y state
+            handler: Función que ejecuta el tool
+
+        Returns:
+            El resultado del tool (ToolMessage o Command)
+        """
+        reason = self.budget.exhausted_reason()
+        if reason:
+            return ToolMessage(
+                content=(
+                    f"Tool not executed: {reason}. "
+                    "Return your structured response now with the evidence gathered so far."
+                ),
+                tool_call_id=request.tool_call["id"],
+                name=request.tool_call["name"],
+                status="error",
+            )
+
+        self.budget.charge_request()
+        result = handler(request)
+
+        if request.tool_call["name"] in OCR_TOOLS:
+            self.budget.charge_ocr_pages(_ocr_pages_from_result(result))
+
+        return result
+
+
+class CancellationMiddleware(AgentMiddleware):
+    """
+    Middleware that stops an agent cooperatively when its CancellationToken fires.
+
+    The token is checked before each LLM call and before each tool execution;
+    when it has been cancelled (user abort, branch deadline or parent
+    investigation cancelled) InvestigationCancelledError is raised and the
+    agent run is aborted at that safe point.
+    """
+
+    def __init__(self, token: CancellationToken):
+        super().__init__()
+        self.token = token
+
+    def before_model(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        """Hook ejecutado ANTES de cada llamada al LLM: aborta si la investigación fue cancelada"""
+        self.token.raise_if_cancelled()
+        return None
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        """Hook que envuelve CADA ejecución de tool: aborta si la investigación fue cancelada"""
+        self.token.raise_if_cancelled()
+        return handler(request)
+
+
+class ToolConcurrencyMiddleware(AgentMiddleware):
+    """
+    Middleware that runs each tool call inside a per-tool concurrency slot.
+
+    The agent's tool node already executes the tool calls of one step
+    concurrently; this bounds how many executions of each tool run at once
+    across all agents sharing the ToolConcurrencyLimiter.
+
+    Goes after BudgetGovernorMiddleware and CancellationMiddleware, so calls
+    that will not run do not wait for a slot.
+    """
+
+    def __init__(self, limiter: ToolConcurrencyLimiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        """Hook que envuelve CADA ejecución de tool: espera un cupo libre del tool antes de ejecutarlo"""
+        with self.limiter.slot(request.tool_call["name"]):
+            return handler(request)
+
+
+# Tools whose results depend only on their arguments (get_plan is task-specific)
+SHARED_EVIDENCE_TOOLS = {
+    "read_buyer_attachments_table",
+    "read_buyer_attachment_doc",
+    "read_award_result",
+    "read_award_result_attachment_doc",
+}
+
+
+class EvidenceStoreMiddleware(AgentMiddleware):
+    """
+    Middleware that shares tool results between the task agents of one investigation.
+
+    Calls to the document and award tools go through the investigation's
+    EvidenceStore: the first agent to ask for (tool, args) runs the tool, agents
+    asking at the same time wait for that result, and later agents reuse it.
+    Reused results are not charged to the budget again.
+
+    Must come before BudgetGovernorMiddleware, so reused results skip its charges.
+    """
+
+    def __init__(self, store: EvidenceStore):
+        super().__init__()
+        self.store = store
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        """
+        Hook que envuelve CADA ejecución de tool: ejecuta cada (tool, args) una sola vez por investigación.
+
+        Args:
+            request: Request del tool con información del tool_call y state
+            handler: Función que ejecuta el tool
+
+        Returns:
+            El resultado del tool, propio o compartido por otra rama
+        """
+        tool_call = request.tool_call
+        if tool_call["name"] not in SHARED_EVIDENCE_TOOLS:
+            return handler(request)
+
+        result = self.store.get_or_compute(
+            evidence_key(tool_call["name"], tool_call["args"]),
+            lambda: handler(request),
+            storable=is_storable_evidence,
+        )
+        if not isinstance(result, ToolMessage) or result.tool_call_id == tool_call["id"]:
+            return result
+
+        # Result produced by another agent's call: answer this agent's tool call id
+        return ToolMessage(
+            content=result.content,
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"],
+            status=result.status,
+        )
+
+# OpenRouter providers that only cache prompts marked with cache_control breakpoints
+# (OpenAI, DeepSeek and Grok models cache matching prefixes automatically)
+CACHE_CONTROL_PROVIDERS = ("anthropic/", "google/")
+
+
+def supports_cache_control(model_name: str) -> bool:
+    """Check whether an OpenRouter model needs explicit cache_control breakpoints"""
+    return model_name.startswith(CACHE_CONTROL_PROVIDERS)
+
+
+class PromptCachingMiddleware(AgentMiddleware):
+    """
+    Middleware that marks the shared system prompt prefix as cacheable.
+
+    Every task agent of one investigation has the same system prompt (agent
+    instructions plus tender context). This middleware sends it as a content
+    block with an OpenRouter cache_control breakpoint, so the provider serves
+    the prefix from cache for every parallel branch and every step after the
+    first. Text appended to the system prompt by other middleware (e.g. the
+    budget governor) goes in a separate block after the breakpoint.
+
+    Must be the last middleware, so it sees the final system prompt.
+    """
+
+    def __init__(self, cached_prefix: str):
+        super().__init__()
+        self.cached_prefix = cached_prefix
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        """
+        Hook que envuelve CADA llamada al LLM: envía el prefijo compartido como bloque cacheable.
+
+        Args:
+            request: Request del modelo (mensajes, tools, response_format)
+            handler: Función que ejecuta la llamada al modelo
+
+        Returns:
+            La respuesta del modelo
+        """
+        system_prompt = request.system_prompt or ""
+        if not system_prompt.startswith(self.cached_prefix):
+            return handler(request)
+
+        blocks = [{
+            "type": "text",
+            "text": self.cached_prefix,
+            "cache_control": {"type": "ephemeral"},
+        }]
+        suffix = system_prompt[len(self.cached_prefix):]
+        if suffix:
+            blocks.append({"type": "text", "text": suffix})
+
+        return handler(request.override(
+            system_prompt=None,
+            messages=[SystemMessage(content=blocks), *request.messages],
+        ))
+
+
+class ReadToolOutputInput(BaseModel):
+    """Input schema for the read_tool_output tool."""
+    handle: str = Field(description="Handle from the '_output' entry of a truncated tool result")
+    part: int = Field(description="Part to read (1-indexed, up to total_parts)")
+
+
+class ToolOutputGovernorMiddleware(AgentMiddleware):
+    """
+    Middleware that keeps tool results within per-tool token budgets.
+
+    Results over their tool's budget are summarized or truncated by the
+    ToolOutputGovernor before they reach the agent's message history. The
+    full results stay available through the read_tool_output tool that this
+    middleware registers, which pages through them by handle.
+
+    Must come before EvidenceStoreMiddleware, so full results are shared
+    between agents and each agent governs its own copy.
+    """
+
+    def __init__(self, governor: ToolOutputGovernor):
+        super().__init__()
+        self.governor = governor
+
+        @tool("read_tool_output", args_schema=ReadToolOutputInput)
+        def read_tool_output(handle: str, part: int) -> dict:
+            """Read one part of a tool result that was truncated (see its '_output' entry).
+
+            Args:
+                handle: Handle of the truncated result
+                part: Part number (1-indexed)
+
+            Returns:
+                dict: {handle, tool, part, total_parts, content} or {error}
+            """
+            return governor.page(handle, part)
+
+        self.tools = [read_tool_output]
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        """
+        Hook que envuelve CADA ejecución de tool: reduce el resultado al presupuesto del tool.
+
+        Args:
+            request: Request del tool con información del tool_call y state
+            handler: Función que ejecuta el tool
+
+        Returns:
+            El resultado del tool, resumido si excede su presupuesto
+        """
+        result = handler(request)
+        tool_name = request.tool_call["name"]
+        if (
+            tool_name == "read_tool_output"
+            or not isinstance(result, ToolMessage)
+            or not isinstance(result.content, str)
+        ):
+            return result
+
+        content = self.governor.govern(tool_name, result.content)
+        if content is result.content:
+            return result
+        return ToolMessage(
+            content=content,
+            tool_call_id=result.tool_call_id,
+            name=result.name,
+            status=result.status,
+        )
+
+
+class ExpandToolOutputInput(BaseModel):
+    """Input schema for the expand_tool_output tool."""
+    ref: str = Field(description="Reference (ref=...) of a compacted tool output")
+    state: Annotated[dict, InjectedState] = Field(description="Agent state (injected)")
+
+
+@tool("expand_tool_output", args_schema=ExpandToolOutputInput)
+def expand_tool_output(ref: str, state: Annotated[dict, InjectedState]) -> dict:
+    """Re-read the full content of a compacted tool output (shown as '[Compacted tool output] ref=...').
+
+    Args:
+        ref: Reference from the compacted output
+
+    Returns:
+        dict: {ref, tool, content} or {error}
+    """
+    return find_tool_output(state.get("messages", []), ref)
+
+
+class HistoryCompactionMiddleware(AgentMiddleware):
+    """
+    Middleware that compacts old tool outputs once the message history grows large.
+
+    Before each LLM call, if the estimated size of the messages is over the
+    threshold, every tool output except the most recent ones is replaced by a
+    digest with a reference. Only the request is changed: the agent state keeps
+    the full outputs, which the agent can re-read with the expand_tool_output
+    tool registered by this middleware.
+    """
+
+    tools = [expand_tool_output]
+
+    def __init__(self, threshold_tokens: int = None, keep_recent: int = None, digest_chars: int = None):
+        super().__init__()
+        self.threshold_tokens = threshold_tokens or settings.history_compaction_threshold_tokens
+        self.keep_recent = settings.history_compaction_keep_recent if keep_recent is None else keep_recent
+        self.digest_chars = digest_chars or settings.history_compaction_digest_chars
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        """
+        Hook que envuelve CADA llamada al LLM: reemplaza los resultados antiguos de tools por resúmenes.
+
+        Args:
+            request: Request del modelo (mensajes, tools, response_format)
+            handler: Función que ejecuta la llamada al modelo
+
+        Returns:
+            La respuesta del modelo
+        """
+        messages, compacted = compact_messages(
+            request.messages, self.threshold_tokens, self.keep_recent, self.digest_chars
+        )
+        if not compacted:
+            return handler(request)
+
+        print(f"[COMPACTION] {compacted} old tool outputs replaced by digests")
+        return handler(request.override(messages=messages))
+
+
+TERMINATION_PROMPT = """
+
+## INVESTIGATION COMPLETE
+
+Stop investigating: {reason}. Do NOT call any more investigation tools.
+Return your structured response NOW, based on the evidence you have gathered
+and the subtask results you recorded.
+"""
+
+
+class RecordSubtaskResultInput(BaseModel):
+    """Input schema for the record_subtask_result tool."""
+    subtask: int = Field(description="Subtask number (1-indexed, as listed in the task)")
+    verdict: str = Field(description="'pass' (requirement met), 'fail' (violation found) or 'not_verifiable'")
+    evidence: str = Field(description="Evidence supporting the verdict: quotes, document names, page numbers")
+
+
+class TerminationPolicyMiddleware(AgentMiddleware):
+    """
+    Middleware that ends the investigation once the task has enough evidence.
+
+    Registers the record_subtask_result tool, observes tool results for new
+    evidence and, before each LLM call, asks the TerminationPolicy whether to
+    stop: when every subtask has a recorded result, or after too many steps
+    without new evidence, the investigation tools are removed so the model
+    returns its structured output (same mechanism as the budget governor).
+    """
+
+    def __init__(self, policy: TerminationPolicy):
+        super().__init__()
+        self.policy = policy
+        self.forced_reason = None
+
+        @tool("record_subtask_result", args_schema=RecordSubtaskResultInput)
+        def record_subtask_result(subtask: int, verdict: str, evidence: str) -> str:
+            """Record the conclusion of one subtask as soon as you have the evidence for it.
+
+            Args:
+                subtask: Subtask number
+                verdict: pass, fail or not_verifiable
+                evidence: Supporting evidence
+
+            Returns:
+                str: Subtask coverage so far
+            """
+            error = policy.record_subtask(subtask, verdict, evidence)
+            return f"Error: {error}" if error else f"Recorded. {policy.coverage()}"
+
+        self.tools = [record_subtask_result]
+
+    def before_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        """Hook ejecutado al inicio de cada ejecución del agente: reinicia el seguimiento"""
+        self.policy.reset()
+        self.forced_reason = None
+        return None
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        """
+        Hook que envuelve CADA llamada al LLM: fuerza la respuesta estructurada si la política lo indica.
+
+        Args:
+            request: Request del modelo (mensajes, tools, response_format)
+            handler: Función que ejecuta la llamada al modelo
+
+        Returns:
+            La respuesta del modelo
+        """
+        self.policy.end_step()
+        reason = self.policy.stop_reason()
+        if reason and request.tools:
+            if self.forced_reason is None:
+                print(f"[TERMINATION] Forcing structured output: {reason}")
+            self.forced_reason = reason
+            request = request.override(
+                tools=[],
+                system_prompt=(request.system_prompt or "") + TERMINATION_PROMPT.format(reason=reason),
+            )
+        return handler(request)
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        """Hook que envuelve CADA ejecución de tool: registra si el resultado aporta evidencia nueva"""
+        result = handler(request)
+        self.policy.observe_tool_result(request.tool_call["name"], request.tool_call["args"], result)
+        return result
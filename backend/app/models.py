@@ -1,25 +1,42 @@
 # Models will be defined here
-from sqlalchemy import Column, Integer, String, DateTime, Index, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, Text, LargeBinary
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 from app.database import Base
 
 
 class WebSocketLog(Base):
-    """Model for storing all websocket messages for replay functionality"""
+    """
+    Model for storing all websocket messages for replay functionality.
+
+    The table is partitioned by month on created_at (see the partition_websocket_logs
+    migration), so created_at is part of the primary key.
+    """
     __tablename__ = "websocket_logs"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    tender_id = Column(String, nullable=False, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    tender_id = Column(String, nullable=False)
     message_data = Column(JSONB, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, primary_key=True, nullable=False, default=datetime.utcnow)
 
-    # Add explicit index on tender_id for fast lookups
+    # Composite index serves both the existence check and the ordered replay query
     __table_args__ = (
-        Index('ix_websocket_logs_tender_id', 'tender_id'),
+        Index('ix_websocket_logs_tender_id_created_at', 'tender_id', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
     )
 
 
+class ReplaySnapshot(Base):
+    """Model for storing a compacted, compressed replay of a finished investigation"""
+    __tablename__ = "replay_snapshots"
+
+    tender_id = Column(String, primary_key=True)
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed JSON snapshot
+    event_count = Column(Integer, nullable=False)
+    source_event_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 class Wishlist(Base):
     """Model for storing wishlist/waitlist entries"""
     __tablename__ = "wishlist"
@@ -13,34 +13,39 @@ You will receive ONE specific investigation task to execute deeply using documen
 ## Available Tools
 
 ### Tender Document Tools (Buyer Side)
-1. **get_plan**: Create detailed investigation plan for this specific validation task (CALL ONLY ONCE at the start)
+1. **get_plan**: Create an investigation plan (ONLY if the task message has no INVESTIGATION PLAN)
 2. **read_buyer_attachments_table**: Get complete list of tender documents
 3. **read_buyer_attachment_doc**: Deep dive into document content (requires start_page and end_page)
    - Automatically downloads and caches files when needed
+4. **search_tender_documents**: Search the text already extracted from the tender documents
+   - Returns: row_id, page and a snippet for the best matching passages
+   - Use to: Find which document and page covers a clause (criteria, guarantees, deadlines) before reading it
 
 ### Award Analysis Tools (Award Side)
-4. **read_award_result**: Get award decision, all submitted bids, and winner details
+5. **read_award_result**: Get award decision, all submitted bids, and winner details
    - Returns: award act, award justifications, all bids (not just winner), winner provider details (RUT, razón social, sucursal)
    - Use to: Compare all bids, verify winner identity, analyze award justifications
-5. **read_award_result_attachment_doc**: Extract text from award-related documents
+6. **read_award_result_attachment_doc**: Extract text from award-related documents
    - Similar to read_buyer_attachment_doc but for award documents
    - Use to: Read award justifications, winner proposals, evaluation results
-
+{optional_tools}
 ## Investigation Process
 
 Your investigation MUST follow these steps:
 
-### Step 1: Plan Investigation (ONE TIME ONLY)
+### Step 1: Review the Plan
 - Read task description, severity, and all subtasks
-- **Use get_plan tool EXACTLY ONCE immediately** with task details and subtasks
-- DO NOT call get_plan again after the initial call
+- The task message includes an INVESTIGATION PLAN for its task code: follow it, do not call get_plan
+- Only if the task message has no plan, call get_plan ONCE with the task details, task_code and tender_id
 - The plan will guide your tool usage and evidence gathering
 
 ### Step 2: Execute Investigation
 - Follow the plan systematically using available tools
 - For tender docs: read_buyer_attachments_table → read_buyer_attachment_doc (with specific page ranges)
+- To locate a clause: search_tender_documents → read_buyer_attachment_doc on the pages it points to
 - For award data: read_award_result → read_award_result_attachment_doc
 - Extract concrete evidence: quotes, page numbers, specific facts
+- Request independent tool calls together in the same step (e.g. the award result and a document, or two documents): they run in parallel{record_step}
 - If documents missing: note as finding and continue
 
 ### Step 3: Document Findings
@@ -96,19 +101,19 @@ Specific validation points to verify
 ## Output Format
 
 ```python
-{
+{{
     "validation_passed": bool,  # true if compliant, false if violations found
     "findings": [
-        {
+        {{
             "anomaly_name": "...",
             "description": "... [include fraud risk context]",
             "evidence": ["...", "..."],
             "confidence": 0.XX,
             "affected_documents": ["..."]
-        }
+        }}
     ],
     "investigation_summary": "..."
-}
+}}
 ```
 
 ## Example Investigation
@@ -126,10 +131,7 @@ SUBTASKS:
 
 ```
 # Step 1: Plan
-get_plan(
-  task="Validate explicit weights for all evaluation criteria",
-  subtasks=["numeric weights", "scoring formulas", "price formula"]
-)
+→ Follow the INVESTIGATION PLAN included in the task message (no get_plan call)
 
 # Step 2: Execute
 read_buyer_attachments_table()
@@ -152,14 +154,97 @@ read_buyer_attachment_doc("Bases_Administrativas.pdf", 10, 15)
 
 ## Critical Reminders
 
-1. **Call get_plan EXACTLY ONCE at the very start** - don't skip planning step, don't call it multiple times
+1. **Follow the INVESTIGATION PLAN in the task message** - call get_plan only when no plan is provided, and at most once
 2. **Be direct and efficient** - extract evidence, document findings, move forward
 3. **Always connect to fraud risk** - explain why each violation matters
 4. **Cite concrete evidence** - page numbers, exact quotes, document names
 5. **Weight confidence properly** - certainty × fraud severity
 6. **TOOL CALL BUDGET: Maximum 50 tool calls per investigation** - Be strategic and focused. If approaching this limit, conclude your investigation with findings gathered so far
-7. **Complete all subtasks** - address each validation point
+7. **Complete all subtasks** - address each validation point{record_reminder}
 8. **Be honest about gaps** - if data is missing, say so
 
 Build clear, evidence-based findings that connect violations to fraud patterns. Be specific, defensible, and fraud-focused.
-"""
\ No newline at end of file
+"""
+
+# Tools registered only with their feature setting (see FraudDetectionAgent.build_system_prompt);
+# listed after the six document tools, so {number} starts at 7
+RECORD_SUBTASK_TOOL_PROMPT = """
+### Progress Tracking
+{number}. **record_subtask_result**: Record the verdict (pass / fail / not_verifiable) and evidence of one subtask
+   - Call it as soon as a subtask is settled; once every subtask is recorded you will be asked to finish
+   - If several steps bring no new evidence you will also be asked to finish with what you have
+"""
+
+RECORD_SUBTASK_STEP_PROMPT = """
+- Record each subtask with record_subtask_result as soon as it is settled"""
+
+RECORD_SUBTASK_REMINDER_PROMPT = " and record it with record_subtask_result"
+
+READ_TOOL_OUTPUT_PROMPT = """
+### Large Results
+{number}. **read_tool_output**: Read the rest of a tool result that was summarized or truncated
+   - Large results include an "_output" entry with a handle and total_parts
+   - Award results keep the awarded bids, the lowest offers and bid aggregates per item
+   - Use only when the omitted part is needed for your task
+"""
+
+EXPAND_TOOL_OUTPUT_PROMPT = """
+### Compacted History
+{number}. **expand_tool_output**: Re-read an earlier tool output shown as "[Compacted tool output] ref=..."
+   - In long investigations, old tool outputs are replaced by digests to keep the context small
+   - Prefer the digest and your notes; expand only when you need the exact text again
+"""
+
+# Shared by every task agent of one investigation: appended to SYS_PROMPT so the
+# whole system message is an identical, cacheable prefix across parallel branches
+TENDER_CONTEXT_PROMPT = """
+
+## Tender Under Investigation
+
+- Tender ID: {tender_id}
+- Tender Name: {tender_name}
+- Organization: {organization}
+
+### Available Documents
+{documents}
+
+### Tender Information
+{bases}...
+"""
+
+# Per-task user message, sent after the shared prefix
+TASK_PROMPT = """INVESTIGATION TASK:
+
+Task ID: {task_id}
+Task Code: {task_code}
+Task Name: {task_name}
+
+WHAT TO VALIDATE:
+{task_desc}
+
+WHERE TO LOOK:
+{task_where}
+
+SEVERITY: {task_severity}
+
+SUBTASKS:
+{subtasks}
+
+INVESTIGATION PLAN:
+{plan}
+
+Please investigate this task systematically for the tender described above and report your findings.
+"""
+
+SALVAGE_PROMPT = """The investigation below reached its step limit before producing a final answer.
+
+{task_prompt}
+
+Based ONLY on the evidence gathered so far (listed below), produce the final
+structured investigation result for tender {tender_id}:
+- Report only anomalies supported by the evidence shown; do not speculate about unread documents
+- Lower the confidence of findings whose evidence is partial
+- In the investigation summary, state which subtasks could not be completed
+
+{transcript}
+"""
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Dict, Any, List, TYPE_CHECKING
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.utils.get_tender import TenderResponse
@@ -68,6 +68,7 @@ class FraudDetectionInput(BaseModel):
     tender_id: str = Field(description="Tender ID to investigate")
     risk_indicators: List[str] = Field(description="Risk indicators from ranking")
     full_context: Dict[str, Any] = Field(description="Complete context from ranking agent")
+    task_prompt: Optional[str] = Field(default=None, description="Per-task instructions sent as the user message (the tender context is in the system prompt)")
 
 
 class Anomaly(BaseModel):
@@ -163,6 +164,12 @@ class TaskInvestigationOutput(BaseModel):
     validation_passed: bool = Field(description="Whether the task validation passed")
     findings: List[Anomaly] = Field(description="Anomalies/issues found during investigation")
     investigation_summary: str = Field(description="Summary of the investigation")
+    timed_out: bool = Field(default=False, description="Whether the investigation was stopped by its deadline")
+    cancelled: bool = Field(default=False, description="Whether the investigation was cancelled by the user")
+    incomplete: bool = Field(
+        default=False,
+        description="Whether the agent hit its iteration limit and the findings were salvaged from partial evidence",
+    )
 
 
 class SummaryOutput(BaseModel):
@@ -0,0 +1,249 @@
+"""
+Service for replaying saved investigations over websocket
+"""
+from typing import Dict, Any, Optional
+from datetime import datetime
+import asyncio
+import logging
+
+from app.config import settings
+from app.services.websocket_log_service import WebSocketLogCursor, get_final_websocket_message
+from app.services.replay_snapshot_service import SnapshotCursor, build_replay_snapshot, get_replay_snapshot
+from app.utils.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Delay used when a message has no usable timestamp (scaled by replay speed)
+DEFAULT_MESSAGE_DELAY = 0.1
+
+
+def _message_timestamp(message: Dict[str, Any]) -> Optional[datetime]:
+    """Parse the original send time of a saved message"""
+    timestamp = message.get('_db_timestamp') or message.get('timestamp')
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Error parsing timestamp, using default delay: {e}")
+        return None
+
+
+def _clean_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove the _db_timestamp we added when reading the log"""
+    return {k: v for k, v in message.items() if k != '_db_timestamp'}
+
+
+class ReplaySession:
+    """
+    Replays a tender's saved websocket messages to one session.
+
+    Messages are served from the tender's compacted replay snapshot, which is
+    built on first replay if the investigation finished without one. Unfinished
+    investigations are streamed from the raw log in chunks instead. Either way
+    messages are paced with asyncio on the server event loop, so a replay holds
+    no thread; only the short database reads run in a worker thread.
+
+    Supports two controls while running:
+    - seek(position): continue from the given message index
+    - skip_to_end(): stop pacing and send the final result immediately
+
+    Usage:
+        replay = ReplaySession(session_id, tender_id, replay_speed=4.0)
+        replay.start()  # must be called on the server event loop
+        replay.seek(120)
+        replay.skip_to_end()
+    """
+
+    # Cursor used to stream the raw log when there is no snapshot (overridable for tests)
+    cursor_class = WebSocketLogCursor
+
+    def __init__(self, session_id: str, tender_id: str, replay_speed: float = None):
+        """
+        Initialize the replay.
+
+        Args:
+            session_id: The session ID for WebSocket communication
+            tender_id: The tender ID to replay messages for
+            replay_speed: Speed multiplier (e.g., 4.0 means 4x faster; default from config)
+        """
+        self.session_id = session_id
+        self.tender_id = tender_id
+        self.replay_speed = replay_speed or settings.websocket_replay_speed
+        self.position = 0
+        self.sent = 0
+        self.task: Optional[asyncio.Task] = None
+        self._seek_to: Optional[int] = None
+        self._skip = False
+        self._control = asyncio.Event()
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    def start(self) -> asyncio.Task:
+        """Start the replay as a task on the running event loop"""
+        self.task = asyncio.create_task(self.run())
+        return self.task
+
+    def seek(self, position: int):
+        """Continue the replay from the given message index"""
+        self._seek_to = max(0, position)
+        self._control.set()
+
+    def skip_to_end(self):
+        """Stop pacing and send the final result right away"""
+        self._skip = True
+        self._control.set()
+
+    async def run(self):
+        """Stream the saved messages, restarting the cursor on seek"""
+        manager.register_tender_id(self.session_id, self.tender_id, is_replay=True)
+        try:
+            self._snapshot = await self._load_snapshot()
+            while True:
+                restart = await self._stream_from(self.position)
+                if self._skip:
+                    await self._send_final_result()
+                    break
+                if not restart:
+                    break
+
+            if not self.sent:
+                logger.warning(f"No messages found for tender {self.tender_id}")
+                manager.publish(self.session_id, {
+                    "type": "error",
+                    "message": "No saved messages found for replay",
+                    "status": "error"
+                })
+            else:
+                logger.info(f"Replay completed for tender {self.tender_id}")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error replaying messages for tender {self.tender_id}: {e}", exc_info=True)
+            manager.publish(self.session_id, {
+                "type": "error",
+                "message": f"Replay failed: {str(e)}",
+                "status": "error"
+            })
+        finally:
+            _active_replays.pop(self.session_id, None)
+
+    async def _stream_from(self, offset: int) -> bool:
+        """
+        Send messages starting at offset until the log ends or a control arrives.
+
+        Returns:
+            True if the replay should restart from self.position (seek), False otherwise
+        """
+        cursor = await asyncio.to_thread(self._open_cursor, offset)
+        previous_timestamp: Optional[datetime] = None
+        first = True
+        try:
+            while True:
+                chunk = await asyncio.to_thread(cursor.fetch)
+                if not chunk:
+                    return False
+
+                for message in chunk:
+                    timestamp = _message_timestamp(message)
+
+                    # First message after a (re)start is sent immediately
+                    if first:
+                        if self._control.is_set():
+                            return self._apply_control()
+                        first = False
+                    else:
+                        if timestamp is not None and previous_timestamp is not None:
+                            delay = max(0.0, (timestamp - previous_timestamp).total_seconds())
+                        else:
+                            delay = DEFAULT_MESSAGE_DELAY
+                        if await self._wait(delay / self.replay_speed):
+                            return self._apply_control()
+
+                    manager.publish(self.session_id, _clean_message(message))
+                    self.position += 1
+                    self.sent += 1
+                    previous_timestamp = timestamp
+        finally:
+            await asyncio.to_thread(cursor.close)
+
+    async def _wait(self, delay: float) -> bool:
+        """
+        Sleep for delay seconds, waking up early if a control arrives.
+
+        Returns:
+            True if a control interrupted the wait
+        """
+        if delay <= 0:
+            return self._control.is_set()
+        try:
+            await asyncio.wait_for(self._control.wait(), timeout=delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _apply_control(self) -> bool:
+        """Consume a pending control; returns True if the stream must restart (seek)"""
+        self._control.clear()
+        if self._skip:
+            return False
+        if self._seek_to is not None:
+            self.position = self._seek_to
+            self._seek_to = None
+            return True
+        return False
+
+    async def _load_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Load the tender's replay snapshot, compacting the raw log if needed"""
+        snapshot = await get_replay_snapshot(self.tender_id)
+        if snapshot is None:
+            snapshot = await asyncio.to_thread(build_replay_snapshot, self.tender_id)
+        return snapshot
+
+    def _open_cursor(self, offset: int):
+        """Open a cursor over the snapshot, or over the raw log if there is none (blocking)"""
+        if self._snapshot is not None:
+            return SnapshotCursor(self._snapshot, offset)
+        return self.cursor_class(self.tender_id, offset)
+
+    async def _load_final_message(self) -> Optional[Dict[str, Any]]:
+        """Load the investigation's final message"""
+        if self._snapshot is not None:
+            return dict(self._snapshot["events"][self._snapshot["result_index"]][1])
+        return await get_final_websocket_message(self.tender_id)
+
+    async def _send_final_result(self):
+        """Send the investigation's final message without pacing"""
+        message = await self._load_final_message()
+        if message is not None:
+            manager.publish(self.session_id, message)
+            self.sent += 1
+
+
+# Running replays by session_id, so the API can control them
+_active_replays: Dict[str, ReplaySession] = {}
+
+
+def start_replay(session_id: str, tender_id: str, replay_speed: float = None) -> ReplaySession:
+    """
+    Start replaying a tender's saved messages to a session.
+
+    Must be called on the server event loop (e.g. from an async endpoint).
+
+    Args:
+        session_id: The session ID for WebSocket communication
+        tender_id: The tender ID to replay messages for
+        replay_speed: Speed multiplier (default from config)
+
+    Returns:
+        The running ReplaySession
+    """
+    replay = ReplaySession(session_id, tender_id, replay_speed)
+    _active_replays[session_id] = replay
+    replay.start()
+    return replay
+
+
+def get_replay(session_id: str) -> Optional[ReplaySession]:
+    """Get the running replay for a session, if any"""
+    return _active_replays.get(session_id)
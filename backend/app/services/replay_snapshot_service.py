@@ -0,0 +1,262 @@
+"""
+Service for compacting finished investigations into replay snapshots
+
+A snapshot is the replayable form of a tender's websocket log, stored as one
+compressed blob:
+- runs of identical consecutive events (e.g. "Analizando con IA" logged again
+  before each model call with nothing in between) are collapsed into the first
+  one, with a "repeated" count
+- timestamps are stored as seconds relative to the first event
+- the index of the final result is recorded so replays can skip straight to it
+
+Replays read a single row instead of re-reading and re-serializing the raw log.
+"""
+from typing import Iterable, List, Dict, Any, Optional
+from datetime import datetime, timedelta
+import json
+import logging
+import zlib
+
+from sqlalchemy import exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, AsyncSessionLocal
+from app.models import ReplaySnapshot
+from app.services.websocket_log_service import WebSocketLogCursor
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2  # 2: only consecutive repeats are collapsed
+
+
+def _parse_timestamp(message: Dict[str, Any]) -> Optional[datetime]:
+    """Parse the original send time of a saved message"""
+    timestamp = message.get('_db_timestamp') or message.get('timestamp')
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _is_repeat(previous: Dict[str, Any], event: Dict[str, Any]) -> bool:
+    """Check whether an event repeats the previous one (same type, task and message)"""
+    if event.get("type") in ("result", "task_result"):
+        return False
+    return all(previous.get(key) == event.get(key) for key in ("type", "task_code", "message"))
+
+
+def compact_messages(messages: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Compact a tender's saved websocket messages into a snapshot.
+
+    Args:
+        messages: Saved messages in send order (as returned by WebSocketLogCursor)
+
+    Returns:
+        Snapshot dictionary, or None if the log has no final result (investigation
+        not finished)
+    """
+    started_at: Optional[datetime] = None
+    last_offset = 0.0
+    events: List[List[Any]] = []
+    result_index: Optional[int] = None
+    source_count = 0
+
+    for message in messages:
+        source_count += 1
+        timestamp = _parse_timestamp(message)
+        if timestamp is not None and started_at is None:
+            started_at = timestamp
+        if timestamp is not None:
+            last_offset = max(last_offset, (timestamp - started_at).total_seconds())
+
+        event = {k: v for k, v in message.items() if k not in ('_db_timestamp', 'timestamp')}
+
+        if events and _is_repeat(events[-1][1], event):
+            events[-1][1]["repeated"] = events[-1][1].get("repeated", 1) + 1
+            continue
+
+        if event.get("type") == "result":
+            result_index = len(events)
+        events.append([round(last_offset, 3), event])
+
+    if result_index is None:
+        return None
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "started_at": started_at.isoformat() if started_at else None,
+        "events": events,
+        "result_index": result_index,
+        "source_event_count": source_count,
+    }
+
+
+def encode_snapshot(snapshot: Dict[str, Any]) -> bytes:
+    """Serialize and compress a snapshot for storage"""
+    return zlib.compress(json.dumps(snapshot, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_snapshot(data: bytes) -> Dict[str, Any]:
+    """Decompress and deserialize a stored snapshot"""
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def _iter_websocket_log(tender_id: str) -> Iterable[Dict[str, Any]]:
+    """Stream a tender's saved messages in chunks"""
+    cursor = WebSocketLogCursor(tender_id)
+    try:
+        while chunk := cursor.fetch():
+            yield from chunk
+    finally:
+        cursor.close()
+
+
+def build_replay_snapshot(tender_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Compact a finished investigation's websocket log and store it as a snapshot.
+
+    Replaces any existing snapshot for the tender.
+
+    Args:
+        tender_id: The tender ID to compact
+
+    Returns:
+        The stored snapshot, or None if the investigation has no final result yet
+        or the snapshot could not be stored
+    """
+    try:
+        snapshot = compact_messages(_iter_websocket_log(tender_id))
+    except Exception as e:
+        logger.error(f"Error compacting websocket log for tender {tender_id}: {e}", exc_info=True)
+        return None
+
+    if snapshot is None:
+        logger.info(f"No final result for tender {tender_id}, not building a replay snapshot")
+        return None
+
+    data = encode_snapshot(snapshot)
+    values = {
+        "tender_id": tender_id,
+        "data": data,
+        "event_count": len(snapshot["events"]),
+        "source_event_count": snapshot["source_event_count"],
+        "created_at": datetime.utcnow(),
+    }
+    db: Session = SessionLocal()
+    try:
+        statement = insert(ReplaySnapshot).values(**values)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[ReplaySnapshot.tender_id],
+            set_={k: statement.excluded[k] for k in values if k != "tender_id"},
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving replay snapshot for tender {tender_id}: {e}", exc_info=True)
+        return None
+    finally:
+        db.close()
+
+    logger.info(
+        f"Built replay snapshot for tender {tender_id}: "
+        f"{snapshot['source_event_count']} events -> {len(snapshot['events'])}, {len(data)} bytes"
+    )
+    return snapshot
+
+
+async def get_replay_snapshot(tender_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve the stored replay snapshot for a tender.
+
+    Args:
+        tender_id: The tender ID to retrieve the snapshot for
+
+    Returns:
+        Snapshot dictionary, or None if there is no (readable) snapshot
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            data = (await db.execute(
+                select(ReplaySnapshot.data).where(ReplaySnapshot.tender_id == tender_id)
+            )).scalar()
+        if data is None:
+            return None
+        snapshot = decode_snapshot(data)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+        return snapshot
+    except Exception as e:
+        logger.error(f"Error retrieving replay snapshot for tender {tender_id}: {e}", exc_info=True)
+        return None
+
+
+async def has_replay_snapshot(tender_id: str) -> bool:
+    """
+    Check if a replay snapshot exists for a given tender_id.
+
+    Snapshots outlive the raw log, whose old partitions are detached by the
+    retention policy.
+
+    Args:
+        tender_id: The tender ID to check
+
+    Returns:
+        True if a snapshot exists, False otherwise
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(
+                select(exists().where(ReplaySnapshot.tender_id == tender_id))
+            )).scalar()
+    except Exception as e:
+        logger.error(f"Error checking replay snapshot for tender {tender_id}: {e}", exc_info=True)
+        return False
+
+
+class SnapshotCursor:
+    """
+    Cursor over a snapshot's events with the same interface as WebSocketLogCursor.
+
+    Absolute timestamps are rebuilt from the snapshot start time, so replays
+    paced from a snapshot behave like replays from the raw log.
+    """
+
+    def __init__(self, snapshot: Dict[str, Any], offset: int = 0, chunk_size: int = 500):
+        """
+        Open the cursor.
+
+        Args:
+            snapshot: Snapshot dictionary as returned by get_replay_snapshot
+            offset: Number of events to skip (used to seek)
+            chunk_size: Events per fetch
+        """
+        started_at = snapshot.get("started_at")
+        self._started_at = datetime.fromisoformat(started_at) if started_at else datetime.utcnow()
+        self._events = snapshot["events"]
+        self._position = offset
+        self.chunk_size = chunk_size
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        """
+        Fetch the next chunk of events.
+
+        Returns:
+            List of message dictionaries with their '_db_timestamp', empty when exhausted
+        """
+        chunk = self._events[self._position:self._position + self.chunk_size]
+        self._position += len(chunk)
+        messages = []
+        for offset, event in chunk:
+            timestamp = (self._started_at + timedelta(seconds=offset)).isoformat()
+            message = dict(event)
+            message['timestamp'] = timestamp
+            message['_db_timestamp'] = timestamp
+            messages.append(message)
+        return messages
+
+    def close(self) -> None:
+        """Nothing to release (kept for interface parity with WebSocketLogCursor)"""
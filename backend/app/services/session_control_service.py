@@ -0,0 +1,67 @@
+"""
+Service for controlling running sessions from any worker
+
+Investigations (cancel) and replays (seek, skip to end) are registered in the
+process that runs them. With several workers, a control request may reach a
+different process: it is then forwarded over the websocket backplane and
+applied by the process that holds the session.
+"""
+from typing import Any, Dict
+import logging
+
+from app.services.replay_service import get_replay
+from app.utils.investigation_budget import cancel_investigation
+from app.utils.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+
+def apply_control(session_id: str, command: Dict[str, Any]) -> bool:
+    """
+    Apply a control command to a session running in this process.
+
+    Must be called on the server event loop (replays run there).
+
+    Args:
+        session_id: Session ID returned by POST /investigate
+        command: {"action": "cancel"}, {"action": "seek", "position": int} or {"action": "skip"}
+
+    Returns:
+        True if the session runs here and the command was applied, False otherwise
+    """
+    action = command.get("action")
+    if action == "cancel":
+        return cancel_investigation(session_id)
+
+    replay = get_replay(session_id)
+    if replay is None:
+        return False
+    if action == "seek":
+        replay.seek(command["position"])
+    elif action == "skip":
+        replay.skip_to_end()
+    else:
+        logger.warning(f"Ignoring unknown control action {action!r} for session {session_id}")
+        return False
+    return True
+
+
+async def send_control(session_id: str, command: Dict[str, Any]) -> bool:
+    """
+    Apply a control command wherever the session runs.
+
+    The command is applied locally when possible; otherwise it is forwarded to
+    the other workers over the backplane (when enabled).
+
+    Args:
+        session_id: Session ID returned by POST /investigate
+        command: Control command (see apply_control)
+
+    Returns:
+        True if some process applied the command, False if no process holds the session
+    """
+    if apply_control(session_id, command):
+        return True
+    if manager.backplane is None:
+        return False
+    return await manager.backplane.request(session_id, command)
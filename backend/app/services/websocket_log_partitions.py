@@ -0,0 +1,158 @@
+"""
+Service for maintaining the monthly partitions of websocket_logs
+
+websocket_logs is partitioned by month on created_at (see the
+partition_websocket_logs migration). This module:
+- creates the partitions for the upcoming months before rows arrive
+- applies the retention policy by detaching partitions older than the
+  retention window (and optionally dropping them)
+
+Finished investigations stay replayable after their partition is detached,
+because replays are served from replay snapshots.
+"""
+from typing import List, Optional, Tuple
+from datetime import date, datetime
+import asyncio
+import logging
+import re
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "websocket_logs"
+PARTITION_NAME = re.compile(r"^websocket_logs_(\d{4})_(\d{2})$")
+
+
+def _add_months(month: date, months: int) -> date:
+    """First day of the month `months` after the given month"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding the given month"""
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def partitions_to_create(today: date, months_ahead: int) -> List[Tuple[str, date, date]]:
+    """
+    List the partitions that must exist from the current month to months_ahead.
+
+    Args:
+        today: Current date
+        months_ahead: Number of future months to prepare
+
+    Returns:
+        List of (partition name, range start, range end) tuples
+    """
+    current = date(today.year, today.month, 1)
+    partitions = []
+    for offset in range(months_ahead + 1):
+        start = _add_months(current, offset)
+        partitions.append((partition_name(start), start, _add_months(start, 1)))
+    return partitions
+
+
+def partitions_past_retention(
+    partition_names: List[str], today: date, retention_months: int
+) -> List[str]:
+    """
+    Select the monthly partitions that fall entirely outside the retention window.
+
+    Args:
+        partition_names: Names of the attached partitions
+        today: Current date
+        retention_months: Number of months of logs to keep, including the current one
+
+    Returns:
+        Names of partitions to detach, oldest first
+    """
+    cutoff = _add_months(date(today.year, today.month, 1), -(retention_months - 1))
+    expired = []
+    for name in sorted(partition_names):
+        match = PARTITION_NAME.match(name)
+        if match and date(int(match.group(1)), int(match.group(2)), 1) < cutoff:
+            expired.append(name)
+    return expired
+
+
+def ensure_partitions(months_ahead: int = None, today: Optional[date] = None) -> None:
+    """
+    Create the monthly partitions for the current and upcoming months.
+
+    Args:
+        months_ahead: Number of future months to prepare (default from config)
+        today: Current date (defaults to today, UTC)
+    """
+    months_ahead = settings.websocket_log_partitions_ahead if months_ahead is None else months_ahead
+    today = today or datetime.utcnow().date()
+
+    with engine.begin() as conn:
+        for name, start, end in partitions_to_create(today, months_ahead):
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+
+
+def apply_retention(
+    retention_months: int = None,
+    drop: bool = None,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Detach (and optionally drop) monthly partitions older than the retention window.
+
+    Detaching is a metadata-only operation, so it does not rewrite or lock the
+    remaining partitions. Detached tables can be archived and dropped later.
+
+    Args:
+        retention_months: Months of logs to keep (default from config)
+        drop: Drop detached partitions instead of keeping them (default from config)
+        today: Current date (defaults to today, UTC)
+
+    Returns:
+        Names of the partitions that were detached
+    """
+    retention_months = retention_months or settings.websocket_log_retention_months
+    drop = settings.websocket_log_drop_detached_partitions if drop is None else drop
+    today = today or datetime.utcnow().date()
+
+    with engine.begin() as conn:
+        attached = conn.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :parent"
+        ), {"parent": PARENT_TABLE}).scalars().all()
+
+        expired = partitions_past_retention(list(attached), today, retention_months)
+        for name in expired:
+            conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+            if drop:
+                conn.execute(text(f'DROP TABLE "{name}"'))
+
+    for name in expired:
+        logger.info(f"{'Dropped' if drop else 'Detached'} websocket log partition {name}")
+    return expired
+
+
+def maintain_partitions() -> None:
+    """Create upcoming partitions and apply the retention policy"""
+    try:
+        ensure_partitions()
+        apply_retention()
+    except Exception as e:
+        # Log but don't break the server: the default partition still accepts rows
+        logger.error(f"Websocket log partition maintenance failed: {e}", exc_info=True)
+
+
+async def run_partition_maintenance() -> None:
+    """Run partition maintenance now and then periodically (server lifetime task)"""
+    while True:
+        await asyncio.to_thread(maintain_partitions)
+        await asyncio.sleep(settings.websocket_log_maintenance_interval)
@@ -1,12 +1,17 @@
 """
 Service for managing websocket log storage and retrieval
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
+import queue
+import threading
+import time
 
+from sqlalchemy import delete, exists, insert, select, tuple_
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.config import settings
+from app.database import SessionLocal, AsyncSessionLocal
 from app.models import WebSocketLog
 
 logger = logging.getLogger(__name__)
@@ -41,6 +46,149 @@ def save_websocket_message(tender_id: str, message: dict) -> None:
         logger.error(f"Failed to save websocket message for tender {tender_id}: {e}", exc_info=True)
 
 
+class _FlushRequest:
+    """Marker put in the write queue; set once every message queued before it is written"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WebSocketLogWriter:
+    """
+    Write-behind buffer for websocket log rows.
+
+    Messages are queued without touching the database and a single background
+    thread writes them in bulk inserts, flushing when a batch is full or when the
+    flush interval elapses. Sending a websocket event therefore no longer waits on
+    a Postgres round-trip, and the database sees one commit per batch instead of
+    one per message.
+
+    Usage:
+        log_writer.enqueue(tender_id, message)  # non-blocking
+        log_writer.flush()                       # e.g. when an investigation ends
+    """
+
+    def __init__(
+        self,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_queue_size: int = None,
+    ):
+        """
+        Initialize the writer (the background thread starts on first use).
+
+        Args:
+            batch_size: Maximum rows per bulk insert (default from config)
+            flush_interval: Seconds before a partial batch is written (default from config)
+            max_queue_size: Maximum buffered messages before dropping new ones (default from config)
+        """
+        self.batch_size = batch_size or settings.websocket_log_batch_size
+        self.flush_interval = flush_interval or settings.websocket_log_flush_interval
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=max_queue_size or settings.websocket_log_queue_size
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_started(self):
+        """Start the background writer thread if it is not running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="websocket-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def enqueue(self, tender_id: str, message: dict) -> None:
+        """
+        Queue a websocket message for persistence without blocking.
+
+        The row keeps the time it was queued as created_at, so replay timing is
+        unaffected by batching.
+
+        Args:
+            tender_id: The tender ID associated with this message
+            message: The complete message dictionary to store
+        """
+        self._ensure_started()
+        row = {
+            "tender_id": tender_id,
+            "message_data": message,
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            logger.error(
+                f"Websocket log buffer full, dropping message for tender {tender_id} "
+                f"({self.dropped} dropped so far)"
+            )
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """
+        Block until every message queued so far has been written.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the buffer was flushed, False on timeout
+        """
+        self._ensure_started()
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def _run(self):
+        """Background loop: collect rows into batches and write them"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _FlushRequest):
+                self._write_batch(batch)
+                batch = []
+                item.done.set()
+            elif item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Write a batch of rows with a single bulk insert and commit"""
+        if not batch:
+            return
+        db: Session = SessionLocal()
+        try:
+            db.execute(insert(WebSocketLog), batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Log but don't break the websocket flow
+            logger.error(f"Failed to save batch of {len(batch)} websocket messages: {e}", exc_info=True)
+        finally:
+            db.close()
+
+
+# Global write-behind buffer instance
+log_writer = WebSocketLogWriter()
+
+
 def get_websocket_messages(tender_id: str) -> List[Dict[str, Any]]:
     """
     Retrieve all websocket messages for a given tender_id, ordered by creation time.
@@ -74,7 +222,137 @@ def get_websocket_messages(tender_id: str) -> List[Dict[str, Any]]:
         db.close()
 
 
-def has_websocket_messages(tender_id: str) -> bool:
+class WebSocketLogCursor:
+    """
+    Keyset-paginated reader over a tender's websocket messages, read in chunks.
+
+    Rows are read a chunk at a time instead of loaded all at once, so replaying
+    a large investigation uses constant memory. Each fetch() runs one short
+    query that resumes after the last (created_at, id) it returned, on its own
+    session, so no connection or transaction is held between chunks while a
+    replay is being paced. fetch() is blocking; async callers run it in a
+    worker thread.
+
+    Usage:
+        cursor = WebSocketLogCursor(tender_id, offset=0)
+        try:
+            while chunk := cursor.fetch():
+                ...
+        finally:
+            cursor.close()
+    """
+
+    def __init__(self, tender_id: str, offset: int = 0, chunk_size: int = None):
+        """
+        Initialize the cursor (no query runs until the first fetch).
+
+        Args:
+            tender_id: The tender ID to read messages for
+            offset: Number of messages to skip (used to seek)
+            chunk_size: Rows per fetch (default from config)
+        """
+        self.tender_id = tender_id
+        self.chunk_size = chunk_size or settings.websocket_replay_chunk_size
+        self._offset = offset
+        self._last_key: Optional[tuple] = None
+        self._exhausted = False
+
+    def _statement(self):
+        """Query for the next chunk: the first one skips offset rows, later ones resume after the last key"""
+        statement = (
+            select(WebSocketLog.message_data, WebSocketLog.created_at, WebSocketLog.id)
+            .where(WebSocketLog.tender_id == self.tender_id)
+            .order_by(WebSocketLog.created_at.asc(), WebSocketLog.id.asc())
+            .limit(self.chunk_size)
+        )
+        if self._last_key is not None:
+            return statement.where(tuple_(WebSocketLog.created_at, WebSocketLog.id) > self._last_key)
+        return statement.offset(self._offset) if self._offset else statement
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        """
+        Fetch the next chunk of messages.
+
+        Returns:
+            List of message dictionaries with their '_db_timestamp', empty when exhausted
+        """
+        if self._exhausted:
+            return []
+        db: Session = SessionLocal()
+        try:
+            rows = db.execute(self._statement()).all()
+        finally:
+            db.close()
+
+        if len(rows) < self.chunk_size:
+            self._exhausted = True
+        messages = []
+        for message_data, created_at, log_id in rows:
+            message = dict(message_data)
+            message['_db_timestamp'] = created_at.isoformat()
+            messages.append(message)
+            self._last_key = (created_at, log_id)
+        return messages
+
+    def close(self) -> None:
+        """Stop reading (each chunk already released its connection)"""
+        self._exhausted = True
+
+
+async def get_final_websocket_message(tender_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve the final result (or error) message of a tender's investigation.
+
+    Args:
+        tender_id: The tender ID to retrieve the message for
+
+    Returns:
+        The last "result"/"error" message, or the last message if there is none
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            base = select(WebSocketLog.message_data).where(WebSocketLog.tender_id == tender_id)
+            newest_first = (WebSocketLog.created_at.desc(), WebSocketLog.id.desc())
+            message = (await db.execute(
+                base.where(WebSocketLog.message_data["type"].astext.in_(["result", "error"]))
+                .order_by(*newest_first)
+                .limit(1)
+            )).scalar()
+            if message is None:
+                message = (await db.execute(base.order_by(*newest_first).limit(1))).scalar()
+            return dict(message) if message is not None else None
+    except Exception as e:
+        logger.error(f"Error retrieving final websocket message for tender {tender_id}: {e}", exc_info=True)
+        return None
+
+
+def delete_websocket_messages(tender_id: str) -> int:
+    """
+    Delete every saved websocket message of a tender.
+
+    Used for runs that must not be replayed (e.g. cancelled investigations), so
+    the next request for the tender runs the investigation again.
+
+    Args:
+        tender_id: The tender ID to delete messages for
+
+    Returns:
+        Number of deleted messages
+    """
+    db: Session = SessionLocal()
+    try:
+        deleted = db.execute(delete(WebSocketLog).where(WebSocketLog.tender_id == tender_id)).rowcount
+        db.commit()
+        return deleted
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error deleting websocket messages for tender {tender_id}: {e}", exc_info=True)
+        return 0
+    finally:
+        db.close()
+
+
+async def has_websocket_messages(tender_id: str) -> bool:
     """
     Check if any websocket messages exist for a given tender_id.
     
@@ -84,15 +362,12 @@ def has_websocket_messages(tender_id: str) -> bool:
     Returns:
         True if messages exist, False otherwise
     """
-    db: Session = SessionLocal()
     try:
-        count = db.query(WebSocketLog).filter(
-            WebSocketLog.tender_id == tender_id
-        ).count()
-        return count > 0
+        async with AsyncSessionLocal() as db:
+            # EXISTS stops at the first matching row of the (tender_id, created_at) index
+            return (await db.execute(
+                select(exists().where(WebSocketLog.tender_id == tender_id))
+            )).scalar()
     except Exception as e:
         logger.error(f"Error checking websocket messages for tender {tender_id}: {e}", exc_info=True)
         return False
-    finally:
-        db.close()
-
@@ -1,10 +1,13 @@
 """
 Tool for generating structured task plans from user requests
 """
+from typing import Optional
+
 from pydantic import BaseModel, Field
 from langchain.tools import tool
 
 from app.agents.plan_agent import PlanAgent
+from app.utils.task_plans import get_plan_cache, get_task_plan, plan_key
 
 
 class GetPlanInput(BaseModel):
@@ -12,26 +15,38 @@ class GetPlanInput(BaseModel):
     user_request: str = Field(
         description="The user's request or objective that needs to be broken down into a structured plan"
     )
+    task_code: Optional[str] = Field(
+        default=None,
+        description="Code of the investigation task (e.g. 'H-07'); known codes return a precomputed plan"
+    )
+    tender_id: Optional[str] = Field(
+        default=None,
+        description="Tender code (e.g. '1234-56-LR22'), used to reuse plans generated for the same tender type"
+    )
 
 
 @tool(args_schema=GetPlanInput)
-def get_plan(user_request: str) -> dict:
-    """Create investigation plan for tender analysis. Call this FIRST.
+def get_plan(user_request: str, task_code: str = None, tender_id: str = None) -> dict:
+    """Create investigation plan for tender analysis. Only needed when the task message has no plan.
 
     Args:
         user_request: Tender details and red flags to investigate
+        task_code: Code of the investigation task, if any
+        tender_id: Tender code, if known
 
     Returns:
         dict: List of investigation tasks
     """
-    # Initialize the planning agent
-    plan_agent = PlanAgent()
-
-    # Generate the plan
-    plan_output = plan_agent.run(user_request)
+    steps = get_task_plan(task_code)
+    if steps is None:
+        # Unknown task: one PlanAgent call per (task code, tender type)
+        steps = get_plan_cache().get_or_create(
+            plan_key(task_code, tender_id, user_request),
+            lambda: PlanAgent().run(user_request).steps,
+        )
 
     # Return structured result
     return {
-        "steps": plan_output.steps,
-        "total_steps": len(plan_output.steps)
+        "steps": steps,
+        "total_steps": len(steps)
     }
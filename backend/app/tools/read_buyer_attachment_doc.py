@@ -1,7 +1,9 @@
 import base64
 import os
 import tempfile
+import threading
 import time
+from typing import Tuple
 from pydantic import BaseModel, Field
 from langchain.tools import tool
 
@@ -36,6 +38,60 @@ class ReadBuyerAttachmentDocInput(BaseModel):
     )
 
 
+def load_buyer_attachment(tender_id: str, row_id: int) -> Tuple[bytes, str, bool]:
+    """
+    Load a buyer attachment from the local file cache, downloading it if needed.
+
+    Shared by read_buyer_attachment_doc and the evidence prefetch stage, so files
+    downloaded ahead of time are found by the agents.
+
+    Args:
+        tender_id: Tender ID
+        row_id: Attachment ID from read_buyer_attachments_table
+
+    Returns:
+        (file content, MIME type, whether it came from the cache)
+    """
+    temp_dir = tempfile.gettempdir()
+    temp_subdir = os.path.join(temp_dir, "mercado_publico_buyer_attachments")
+    os.makedirs(temp_subdir, exist_ok=True)
+
+    # Try to find cached file with common extensions
+    common_extensions = [".pdf", ".docx", ".doc"]
+    for ext in common_extensions:
+        cache_path = os.path.join(temp_subdir, f"{tender_id}_{row_id}{ext}")
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                file_content = f.read()
+            # Detect type from cached file
+            try:
+                mime_type = detect_file_type(file_content)
+            except Exception as e:
+                print(f"Warning: Could not detect file type from cache, defaulting to PDF: {e}")
+                mime_type = "application/pdf"
+            return file_content, mime_type, True
+
+    # Not cached: download and detect type
+    file_content = _download_buyer_attachment(tender_id, row_id)
+    try:
+        mime_type = detect_file_type(file_content)
+        file_extension = get_file_extension_from_mime(mime_type)
+    except Exception as e:
+        # Fallback to PDF if detection fails
+        print(f"Warning: Could not detect file type, defaulting to PDF: {e}")
+        mime_type = "application/pdf"
+        file_extension = ".pdf"
+
+    # Save to cache with correct extension (atomically: other agents may read it concurrently)
+    cache_path = os.path.join(temp_subdir, f"{tender_id}_{row_id}{file_extension}")
+    partial_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(partial_path, 'wb') as f:
+        f.write(file_content)
+    os.replace(partial_path, cache_path)
+
+    return file_content, mime_type, False
+
+
 @tool(args_schema=ReadBuyerAttachmentDocInput)
 def read_buyer_attachment_doc(
     tender_id: str,
@@ -55,52 +111,8 @@ def read_buyer_attachment_doc(
         dict: {text, total_pages, pages_read, file_size, success, error?}
     """
     try:
-        temp_dir = tempfile.gettempdir()
-        temp_subdir = os.path.join(temp_dir, "mercado_publico_buyer_attachments")
-        os.makedirs(temp_subdir, exist_ok=True)
-        
-        # Try to find cached file with common extensions
-        common_extensions = [".pdf", ".docx", ".doc"]
-        cached = False
-        file_content = None
-        file_extension = None
-        
-        for ext in common_extensions:
-            cache_filename = f"{tender_id}_{row_id}{ext}"
-            cache_path = os.path.join(temp_subdir, cache_filename)
-            if os.path.exists(cache_path):
-                cached = True
-                with open(cache_path, 'rb') as f:
-                    file_content = f.read()
-                file_extension = ext
-                break
-        
-        # If not cached, download and detect type
-        if file_content is None:
-            file_content = _download_buyer_attachment(tender_id, row_id)
-            # Detect file type
-            try:
-                mime_type = detect_file_type(file_content)
-                file_extension = get_file_extension_from_mime(mime_type)
-            except Exception as e:
-                # Fallback to PDF if detection fails
-                print(f"Warning: Could not detect file type, defaulting to PDF: {e}")
-                mime_type = "application/pdf"
-                file_extension = ".pdf"
-            
-            # Save to cache with correct extension
-            cache_filename = f"{tender_id}_{row_id}{file_extension}"
-            cache_path = os.path.join(temp_subdir, cache_filename)
-            with open(cache_path, 'wb') as f:
-                f.write(file_content)
-        else:
-            # Detect type from cached file
-            try:
-                mime_type = detect_file_type(file_content)
-            except Exception as e:
-                print(f"Warning: Could not detect file type from cache, defaulting to PDF: {e}")
-                mime_type = "application/pdf"
-        
+        file_content, mime_type, cached = load_buyer_attachment(tender_id, row_id)
+
         file_size = len(file_content)
         
         # Try local extraction for DOCX files
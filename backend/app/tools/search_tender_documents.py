@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from langchain.tools import tool
+
+from app.config import settings
+from app.utils.document_index import search_documents
+
+
+class SearchTenderDocumentsInput(BaseModel):
+    """Input schema for the search_tender_documents tool."""
+    tender_id: str = Field(
+        description="The tender ID (licitación ID) from Mercado Público"
+    )
+    query: str = Field(
+        description="What to look for, e.g. 'garantía de fiel cumplimiento' or 'criterios de evaluación plazo de entrega'"
+    )
+    k: int = Field(
+        default=settings.document_search_default_k,
+        description="Maximum number of results to return"
+    )
+
+
+@tool(args_schema=SearchTenderDocumentsInput)
+def search_tender_documents(tender_id: str, query: str, k: int = settings.document_search_default_k) -> dict:
+    """Search the already extracted text of the tender documents. Use it to find which document and page covers a clause before reading pages.
+
+    Args:
+        tender_id: Tender ID
+        query: Keywords or a description of the clause to find
+        k: Maximum number of results
+
+    Returns:
+        dict: {results: [{row_id, page, score, snippet}], indexed_pages, indexed_documents, note}
+    """
+    k = max(1, min(k, settings.document_search_max_k))
+    result = search_documents(tender_id, query, k)
+    result["note"] = (
+        "Only pages already extracted (OCR or DOCX) are indexed. Read more pages with "
+        "read_buyer_attachment_doc to make them searchable."
+    )
+    return result
@@ -2,7 +2,6 @@
 Helper function to build RankingInput from TenderResponse and documents
 """
 from typing import Dict, Any, List, Optional
-import asyncio
 from datetime import datetime
 from app.utils.get_tender import TenderResponse
 from app.schemas import RankingInput
@@ -134,11 +133,11 @@ def _send_log(session_id: Optional[str], message: str):
     """
     if session_id:
         try:
-            asyncio.run(manager.send_observation(session_id, {
+            manager.publish(session_id, {
                 "type": "log",
                 "message": message,
                 "timestamp": datetime.now().isoformat()
-            }))
+            })
         except Exception as e:
             import traceback
             print(f"Failed to send log to WebSocket: {e}")
@@ -148,7 +147,8 @@ def _send_log(session_id: Optional[str], message: str):
 def fetch_and_extract_documents(
     tender_id: str,
     max_docs: int = 3,
-    session_id: Optional[str] = None
+    session_id: Optional[str] = None,
+    attachments: Optional[List[Any]] = None
 ) -> List[Dict[str, Any]]:
     """
     Fetch and extract content from tender documents.
@@ -157,6 +157,7 @@ def fetch_and_extract_documents(
         tender_id: Tender ID
         max_docs: Maximum number of documents to fetch (default 3)
         session_id: Optional session ID for WebSocket streaming
+        attachments: Buyer attachments table if already read (read here otherwise)
 
     Returns:
         List of documents with extracted content (may be empty if no docs available)
@@ -168,7 +169,8 @@ def fetch_and_extract_documents(
 
     try:
         # Get list of attachments
-        attachments = _read_buyer_attachments_table(tender_id)
+        if attachments is None:
+            attachments = _read_buyer_attachments_table(tender_id)
 
         # Handle case where attachments is None or not a list
         if not attachments:
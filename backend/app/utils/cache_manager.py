@@ -1,9 +1,10 @@
 """
-Cache Manager - Unified caching system for OCR results, HTML pages, and documents
+Cache Manager - Unified caching system for OCR results, HTML pages, documents and LLM responses
 """
 import os
 import json
 import hashlib
+import threading
 import tempfile
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
@@ -11,7 +12,7 @@ from pathlib import Path
 
 
 class CacheManager:
-    """Manages caching for OCR results, HTML pages, and documents"""
+    """Manages caching for OCR results, HTML pages, documents and LLM responses"""
 
     def __init__(self, base_dir: Optional[str] = None):
         """
@@ -27,11 +28,13 @@ class CacheManager:
         self.ocr_dir = self.base_dir / "ocr"
         self.html_dir = self.base_dir / "html"
         self.docs_dir = self.base_dir / "docs"
+        self.llm_dir = self.base_dir / "llm"
 
         # Create directories if they don't exist
         self.ocr_dir.mkdir(parents=True, exist_ok=True)
         self.html_dir.mkdir(parents=True, exist_ok=True)
         self.docs_dir.mkdir(parents=True, exist_ok=True)
+        self.llm_dir.mkdir(parents=True, exist_ok=True)
 
     def _get_url_hash(self, url: str) -> str:
         """Generate hash for URL to use as cache key"""
@@ -122,6 +125,39 @@ class CacheManager:
         for page_num, text in results.items():
             self.set_ocr_result(tender_id, row_id, page_num, text)
 
+    def get_ocr_results_for_tender(self, tender_id: str) -> Dict[tuple[int, int], str]:
+        """
+        Get every cached OCR page of a tender
+
+        Args:
+            tender_id: Tender ID
+
+        Returns:
+            Dictionary mapping (row_id, page_num) to cached text
+        """
+        prefix = f"{tender_id}_"
+        results = {}
+        for cache_file in self.ocr_dir.glob(f"{tender_id}_*_page_*.json"):
+            row_part, _, page_part = cache_file.stem[len(prefix):].partition("_page_")
+            if not (row_part.isdigit() and page_part.isdigit()):
+                continue
+            text = self.get_ocr_result(tender_id, int(row_part), int(page_part))
+            if text:
+                results[(int(row_part), int(page_part))] = text
+        return results
+
+    def count_ocr_results_for_tender(self, tender_id: str) -> int:
+        """
+        Count the cached OCR pages of a tender (without reading them)
+
+        Args:
+            tender_id: Tender ID
+
+        Returns:
+            Number of cached pages
+        """
+        return sum(1 for _ in self.ocr_dir.glob(f"{tender_id}_*_page_*.json"))
+
     # HTML Cache Methods
     def get_html(self, url: str, max_age_seconds: int = 3600) -> Optional[str]:
         """
@@ -221,6 +257,61 @@ class CacheManager:
         with open(cache_file, 'wb') as f:
             f.write(content)
 
+    # LLM Response Cache Methods
+    def get_llm_response(self, scope: str, key: str, max_age_seconds: int) -> Optional[list]:
+        """
+        Get a cached LLM response
+
+        Args:
+            scope: Cache scope (tender ID, or "global")
+            key: Hash of the normalized request
+            max_age_seconds: Maximum age of cache in seconds
+
+        Returns:
+            Serialized generations if available and not expired, None otherwise
+        """
+        cache_file = self.llm_dir / f"{scope}_{key}.json"
+
+        if not cache_file.exists():
+            return None
+
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            cached_at = datetime.fromisoformat(data['cached_at'])
+            age = (datetime.utcnow() - cached_at).total_seconds()
+
+            if age > max_age_seconds:
+                cache_file.unlink(missing_ok=True)
+                return None
+
+            return data.get('generations')
+        except (json.JSONDecodeError, IOError, KeyError, ValueError):
+            return None
+
+    def set_llm_response(self, scope: str, key: str, generations: list):
+        """
+        Cache an LLM response
+
+        Args:
+            scope: Cache scope (tender ID, or "global")
+            key: Hash of the normalized request
+            generations: Serialized generations
+        """
+        cache_file = self.llm_dir / f"{scope}_{key}.json"
+
+        data = {
+            'generations': generations,
+            'cached_at': datetime.utcnow().isoformat()
+        }
+
+        # Atomic write: parallel agents may read the same entry
+        partial_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.part")
+        with open(partial_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(partial_file, cache_file)
+
     # Cache Management Methods
     def cleanup_old_cache(self, max_age_hours: int = 24):
         """
@@ -231,7 +322,7 @@ class CacheManager:
         """
         cutoff_time = datetime.utcnow() - timedelta(hours=max_age_hours)
 
-        for directory in [self.ocr_dir, self.html_dir, self.docs_dir]:
+        for directory in [self.ocr_dir, self.html_dir, self.docs_dir, self.llm_dir]:
             for file_path in directory.glob("*"):
                 if file_path.is_file():
                     # Check file modification time
@@ -263,6 +354,13 @@ class CacheManager:
             except OSError:
                 pass
 
+        # Clear LLM responses scoped to the tender
+        for file_path in self.llm_dir.glob(f"{tender_id}_*"):
+            try:
+                file_path.unlink()
+            except OSError:
+                pass
+
     def get_cache_stats(self) -> Dict[str, Any]:
         """
         Get statistics about cache usage
@@ -283,6 +381,8 @@ class CacheManager:
             'html_size_mb': get_size(self.html_dir) / (1024 * 1024),
             'docs_files': count_files(self.docs_dir),
             'docs_size_mb': get_size(self.docs_dir) / (1024 * 1024),
+            'llm_files': count_files(self.llm_dir),
+            'llm_size_mb': get_size(self.llm_dir) / (1024 * 1024),
         }
 
 
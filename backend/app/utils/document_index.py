@@ -0,0 +1,330 @@
+"""
+Document Index - Per-tender search index over extracted document text
+
+Agents used to look for specific clauses (criteria, guarantees, deadlines,
+"Bases Técnicas") by reading documents page range by page range. The index
+splits every extracted page of a tender (OCR results and local DOCX
+extraction, as stored by the CacheManager) into overlapping chunks anchored to
+(row_id, page) and ranks them with BM25, so the search_tender_documents tool
+can point agents straight at the relevant pages.
+
+Local embeddings can be blended in (reciprocal rank fusion with BM25) by setting
+document_search_embedding_model to a sentence-transformers model; the package
+is optional and BM25 alone is used when it is not installed.
+"""
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List
+import logging
+import math
+import re
+import threading
+import unicodedata
+
+from app.config import settings
+from app.utils.cache_manager import get_cache_manager
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+# Reciprocal rank fusion constant for hybrid (BM25 + embeddings) ranking
+RRF_K = 60
+# Tender indexes kept in memory
+MAX_CACHED_INDEXES = 32
+
+STOPWORDS = {
+    "a", "al", "ante", "con", "como", "de", "del", "el", "en", "entre", "es", "la", "las",
+    "lo", "los", "o", "para", "por", "que", "se", "sin", "su", "sus", "un", "una", "y",
+    "the", "of", "and", "to", "in", "for",
+}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into normalized search terms.
+
+    Lowercases, strips accents, drops stopwords and reduces simple plurals,
+    so "Garantías" and "garantia" match.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms
+    """
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+    terms = []
+    for token in TOKEN_PATTERN.findall(normalized):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith("es"):
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def chunk_page(text: str, chunk_words: int, overlap_words: int) -> List[str]:
+    """
+    Split a page into overlapping word windows.
+
+    Args:
+        text: Page text
+        chunk_words: Words per chunk
+        overlap_words: Words shared by consecutive chunks
+
+    Returns:
+        List of chunk texts (a short page is a single chunk)
+    """
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [" ".join(words)] if words else []
+    step = max(1, chunk_words - overlap_words)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+class DocumentIndex:
+    """
+    BM25 index of page-anchored chunks for one tender.
+
+    Usage:
+        index = DocumentIndex("1234-56-LR22")
+        index.add_page(row_id=0, page=3, text="...")
+        index.build()
+        hits = index.search("garantía de fiel cumplimiento", k=5)
+    """
+
+    def __init__(self, tender_id: str, chunk_words: int = None, overlap_words: int = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            tender_id: Tender ID
+            chunk_words: Words per chunk (default from config)
+            overlap_words: Words shared by consecutive chunks (default from config)
+        """
+        self.tender_id = tender_id
+        self.chunk_words = chunk_words or settings.document_search_chunk_words
+        self.overlap_words = settings.document_search_overlap_words if overlap_words is None else overlap_words
+        self.page_count = 0
+        self.chunks: List[Dict[str, Any]] = []
+        self._term_counts: List[Counter] = []
+        self._document_frequency: Counter = Counter()
+        self._average_length = 0.0
+        self._embeddings = None
+
+    def add_page(self, row_id: int, page: int, text: str) -> None:
+        """
+        Add one extracted page to the index.
+
+        Args:
+            row_id: Attachment row ID
+            page: Page number (1-indexed)
+            text: Extracted page text
+        """
+        self.page_count += 1
+        for chunk in chunk_page(text, self.chunk_words, self.overlap_words):
+            self.chunks.append({"row_id": row_id, "page": page, "text": chunk})
+
+    def build(self) -> "DocumentIndex":
+        """Compute term statistics (and embeddings, if configured) after adding pages"""
+        self._term_counts = [Counter(tokenize(chunk["text"])) for chunk in self.chunks]
+        self._document_frequency = Counter()
+        for counts in self._term_counts:
+            self._document_frequency.update(counts.keys())
+        lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+        model = _embedding_model()
+        if model is not None and self.chunks:
+            self._embeddings = model.encode(
+                [chunk["text"] for chunk in self.chunks], normalize_embeddings=True
+            )
+        return self
+
+    def bm25_scores(self, query: str) -> List[float]:
+        """
+        Score every chunk against a query with Okapi BM25.
+
+        Args:
+            query: Search query
+
+        Returns:
+            One score per chunk, in index order
+        """
+        terms = set(tokenize(query))
+        total = len(self.chunks)
+        scores = []
+        for counts in self._term_counts:
+            length = sum(counts.values())
+            score = 0.0
+            for term in terms:
+                frequency = counts.get(term)
+                if not frequency:
+                    continue
+                df = self._document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                norm = K1 * (1 - B + B * length / (self._average_length or 1))
+                score += idf * frequency * (K1 + 1) / (frequency + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most relevant to a query.
+
+        Args:
+            query: Search query (keywords or a clause description)
+            k: Maximum number of results
+
+        Returns:
+            Results ordered by relevance, each with row_id, page, score and text
+        """
+        if not self.chunks:
+            return []
+
+        scores = self.bm25_scores(query)
+        ranked = [index for index in sorted(range(len(scores)), key=lambda i: -scores[i]) if scores[index] > 0]
+
+        model = _embedding_model() if self._embeddings is not None else None
+        if model is not None:
+            query_embedding = model.encode([query], normalize_embeddings=True)[0]
+            similarity = self._embeddings @ query_embedding
+            semantic = sorted(range(len(self.chunks)), key=lambda i: -similarity[i])
+            fused = Counter()
+            for rank, index in enumerate(ranked):
+                fused[index] += 1 / (RRF_K + rank + 1)
+            for rank, index in enumerate(semantic):
+                fused[index] += 1 / (RRF_K + rank + 1)
+            ranked = [index for index, _ in fused.most_common()]
+            scores = [fused[index] for index in range(len(self.chunks))]
+
+        return [
+            {**self.chunks[index], "score": round(float(scores[index]), 4)}
+            for index in ranked[:k]
+        ]
+
+
+_embedding_state = {"model": None, "loaded": False}
+_embedding_lock = threading.Lock()
+
+
+def _embedding_model():
+    """Load the optional sentence-transformers model once (None if not configured or installed)"""
+    if not settings.document_search_embedding_model:
+        return None
+    with _embedding_lock:
+        if not _embedding_state["loaded"]:
+            _embedding_state["loaded"] = True
+            try:
+                from sentence_transformers import SentenceTransformer
+
+                _embedding_state["model"] = SentenceTransformer(settings.document_search_embedding_model)
+            except Exception as e:
+                logger.warning(f"Document search embeddings disabled, using BM25 only: {e}")
+        return _embedding_state["model"]
+
+
+_indexes: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def build_document_index(tender_id: str) -> DocumentIndex:
+    """
+    Build the index of a tender from its cached extracted pages.
+
+    Args:
+        tender_id: Tender ID
+
+    Returns:
+        Built DocumentIndex
+    """
+    index = DocumentIndex(tender_id)
+    pages = get_cache_manager().get_ocr_results_for_tender(tender_id)
+    for (row_id, page), text in sorted(pages.items()):
+        index.add_page(row_id, page, text)
+    return index.build()
+
+
+def get_document_index(tender_id: str) -> DocumentIndex:
+    """
+    Get the index of a tender, rebuilding it when new pages were extracted.
+
+    Agents keep extracting pages during an investigation, so the cached index
+    is reused only while the number of extracted pages is unchanged.
+
+    Args:
+        tender_id: Tender ID
+
+    Returns:
+        DocumentIndex covering every page extracted so far
+    """
+    page_count = get_cache_manager().count_ocr_results_for_tender(tender_id)
+    with _indexes_lock:
+        index = _indexes.get(tender_id)
+        if index is not None and index.page_count == page_count:
+            _indexes.move_to_end(tender_id)
+            return index
+
+    index = build_document_index(tender_id)
+    with _indexes_lock:
+        _indexes[tender_id] = index
+        _indexes.move_to_end(tender_id)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def search_documents(tender_id: str, query: str, k: int = 5) -> Dict[str, Any]:
+    """
+    Search a tender's extracted documents.
+
+    Args:
+        tender_id: Tender ID
+        query: Search query
+        k: Maximum number of results
+
+    Returns:
+        dict: {results: [{row_id, page, score, snippet}], indexed_pages, indexed_documents}
+    """
+    index = get_document_index(tender_id)
+    results = [
+        {
+            "row_id": hit["row_id"],
+            "page": hit["page"],
+            "score": hit["score"],
+            "snippet": _snippet(hit["text"], query),
+        }
+        for hit in index.search(query, k)
+    ]
+    return {
+        "results": results,
+        "indexed_pages": index.page_count,
+        "indexed_documents": sorted({chunk["row_id"] for chunk in index.chunks}),
+    }
+
+
+def _snippet(text: str, query: str, length: int = None) -> str:
+    """Cut a chunk around the first query term it contains"""
+    length = length or settings.document_search_snippet_chars
+    if len(text) <= length:
+        return text
+    terms = tokenize(query)
+    lowered = unicodedata.normalize("NFKD", text.lower())
+    lowered = "".join(char for char in lowered if not unicodedata.combining(char))
+    positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    # Only valid as an offset into text when stripping accents kept the length
+    start = min(positions) if positions and len(lowered) == len(text) else 0
+    start = max(0, start - length // 4)
+    snippet = text[start:start + length]
+    return ("..." if start > 0 else "") + snippet + ("..." if start + length < len(text) else "")
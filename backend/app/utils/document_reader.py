@@ -2,6 +2,7 @@
 Utility functions for document type detection and local text extraction.
 """
 import io
+import re
 from typing import Dict, Optional, Any
 import puremagic
 from docx import Document
@@ -143,3 +144,31 @@ def extract_text_locally(file_content: bytes, file_type: str) -> Dict[str, Any]:
         "error": f"Local extraction not supported for {file_type}"
     }
 
+
+
+def count_pdf_pages(file_content: bytes) -> Optional[int]:
+    """
+    Estimate the number of pages of a PDF without parsing it.
+
+    Reads the /Count of the page tree roots, falling back to counting /Page
+    objects. PDFs whose page tree is inside compressed object streams give None.
+
+    Args:
+        file_content: Raw PDF content as bytes
+
+    Returns:
+        Number of pages, or None if it could not be determined
+    """
+    counts = [
+        int(match.group(1))
+        for match in re.finditer(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)", file_content)
+    ]
+    counts += [
+        int(match.group(1))
+        for match in re.finditer(rb"/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", file_content)
+    ]
+    if counts:
+        return max(counts)
+
+    pages = len(re.findall(rb"/Type\s*/Page\b", file_content))
+    return pages or None
@@ -0,0 +1,298 @@
+"""
+Postgres LISTEN/NOTIFY backplane for websocket events across processes
+
+ConnectionManager only knows the sockets connected to its own process. With
+several uvicorn workers (or a separate job worker running workflows), the
+process that publishes a session event is not necessarily the one holding the
+client's socket. The backplane broadcasts every published event on a Postgres
+NOTIFY channel, and each server process LISTENs and delivers the events for
+the sessions it holds.
+
+NOTIFY payloads are limited to 8000 bytes, so events are split into chunks
+that listeners reassemble. Each chunk is prefixed with a header:
+
+    <origin>:<message id>:<chunk index>:<chunk count>:<data>
+
+Processes ignore their own notifications; local clients are served directly.
+
+Control commands (cancel an investigation, seek or skip a replay) travel on the
+same channel. The API applies a command locally when the session runs in its
+own process; otherwise it broadcasts the command and waits for the process
+that holds the session to acknowledge it, so any worker can serve the request.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import json
+import logging
+import queue
+import threading
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Stay well below the 8000-byte NOTIFY payload limit, leaving room for the header
+MAX_CHUNK_SIZE = 7500
+# Incomplete messages kept for reassembly before the oldest are discarded
+MAX_PENDING_MESSAGES = 1000
+
+
+class PostgresBackplane:
+    """
+    Cross-process pub/sub for session events over Postgres LISTEN/NOTIFY.
+
+    Publishing is non-blocking and works from any thread: chunks are queued and a
+    background thread sends them in batches, one transaction per batch. Listening
+    runs on the server event loop with a dedicated asyncpg connection that is
+    re-opened if it drops.
+
+    Usage:
+        backplane = PostgresBackplane()
+        backplane.publish(session_id, event)                          # any process, any thread
+        await backplane.start(manager.deliver_remote, apply_control)  # server processes only
+        await backplane.request(session_id, {"action": "cancel"})     # server loop only
+    """
+
+    def __init__(self, channel: str = None, batch_size: int = 100, max_chunk_size: int = MAX_CHUNK_SIZE):
+        """
+        Initialize the backplane (the publisher thread starts on first use).
+
+        Args:
+            channel: NOTIFY channel name (default from config)
+            batch_size: Maximum queued events sent per transaction
+            max_chunk_size: Maximum data characters per notification
+        """
+        self.channel = channel or settings.websocket_backplane_channel
+        self.batch_size = batch_size
+        self.max_chunk_size = max_chunk_size
+        self.origin = uuid.uuid4().hex[:12]
+        self.dropped = 0
+
+        self._message_ids = itertools.count()
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.websocket_log_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self._pending: Dict[Tuple[str, str], List[Optional[str]]] = {}
+        self._on_event: Optional[Callable[[str, dict], None]] = None
+        self._on_control: Optional[Callable[[str, dict], bool]] = None
+        self._listen_task: Optional[asyncio.Task] = None
+        # Control requests sent by this process, waiting for an acknowledgement
+        self._requests: Dict[str, asyncio.Future] = {}
+
+    # Publishing
+
+    def encode(self, session_id: str, event: dict) -> List[str]:
+        """
+        Split an event into notification payloads.
+
+        Args:
+            session_id: The session the event belongs to
+            event: The event to broadcast (JSON-serializable)
+
+        Returns:
+            List of payloads, in order
+        """
+        return self._encode_message({"s": session_id, "e": event})
+
+    def _encode_message(self, message: Dict[str, Any]) -> List[str]:
+        """Split an event, control command or acknowledgement into notification payloads"""
+        # ensure_ascii keeps one byte per character, so chunk sizes are byte sizes
+        data = json.dumps(message, default=str, ensure_ascii=True)
+        message_id = next(self._message_ids)
+        pieces = [data[i:i + self.max_chunk_size] for i in range(0, len(data), self.max_chunk_size)]
+        return [
+            f"{self.origin}:{message_id}:{index}:{len(pieces)}:{piece}"
+            for index, piece in enumerate(pieces)
+        ]
+
+    def publish(self, session_id: str, event: dict) -> None:
+        """
+        Broadcast an event to the other processes without blocking.
+
+        Args:
+            session_id: The session the event belongs to
+            event: The event to broadcast (JSON-serializable)
+        """
+        self._enqueue(self.encode(session_id, event), session_id)
+
+    def _enqueue(self, payloads: List[str], session_id: str) -> None:
+        """Queue payloads for the publisher thread without blocking"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(payloads)
+        except queue.Full:
+            self.dropped += 1
+            logger.error(f"Backplane buffer full, dropping message for session {session_id}")
+
+    async def request(self, session_id: str, command: Dict[str, Any], timeout: float = None) -> bool:
+        """
+        Send a control command to the process that holds a session.
+
+        Must be called on the server event loop, with the listener started.
+
+        Args:
+            session_id: The session the command is for
+            command: Command for the control handler (e.g. {"action": "cancel"})
+            timeout: Seconds to wait for an acknowledgement (default from config)
+
+        Returns:
+            True if a process applied the command, False if none acknowledged it in time
+        """
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        try:
+            self._enqueue(self._encode_message({"s": session_id, "c": command, "r": request_id}), session_id)
+            return await asyncio.wait_for(
+                future, timeout=timeout or settings.websocket_backplane_control_timeout
+            )
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._requests.pop(request_id, None)
+
+    def _ensure_started(self):
+        """Start the background publisher thread if it is not running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="websocket-backplane-publisher", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        """Background loop: send queued payloads in batches"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._notify([payload for payloads in batch for payload in payloads])
+
+    def _notify(self, payloads: List[str]) -> None:
+        """Send payloads with one statement; notifications are delivered in order on commit"""
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                    {"channel": self.channel, "payloads": payloads},
+                )
+        except Exception as e:
+            logger.error(f"Failed to broadcast {len(payloads)} backplane notifications: {e}", exc_info=True)
+
+    # Listening
+
+    def receive(self, payload: str) -> None:
+        """
+        Handle one notification, delivering the event once all its chunks arrived.
+
+        Args:
+            payload: Raw notification payload
+        """
+        try:
+            origin, message_id, index, count, piece = payload.split(":", 4)
+            index, count = int(index), int(count)
+        except ValueError:
+            logger.warning(f"Ignoring malformed backplane notification on {self.channel}")
+            return
+
+        if origin == self.origin:
+            return
+
+        if count == 1:
+            data = piece
+        else:
+            key = (origin, message_id)
+            chunks = self._pending.setdefault(key, [None] * count)
+            chunks[index] = piece
+            if any(chunk is None for chunk in chunks):
+                if len(self._pending) > MAX_PENDING_MESSAGES:
+                    self._pending.pop(next(iter(self._pending)))
+                return
+            del self._pending[key]
+            data = "".join(chunks)
+
+        try:
+            message = json.loads(data)
+            if "e" in message:
+                if self._on_event is not None:
+                    self._on_event(message["s"], message["e"])
+            elif "c" in message:
+                self._receive_control(message)
+            elif "a" in message:
+                future = self._requests.get(message["a"])
+                if future is not None and not future.done():
+                    future.set_result(True)
+        except Exception as e:
+            logger.error(f"Failed to deliver backplane message: {e}", exc_info=True)
+
+    def _receive_control(self, message: Dict[str, Any]) -> None:
+        """Apply a control command if this process holds the session, and acknowledge it"""
+        if self._on_control is None or not self._on_control(message["s"], message["c"]):
+            return
+        self._enqueue(self._encode_message({"a": message["r"]}), message["s"])
+
+    async def start(
+        self,
+        on_event: Callable[[str, dict], None],
+        on_control: Callable[[str, dict], bool] = None,
+    ) -> None:
+        """
+        Start listening on the server event loop.
+
+        Args:
+            on_event: Called on the loop with (session_id, event) for every remote event
+            on_control: Called on the loop with (session_id, command) for every remote
+                control command; returns True if this process applied it
+        """
+        self._on_event = on_event
+        self._on_control = on_control
+        self._listen_task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        """Stop listening"""
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+            self._listen_task = None
+
+    async def _listen_forever(self):
+        """Keep a LISTEN connection open, reconnecting when it drops"""
+        # Imported here so processes without the backplane enabled never load the listener driver
+        import asyncpg
+
+        dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _connection: closed.set())
+                await connection.add_listener(
+                    self.channel,
+                    lambda _connection, _pid, _channel, payload: self.receive(payload),
+                )
+                logger.info(f"Listening for websocket events on channel {self.channel}")
+                await closed.wait()
+                logger.warning("Backplane connection closed, reconnecting")
+            except asyncio.CancelledError:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.error(f"Backplane listener error: {e}", exc_info=True)
+            await asyncio.sleep(settings.websocket_backplane_reconnect_delay)
@@ -0,0 +1,225 @@
+"""
+Evidence Prefetch - Warm documents and award data while tasks are being ranked
+
+Task agents discover evidence lazily: each document or award lookup is an
+LLM -> tool -> LLM hop on the agent's critical path. The prefetch stage runs in
+parallel with ranking_node and, before any investigation branch starts:
+- downloads every buyer attachment into the file cache used by
+  read_buyer_attachment_doc
+- runs local text extraction (DOCX) and metadata probes (type, size, pages);
+  extracted DOCX text is cached like OCR pages so search_tender_documents finds it
+- fetches the award result (main page, award modal and provider details)
+
+Results are also seeded into the investigation's EvidenceStore, so the agents'
+first calls to read_buyer_attachments_table and read_award_result are hits.
+The document inventory is listed in the agents' shared system prompt.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import json
+import logging
+
+from langchain.messages import ToolMessage
+
+from app.config import settings
+from app.tools.read_award_result import read_award_result
+from app.tools.read_buyer_attachment_doc import load_buyer_attachment
+from app.utils.cache_manager import get_cache_manager
+from app.utils.document_reader import (
+    count_pdf_pages,
+    extract_text_locally,
+    get_file_extension_from_mime,
+)
+from app.utils.evidence_store import EvidenceStore, evidence_key, is_storable_evidence
+from app.utils.investigation_budget import InvestigationBudget
+from app.utils.task_feasibility import normalize_attachments
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class EvidencePrefetcher:
+    """
+    Downloads and probes a tender's documents and award data ahead of the agents.
+
+    Every step is best effort: failures are recorded in the inventory and the
+    agents fall back to fetching on demand. Downloads are charged to the
+    investigation budget as outbound requests and stop when it is exhausted
+    or cancelled.
+
+    Usage:
+        prefetcher = EvidencePrefetcher(tender_id, store=evidence, budget=budget)
+        inventory = prefetcher.run(attachments_table)
+    """
+
+    def __init__(
+        self,
+        tender_id: str,
+        store: Optional[EvidenceStore] = None,
+        budget: Optional[InvestigationBudget] = None,
+        max_documents: int = None,
+        max_workers: int = None,
+    ):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            tender_id: Tender ID
+            store: Optional evidence store to seed with the prefetched tool results
+            budget: Optional investigation budget charged for each download
+            max_documents: Maximum attachments downloaded (default from config)
+            max_workers: Parallel downloads (default from config)
+        """
+        self.tender_id = tender_id
+        self.store = store
+        self.budget = budget
+        self.max_documents = max_documents or settings.prefetch_max_documents
+        self.max_workers = max_workers or settings.prefetch_max_workers
+
+    def run(self, attachments: Optional[List[Any]]) -> List[Dict[str, Any]]:
+        """
+        Prefetch the award result and the listed attachments in parallel.
+
+        Args:
+            attachments: Buyer attachments table (as returned by read_buyer_attachments_table)
+
+        Returns:
+            Document inventory: one entry per attachment with row_id, name, type and,
+            when downloaded, mime_type, file_size, pages (or error)
+        """
+        if attachments is not None:
+            self.seed_attachments_table(attachments)
+
+        documents = [
+            {"row_id": row_id, **attachment}
+            for row_id, attachment in enumerate(normalize_attachments(attachments) or [])
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch") as pool:
+            award = pool.submit(self.prefetch_award)
+            entries = list(pool.map(self.prefetch_document, documents[:self.max_documents]))
+            award.result()
+
+        return entries + documents[self.max_documents:]
+
+    def seed_attachments_table(self, attachments: List[Any]) -> None:
+        """Store the already-read attachments table as the result of read_buyer_attachments_table"""
+        if self.store is None:
+            return
+        self.store.get_or_compute(
+            evidence_key("read_buyer_attachments_table", {"tender_id": self.tender_id}),
+            lambda: ToolMessage(
+                content=json.dumps(attachments, ensure_ascii=False, default=str),
+                tool_call_id="prefetch",
+                name="read_buyer_attachments_table",
+            ),
+            storable=is_storable_evidence,
+        )
+
+    def prefetch_award(self) -> None:
+        """Fetch the award result (warming its HTML caches) and seed it into the store"""
+        if self._should_stop():
+            return
+        args = {"id": self.tender_id}
+        try:
+            self._charge_request()
+            if self.store is None:
+                read_award_result.invoke(args)
+                return
+            self.store.get_or_compute(
+                evidence_key("read_award_result", args),
+                lambda: read_award_result.invoke(
+                    {"type": "tool_call", "name": "read_award_result", "args": args, "id": "prefetch"}
+                ),
+                storable=is_storable_evidence,
+            )
+        except Exception as e:
+            logger.warning(f"Prefetch of award result for {self.tender_id} failed: {e}")
+
+    def prefetch_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Download one attachment into the file cache and probe its metadata.
+
+        Args:
+            document: Inventory entry with row_id, name, type and description
+
+        Returns:
+            The entry with mime_type, file_size and pages added (or error)
+        """
+        entry = dict(document)
+        if self._should_stop():
+            entry["error"] = "prefetch stopped (budget exhausted or cancelled)"
+            return entry
+
+        try:
+            file_content, mime_type, cached = self.load_document(document["row_id"])
+            if not cached:
+                self._charge_request()
+            entry["mime_type"] = mime_type
+            entry["file_size"] = len(file_content)
+            entry["pages"] = self.probe_pages(file_content, mime_type, row_id=document["row_id"])
+        except Exception as e:
+            logger.warning(
+                f"Prefetch of attachment {document['row_id']} for {self.tender_id} failed: {e}"
+            )
+            entry["error"] = str(e)
+        return entry
+
+    def load_document(self, row_id: int):
+        """Load an attachment through the shared file cache (downloading it if needed)"""
+        return load_buyer_attachment(self.tender_id, row_id)
+
+    def probe_pages(self, file_content: bytes, mime_type: str, row_id: int = None) -> Optional[int]:
+        """
+        Get the page count of a document.
+
+        DOCX files are extracted locally (they are read whole, as one page, and
+        cached as page 1 of the attachment) and PDFs are probed without OCR.
+
+        Returns:
+            Number of pages, or None if unknown
+        """
+        if mime_type == DOCX_MIME_TYPE:
+            extraction = extract_text_locally(file_content, mime_type)
+            if not extraction["success"]:
+                return None
+            if row_id is not None and extraction.get("text"):
+                get_cache_manager().set_ocr_result(self.tender_id, row_id, 1, extraction["text"])
+            return 1
+        if mime_type == "application/pdf":
+            return count_pdf_pages(file_content)
+        return None
+
+    def _should_stop(self) -> bool:
+        return self.budget is not None and bool(
+            self.budget.cancelled_reason() or self.budget.exhausted_reason()
+        )
+
+    def _charge_request(self) -> None:
+        if self.budget is not None:
+            self.budget.charge_request()
+
+
+def format_document_inventory(inventory: List[Dict[str, Any]]) -> str:
+    """
+    Format a document inventory for the agents' prompt.
+
+    Args:
+        inventory: Entries returned by EvidencePrefetcher.run()
+
+    Returns:
+        One line per document: row_id, name, type and page count when known
+    """
+    lines = []
+    for entry in inventory:
+        details = []
+        if entry.get("type"):
+            details.append(entry["type"])
+        if entry.get("mime_type"):
+            details.append(get_file_extension_from_mime(entry["mime_type"]).lstrip(".").upper())
+        if entry.get("pages"):
+            details.append(f"{entry['pages']} pages")
+        suffix = f" ({', '.join(details)})" if details else ""
+        lines.append(f"- row_id {entry['row_id']}: {entry.get('name') or 'Unknown'}{suffix}")
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+"""
+Evidence Store - Single-flight tool results shared by the task agents of one investigation
+
+The parallel task agents of an investigation read the same evidence: the
+attachments table, the award result and the same document pages. Without
+coordination, agents that ask at the same moment all download and OCR the
+document before any cache entry exists.
+
+One EvidenceStore is created per FraudDetectionWorkflow.run() and shared by
+every branch through EvidenceStoreMiddleware. Tool calls are keyed by
+(tool name, arguments): the first caller runs the tool, concurrent callers
+wait for its result, and later callers get the stored result. Scraping and
+OCR cost per tender then no longer grows with the number of tasks.
+"""
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+import json
+import threading
+
+from langchain.messages import ToolMessage
+
+
+def evidence_key(tool_name: str, args: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Build the store key for a tool call.
+
+    Args:
+        tool_name: Name of the tool
+        args: Tool call arguments
+
+    Returns:
+        (tool name, canonical JSON of the arguments)
+    """
+    return tool_name, json.dumps(args, sort_keys=True, default=str)
+
+
+def is_storable_evidence(result: Any) -> bool:
+    """Keep successful tool results only, so failed downloads or OCR are retried"""
+    if not isinstance(result, ToolMessage) or result.status == "error":
+        return False
+    try:
+        data = json.loads(result.content) if isinstance(result.content, str) else {}
+    except ValueError:
+        return True
+    return not (isinstance(data, dict) and data.get("success") is False)
+
+
+class EvidenceStore:
+    """
+    Thread-safe, single-flight store of tool results for one investigation.
+
+    Failed calls are not kept: callers waiting on a call that raised run it
+    themselves, and results rejected by the storable predicate are returned to
+    the callers already waiting but not to later ones.
+
+    Usage:
+        store = EvidenceStore()
+        result = store.get_or_compute(
+            ("read_award_result", '{"id": "1234-56-LR22"}'),
+            lambda: read_award_result.invoke({"id": "1234-56-LR22"}),
+        )
+    """
+
+    def __init__(self):
+        """Initialize an empty store"""
+        self._results: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        storable: Callable[[Any], bool] = None,
+    ) -> Any:
+        """
+        Return the result for a key, computing it only if nobody else is.
+
+        Args:
+            key: Result key (see evidence_key)
+            compute: Produces the result; called at most once at a time per key
+            storable: Optional predicate; results it rejects are not kept for later callers
+
+        Returns:
+            The result of compute() for this key
+
+        Raises:
+            Whatever compute() raised (callers that were waiting on a failed call retry it)
+        """
+        while True:
+            with self._lock:
+                future = self._results.get(key)
+                if future is None:
+                    future = Future()
+                    self._results[key] = future
+                    self.misses += 1
+                    break
+                if future.done():
+                    self.hits += 1
+                else:
+                    self.waits += 1
+
+            try:
+                return future.result()
+            except BaseException:
+                # The call we waited for failed (or its branch was cancelled): retry ourselves
+                continue
+
+        try:
+            result = compute()
+        except BaseException as e:
+            self._forget(key, future)
+            future.set_exception(e)
+            raise
+
+        if storable is not None and not storable(result):
+            self._forget(key, future)
+        future.set_result(result)
+        return result
+
+    def _forget(self, key: Hashable, future: Future):
+        """Drop a key so the next caller computes it again"""
+        with self._lock:
+            if self._results.get(key) is future:
+                del self._results[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            future = self._results.get(key)
+            return future is not None and future.done()
+
+    def report(self) -> Dict[str, int]:
+        """
+        Get usage statistics.
+
+        Returns:
+            Dictionary with stored results, hits, waits (calls that joined an
+            in-flight computation) and misses (calls that ran the tool)
+        """
+        with self._lock:
+            return {
+                "results": sum(1 for future in self._results.values() if future.done()),
+                "hits": self.hits,
+                "waits": self.waits,
+                "misses": self.misses,
+            }
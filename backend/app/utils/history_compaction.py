@@ -0,0 +1,139 @@
+"""
+History Compaction - Digests of old tool outputs in long agent loops
+
+Each step of a task agent re-sends the whole message history, so the tokens
+sent per investigation grow quadratically with the number of steps. Old tool
+outputs (document pages, award data) make up most of that history and are
+rarely needed verbatim once the agent has moved on.
+
+When the estimated size of the history crosses a threshold, every tool output
+except the most recent ones is replaced, in the request sent to the model, by
+a short digest with a reference (its tool_call_id). The agent state keeps the
+full messages, and the agent can re-expand any digest with the
+expand_tool_output tool registered by HistoryCompactionMiddleware.
+"""
+from typing import Any, Dict, List, Tuple
+import json
+
+from langchain.messages import AIMessage, ToolMessage
+
+from app.utils.tool_output_governor import estimate_tokens
+
+COMPACTED_PREFIX = "[Compacted tool output]"
+
+# Result fields shown in digests when present
+DIGEST_FIELDS = ("success", "ok", "error", "total_pages", "pages_read", "indexed_pages")
+
+
+def message_tokens(message: Any) -> int:
+    """Estimate the tokens of a message (content and tool calls)"""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    tool_calls = getattr(message, "tool_calls", None)
+    return estimate_tokens(content) + (estimate_tokens(json.dumps(tool_calls, default=str)) if tool_calls else 0)
+
+
+def digest_tool_output(message: ToolMessage, tool_call: Dict[str, Any] = None, max_chars: int = 300) -> str:
+    """
+    Build a short digest of a tool output.
+
+    Args:
+        message: ToolMessage to digest
+        tool_call: The tool call that produced it (for the arguments), if known
+        max_chars: Characters of the output kept as a preview
+
+    Returns:
+        Digest text with the reference needed to expand it
+    """
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    parts = [f"{COMPACTED_PREFIX} ref={message.tool_call_id} tool={message.name}"]
+    if tool_call and tool_call.get("args"):
+        parts.append(f"args={json.dumps(tool_call['args'], ensure_ascii=False, default=str)}")
+    parts.append(f"size=~{estimate_tokens(content)} tokens")
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = None
+    preview = content
+    if isinstance(data, dict):
+        fields = {key: data[key] for key in DIGEST_FIELDS if key in data}
+        if fields:
+            parts.append(f"fields={json.dumps(fields, ensure_ascii=False, default=str)}")
+        if isinstance(data.get("text"), str):
+            preview = data["text"]
+
+    preview = " ".join(preview.split())
+    if len(preview) > max_chars:
+        preview = preview[:max_chars] + "..."
+    return (
+        " ".join(parts)
+        + f"\npreview: {preview}"
+        + f"\nCall expand_tool_output(ref='{message.tool_call_id}') to read the full output."
+    )
+
+
+def compact_messages(
+    messages: List[Any],
+    threshold_tokens: int,
+    keep_recent: int,
+    digest_chars: int = 300,
+) -> Tuple[List[Any], int]:
+    """
+    Replace old tool outputs with digests once the history is over a size.
+
+    Args:
+        messages: Messages sent to the model
+        threshold_tokens: Estimated history size above which old outputs are compacted
+        keep_recent: Most recent tool outputs always kept verbatim
+        digest_chars: Characters of each output kept in its digest preview
+
+    Returns:
+        (messages to send, number of tool outputs compacted)
+    """
+    if sum(message_tokens(message) for message in messages) <= threshold_tokens:
+        return messages, 0
+
+    tool_positions = [index for index, message in enumerate(messages) if isinstance(message, ToolMessage)]
+    old_positions = set(tool_positions[:-keep_recent] if keep_recent else tool_positions)
+    tool_calls = {
+        call["id"]: call
+        for message in messages if isinstance(message, AIMessage)
+        for call in message.tool_calls
+    }
+
+    compacted, count = [], 0
+    for index, message in enumerate(messages):
+        if index in old_positions and not _is_compacted(message):
+            digest = digest_tool_output(message, tool_calls.get(message.tool_call_id), digest_chars)
+            if estimate_tokens(digest) < message_tokens(message):
+                message = ToolMessage(
+                    content=digest,
+                    tool_call_id=message.tool_call_id,
+                    name=message.name,
+                    status=message.status,
+                    id=message.id,
+                )
+                count += 1
+        compacted.append(message)
+    return compacted, count
+
+
+def find_tool_output(messages: List[Any], ref: str) -> Dict[str, Any]:
+    """
+    Find the full tool output for a digest reference.
+
+    Args:
+        messages: Full message history (agent state)
+        ref: tool_call_id from the digest
+
+    Returns:
+        dict: {ref, tool, content} or {error}
+    """
+    for message in messages:
+        if isinstance(message, ToolMessage) and message.tool_call_id == ref:
+            return {"ref": ref, "tool": message.name, "content": message.content}
+    return {"error": f"No tool output with ref '{ref}'"}
+
+
+def _is_compacted(message: ToolMessage) -> bool:
+    return isinstance(message.content, str) and message.content.startswith(COMPACTED_PREFIX)
@@ -0,0 +1,240 @@
+"""
+Investigation Budget - Shared resource limits for a single workflow run
+
+One InvestigationBudget is created per FraudDetectionWorkflow.run() and shared by
+every parallel task agent of that run. Agents charge tokens, OCR pages and
+outbound requests against it through BudgetGovernorMiddleware; once any limit is
+hit, the middleware stops executing tools and forces the agents to return their
+structured output with the evidence gathered so far.
+
+The budget also carries the run's CancellationToken, used to abort an
+investigation from the API and to enforce per-branch deadlines.
+"""
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from app.config import settings
+
+
+class InvestigationCancelledError(Exception):
+    """Raised inside an agent when its investigation (or branch) has been cancelled"""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag with an optional deadline and parent token.
+
+    A branch token created with a parent is cancelled when its parent is, so
+    cancelling the investigation token stops every parallel branch, while a
+    branch deadline only stops that branch.
+
+    Usage:
+        run_token = CancellationToken()
+        branch_token = CancellationToken(parent=run_token, timeout=300)
+        ...
+        branch_token.raise_if_cancelled()  # at safe points inside the agent loop
+    """
+
+    def __init__(self, parent: "CancellationToken" = None, timeout: float = None):
+        """
+        Initialize the token.
+
+        Args:
+            parent: Optional parent token whose cancellation propagates to this one
+            timeout: Optional deadline in seconds from now
+        """
+        self.parent = parent
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._reason: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel this token (first reason wins)"""
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+
+    def cancelled_reason(self) -> Optional[str]:
+        """
+        Check whether this token, its deadline or its parent has been cancelled.
+
+        Returns:
+            Reason string if cancelled, None otherwise
+        """
+        with self._lock:
+            if self._reason is not None:
+                return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "deadline exceeded"
+        if self.parent is not None:
+            return self.parent.cancelled_reason()
+        return None
+
+    def raise_if_cancelled(self):
+        """Raise InvestigationCancelledError if the token has been cancelled"""
+        reason = self.cancelled_reason()
+        if reason:
+            raise InvestigationCancelledError(reason)
+
+
+class InvestigationBudget:
+    """
+    Thread-safe resource budget shared across all agents of one investigation.
+
+    Tracks four resources:
+    - tokens: LLM tokens (input + output) reported by the model
+    - ocr_pages: Pages newly sent to the OCR API (cache hits are free)
+    - requests: Outbound tool calls (scraping, downloads, OCR)
+    - wall_time: Seconds elapsed since the budget was created
+
+    Usage:
+        budget = InvestigationBudget()
+        budget.charge_tokens(1200)
+        if budget.exhausted_reason():
+            ...  # stop doing expensive work
+        print(budget.report())
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = None,
+        max_ocr_pages: int = None,
+        max_requests: int = None,
+        max_wall_time: int = None,
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            max_tokens: Maximum LLM tokens for the whole run (default from config)
+            max_ocr_pages: Maximum OCR pages for the whole run (default from config)
+            max_requests: Maximum outbound tool calls for the whole run (default from config)
+            max_wall_time: Maximum wall-clock seconds for the whole run (default from config)
+        """
+        self.max_tokens = max_tokens or settings.investigation_max_tokens
+        self.max_ocr_pages = max_ocr_pages or settings.investigation_max_ocr_pages
+        self.max_requests = max_requests or settings.investigation_max_requests
+        self.max_wall_time = max_wall_time or settings.investigation_max_wall_time
+
+        self.tokens = 0
+        self.ocr_pages = 0
+        self.requests = 0
+        self.llm_calls = 0
+        self.forced_finishes = 0
+
+        self.started_at = time.monotonic()
+        self.cancellation = CancellationToken()
+        self._lock = threading.Lock()
+
+    def charge_tokens(self, tokens: int):
+        """Record LLM tokens used by one model call"""
+        with self._lock:
+            self.tokens += max(0, tokens)
+            self.llm_calls += 1
+
+    def charge_ocr_pages(self, pages: int):
+        """Record pages sent to the OCR API"""
+        with self._lock:
+            self.ocr_pages += max(0, pages)
+
+    def charge_request(self, count: int = 1):
+        """Record outbound tool calls"""
+        with self._lock:
+            self.requests += max(0, count)
+
+    def record_forced_finish(self):
+        """Record that an agent was forced to finish early by the budget"""
+        with self._lock:
+            self.forced_finishes += 1
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel the investigation: every agent sharing this budget stops at its next step"""
+        self.cancellation.cancel(reason)
+
+    def cancelled_reason(self) -> Optional[str]:
+        """Reason the investigation was cancelled, or None if it is still running"""
+        return self.cancellation.cancelled_reason()
+
+    def elapsed(self) -> float:
+        """Seconds elapsed since the budget was created"""
+        return time.monotonic() - self.started_at
+
+    def remaining_time(self) -> float:
+        """Seconds left before the wall-time limit is reached (never negative)"""
+        return max(0.0, self.max_wall_time - self.elapsed())
+
+    def exhausted_reason(self) -> Optional[str]:
+        """
+        Check whether any limit has been reached.
+
+        Returns:
+            Human-readable reason if the budget is exhausted, None otherwise
+        """
+        with self._lock:
+            if self.tokens >= self.max_tokens:
+                return f"token budget exhausted ({self.tokens}/{self.max_tokens})"
+            if self.ocr_pages >= self.max_ocr_pages:
+                return f"OCR page budget exhausted ({self.ocr_pages}/{self.max_ocr_pages})"
+            if self.requests >= self.max_requests:
+                return f"request budget exhausted ({self.requests}/{self.max_requests})"
+        if self.elapsed() >= self.max_wall_time:
+            return f"wall-time budget exhausted ({self.elapsed():.0f}s/{self.max_wall_time}s)"
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of budget usage.
+
+        Returns:
+            Dictionary with used/limit pairs for every tracked resource
+        """
+        with self._lock:
+            return {
+                "tokens": {"used": self.tokens, "limit": self.max_tokens},
+                "ocr_pages": {"used": self.ocr_pages, "limit": self.max_ocr_pages},
+                "requests": {"used": self.requests, "limit": self.max_requests},
+                "wall_time_seconds": {
+                    "used": round(self.elapsed(), 1),
+                    "limit": self.max_wall_time,
+                },
+                "llm_calls": self.llm_calls,
+                "forced_finishes": self.forced_finishes,
+                "cancelled": self.cancellation.cancelled_reason(),
+            }
+
+
+# Active investigations by session_id, so the API can cancel them
+_active_budgets: Dict[str, InvestigationBudget] = {}
+_active_budgets_lock = threading.Lock()
+
+
+def register_budget(session_id: str, budget: InvestigationBudget):
+    """Register the budget of a running investigation under its session_id"""
+    with _active_budgets_lock:
+        _active_budgets[session_id] = budget
+
+
+def unregister_budget(session_id: str):
+    """Remove a finished investigation from the active registry"""
+    with _active_budgets_lock:
+        _active_budgets.pop(session_id, None)
+
+
+def cancel_investigation(session_id: str, reason: str = "cancelled by user") -> bool:
+    """
+    Cancel a running investigation.
+
+    Args:
+        session_id: Session ID of the investigation
+        reason: Reason reported to agents and to the client
+
+    Returns:
+        True if an active investigation was found and cancelled, False otherwise
+    """
+    with _active_budgets_lock:
+        budget = _active_budgets.get(session_id)
+    if budget is None:
+        return False
+    budget.cancel(reason)
+    return True
@@ -0,0 +1,194 @@
+"""
+LLM Cache - Opt-in response cache for the agents' ChatOpenAI models
+
+Re-running an investigation (after a deploy, on a retry, or while testing)
+repeats identical LLM calls: the ranking classification, the summary and, as
+long as tool results are unchanged, every step of the task agents.
+
+LLMResponseCache plugs into LangChain's model cache (ChatOpenAI(cache=...)).
+LangChain keys each call by the serialized messages and an "llm string" with
+the model name, temperature and bound tool schemas; the cache normalizes the
+messages (provider message ids and tool call ids vary between runs) and
+stores the responses in the CacheManager, with a TTL and scoped to the tender
+being investigated, so clear_cache_for_tender() also drops them.
+
+Enabled with llm_cache_enabled; only models at or below
+llm_cache_max_temperature are cached.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Sequence
+import hashlib
+import json
+import logging
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from app.config import settings
+from app.utils.cache_manager import get_cache_manager
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+# Message fields that differ between otherwise identical runs
+VOLATILE_FIELDS = {"id", "response_metadata", "usage_metadata", "additional_kwargs"}
+
+# Tender whose investigation is running (set by the workflow)
+_scope: ContextVar[Optional[str]] = ContextVar("llm_cache_scope", default=None)
+
+
+@contextmanager
+def llm_cache_scope(tender_id: Optional[str]) -> Iterator[None]:
+    """
+    Scope the LLM responses cached inside the block to a tender.
+
+    Args:
+        tender_id: Tender being investigated
+    """
+    token = _scope.set(tender_id)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize serialized messages so identical conversations get the same key.
+
+    Drops message ids and provider metadata, and renames tool call ids to
+    their order of appearance.
+
+    Args:
+        prompt: Messages serialized by LangChain (langchain_core.load.dumps)
+
+    Returns:
+        Canonical JSON of the messages
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+
+    call_ids: Dict[str, str] = {}
+
+    def call_id(value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        return call_ids.setdefault(value, f"call_{len(call_ids)}")
+
+    def normalize(value: Any, parent: str = None) -> Any:
+        if isinstance(value, list):
+            return [normalize(item, parent) for item in value]
+        if not isinstance(value, dict):
+            return value
+        normalized = {}
+        for key, item in value.items():
+            if parent == "kwargs" and key in VOLATILE_FIELDS:
+                continue
+            if key == "tool_call_id" or (key == "id" and parent == "tool_calls"):
+                normalized[key] = call_id(item)
+            else:
+                normalized[key] = normalize(item, key if key in ("kwargs", "tool_calls") else None)
+        return normalized
+
+    return json.dumps(normalize(messages), sort_keys=True, ensure_ascii=False)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Build the cache key of a model call.
+
+    Args:
+        prompt: Serialized messages
+        llm_string: LangChain's description of the model, temperature and bound tools
+
+    Returns:
+        SHA-256 hex digest of the normalized request
+    """
+    payload = f"{llm_string}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain model cache backed by the CacheManager.
+
+    Usage:
+        model = ChatOpenAI(model=..., temperature=0, cache=LLMResponseCache())
+        with llm_cache_scope("1234-56-LR22"):
+            model.invoke(messages)
+    """
+
+    def __init__(self, ttl_seconds: int = None, cache_manager=None):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Maximum age of a cached response (default from config)
+            cache_manager: CacheManager to store responses in (default: global one)
+        """
+        self.ttl_seconds = ttl_seconds or settings.llm_cache_ttl_seconds
+        self.cache_manager = cache_manager or get_cache_manager()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """Look up a response for a prompt and model configuration"""
+        cached = self.cache_manager.get_llm_response(
+            _current_scope(), cache_key(prompt, llm_string), self.ttl_seconds
+        )
+        if cached is None:
+            self.misses += 1
+            return None
+        try:
+            generations = [loads(generation) for generation in cached]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable LLM cache entry: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        print(f"[CACHE HIT] LLM response ({_current_scope()})")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """Store the response for a prompt and model configuration"""
+        self.cache_manager.set_llm_response(
+            _current_scope(),
+            cache_key(prompt, llm_string),
+            [dumps(generation) for generation in return_val],
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove the cached responses of the current scope"""
+        for cache_file in self.cache_manager.llm_dir.glob(f"{_current_scope()}_*"):
+            cache_file.unlink(missing_ok=True)
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache(temperature: float) -> Optional[LLMResponseCache]:
+    """
+    Get the response cache for a model, if caching applies to it.
+
+    Args:
+        temperature: Temperature of the model
+
+    Returns:
+        The shared LLMResponseCache, or None when caching is disabled or the
+        model samples above llm_cache_max_temperature
+    """
+    global _llm_cache
+    if not settings.llm_cache_enabled or temperature > settings.llm_cache_max_temperature:
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
+
+
+def _current_scope() -> str:
+    return _scope.get() or GLOBAL_SCOPE
@@ -0,0 +1,429 @@
+"""
+LLM Pool - Shared concurrency pool for the agents' LLM calls
+
+The task agents of an investigation run in parallel, and several
+investigations can run at once; every agent used to call the provider on its
+own, with the OpenAI client retrying 429s independently. Under batch load
+this produced bursts of rate-limit errors and erratic latency.
+
+Every call made by a PooledChatOpenAI model goes through one process-wide
+pool, with a lane per (provider, model):
+- concurrency: at most `limit` calls in flight; the limit adapts with AIMD
+  (+1/limit per success up to max_in_flight, halved on a 429/5xx)
+- backoff: a throttled call pauses the whole lane (Retry-After or an
+  exponential backoff) and is retried by the pool, so retries are coordinated
+- tokens per minute: calls wait while the estimated tokens of the last
+  minute would go over the lane's tokens_per_minute
+- fair queueing: when a slot frees, it goes to the investigation with the
+  fewest calls in flight (then the one served least recently), so one large
+  investigation cannot starve the others
+
+Limits can be set per provider ("openrouter.ai") or per model
+("openrouter.ai/google/gemini-2.5-pro:nitro") in llm_pool_limits.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import logging
+import threading
+import time
+
+import openai
+from langchain_openai import ChatOpenAI
+
+from app.config import settings
+from app.utils.history_compaction import message_tokens
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+# Window of the tokens-per-minute limit, in seconds
+TOKEN_WINDOW = 60.0
+
+# Minimum seconds between two multiplicative decreases of a lane's limit
+# (calls throttled together count as one congestion signal)
+DECREASE_COOLDOWN = 1.0
+DECREASE_FACTOR = 0.5
+
+# Investigation whose LLM calls are running (set by the workflow)
+_scope: ContextVar[Optional[str]] = ContextVar("llm_pool_scope", default=None)
+
+
+@contextmanager
+def llm_pool_scope(scope: Optional[str]) -> Iterator[None]:
+    """
+    Attribute the LLM calls made inside the block to an investigation (for fair queueing).
+
+    Args:
+        scope: Investigation the calls belong to (session or tender id)
+    """
+    token = _scope.set(scope)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def classify_error(error: Exception) -> Tuple[str, Optional[float]]:
+    """
+    Classify an LLM call error.
+
+    Returns:
+        ("throttled", retry_after) for 429 and 5xx responses, ("retry", None) for
+        connection errors and timeouts, ("error", None) for anything else
+    """
+    if isinstance(error, openai.APIStatusError) and (
+        error.status_code == 429 or error.status_code >= 500
+    ):
+        retry_after = None
+        try:
+            retry_after = float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+        return "throttled", retry_after
+    if isinstance(error, openai.APIConnectionError):
+        return "retry", None
+    return "error", None
+
+
+class _Lane:
+    """Concurrency and token state of one (provider, model)"""
+
+    def __init__(self, max_in_flight: int, tokens_per_minute: int):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.limit = float(max_in_flight)
+        self.active = 0
+        self.active_by_scope: Dict[str, int] = {}
+        self.last_served: Dict[str, int] = {}
+        self.waiting: List[Tuple[str, int]] = []
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.window: deque = deque()  # [timestamp, tokens] per call of the last minute
+
+
+class _Lease:
+    """A slot held by one LLM call"""
+
+    def __init__(self, lane: _Lane, scope: str, reservation: list):
+        self.lane = lane
+        self.scope = scope
+        self.reservation = reservation
+
+
+class LLMPool:
+    """
+    Thread-safe shared pool for LLM calls, with AIMD concurrency per (provider, model).
+
+    Usage:
+        pool = get_llm_pool()
+        result = pool.run(("openrouter.ai", model_name), call, estimated_tokens=1200)
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = None,
+        tokens_per_minute: int = None,
+        limits: Dict[str, Dict[str, int]] = None,
+        min_in_flight: int = None,
+        max_retries: int = None,
+        backoff_seconds: float = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            max_in_flight: Maximum concurrent calls per lane (default from config)
+            tokens_per_minute: Maximum tokens per minute per lane, 0 for no limit (default from config)
+            limits: Overrides by provider or "provider/model" with max_in_flight and/or tokens_per_minute
+            min_in_flight: Floor of the adaptive limit (default from config)
+            max_retries: Retries of a throttled or disconnected call (default from config)
+            backoff_seconds: Base pause of a lane after a throttled call (default from config)
+        """
+        self.max_in_flight = max_in_flight or settings.llm_pool_max_in_flight
+        self.tokens_per_minute = (
+            settings.llm_pool_tokens_per_minute if tokens_per_minute is None else tokens_per_minute
+        )
+        self.limits = settings.llm_pool_limits if limits is None else limits
+        self.min_in_flight = min_in_flight or settings.llm_pool_min_in_flight
+        self.max_retries = settings.llm_pool_max_retries if max_retries is None else max_retries
+        self.backoff_seconds = (
+            settings.llm_pool_backoff_seconds if backoff_seconds is None else backoff_seconds
+        )
+        self.throttled = 0
+        self.waits = 0
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._grants = count(1)
+        self._tickets = count(1)
+        self._condition = threading.Condition()
+
+    def _lane(self, key: Tuple[str, str]) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            provider, model = key
+            limits = self.limits.get(f"{provider}/{model}") or self.limits.get(provider) or {}
+            lane = _Lane(
+                max_in_flight=limits.get("max_in_flight", self.max_in_flight),
+                tokens_per_minute=limits.get("tokens_per_minute", self.tokens_per_minute),
+            )
+            self._lanes[key] = lane
+        return lane
+
+    def _admission_delay(self, lane: _Lane, ticket: Tuple[str, int], tokens: int) -> Optional[float]:
+        """Seconds until the waiter can be admitted: 0 now, None when it has to wait for a release"""
+        now = time.monotonic()
+        if now < lane.blocked_until:
+            return lane.blocked_until - now
+        if lane.active >= max(self.min_in_flight, int(lane.limit)):
+            return None
+        next_in_line = min(
+            lane.waiting,
+            key=lambda waiter: (
+                lane.active_by_scope.get(waiter[0], 0),
+                lane.last_served.get(waiter[0], 0),
+                waiter[1],
+            ),
+        )
+        if next_in_line != ticket:
+            return None
+        if lane.tokens_per_minute:
+            while lane.window and lane.window[0][0] <= now - TOKEN_WINDOW:
+                lane.window.popleft()
+            used = sum(tokens for _, tokens in lane.window)
+            if lane.window and used + tokens > lane.tokens_per_minute:
+                return lane.window[0][0] + TOKEN_WINDOW - now
+        return 0
+
+    def acquire(self, key: Tuple[str, str], scope: str = None, tokens: int = 0) -> _Lease:
+        """
+        Wait for a slot in a lane.
+
+        Args:
+            key: (provider, model)
+            scope: Investigation the call belongs to (default from llm_pool_scope)
+            tokens: Estimated tokens of the call, reserved against tokens_per_minute
+
+        Returns:
+            Lease to pass to release()
+        """
+        scope = scope or _scope.get() or GLOBAL_SCOPE
+        with self._condition:
+            lane = self._lane(key)
+            ticket = (scope, next(self._tickets))
+            lane.waiting.append(ticket)
+            waited = False
+            try:
+                while True:
+                    delay = self._admission_delay(lane, ticket, tokens)
+                    if delay == 0:
+                        break
+                    waited = True
+                    self._condition.wait(timeout=delay)
+            finally:
+                lane.waiting.remove(ticket)
+
+            if waited:
+                self.waits += 1
+            lane.active += 1
+            lane.active_by_scope[scope] = lane.active_by_scope.get(scope, 0) + 1
+            lane.last_served[scope] = next(self._grants)
+            reservation = [time.monotonic(), tokens]
+            lane.window.append(reservation)
+            # The head of the queue changed; let the next waiter re-check
+            self._condition.notify_all()
+            return _Lease(lane, scope, reservation)
+
+    def release(
+        self, lease: _Lease, outcome: str = "ok", tokens: int = None, pause: float = None
+    ) -> None:
+        """
+        Free a slot and adapt the lane's limit.
+
+        Args:
+            lease: Lease returned by acquire()
+            outcome: "ok" (additive increase), "throttled" (multiplicative decrease and pause),
+                "retry" or "error" (no change)
+            tokens: Actual tokens of the call, replacing the estimate
+            pause: Seconds the lane is paused after a throttled call
+        """
+        with self._condition:
+            lane = lease.lane
+            lane.active -= 1
+            lane.active_by_scope[lease.scope] -= 1
+            if not lane.active_by_scope[lease.scope]:
+                del lane.active_by_scope[lease.scope]
+            if len(lane.last_served) > 256:
+                waiting_scopes = {scope for scope, _ in lane.waiting}
+                for scope in list(lane.last_served):
+                    if scope not in lane.active_by_scope and scope not in waiting_scopes:
+                        del lane.last_served[scope]
+            if tokens is not None:
+                lease.reservation[1] = tokens
+
+            now = time.monotonic()
+            if outcome == "ok":
+                lane.limit = min(lane.max_in_flight, lane.limit + 1 / lane.limit)
+            elif outcome == "throttled":
+                self.throttled += 1
+                if now - lane.last_decrease >= DECREASE_COOLDOWN:
+                    lane.limit = max(self.min_in_flight, lane.limit * DECREASE_FACTOR)
+                    lane.last_decrease = now
+                lane.blocked_until = max(lane.blocked_until, now + (pause or self.backoff_seconds))
+            self._condition.notify_all()
+
+    def _pause(self, attempt: int, retry_after: Optional[float]) -> float:
+        return retry_after if retry_after is not None else self.backoff_seconds * 2 ** attempt
+
+    def run(self, key: Tuple[str, str], call: Callable[[], Any], tokens: int = 0) -> Any:
+        """
+        Run an LLM call in a slot, retrying throttled and disconnected calls.
+
+        Args:
+            key: (provider, model)
+            call: Function making the request
+            tokens: Estimated tokens of the call
+
+        Returns:
+            Result of the call
+        """
+        for attempt in range(self.max_retries + 1):
+            lease = self.acquire(key, tokens=tokens)
+            try:
+                result = call()
+            except Exception as e:
+                outcome, retry_after = classify_error(e)
+                self.release(lease, outcome, pause=self._pause(attempt, retry_after))
+                if outcome == "error" or attempt == self.max_retries:
+                    raise
+                logger.warning("LLM call to %s throttled or failed (%s), retrying", key[1], e)
+                if outcome == "retry":
+                    time.sleep(self._pause(attempt, None))
+                continue
+            self.release(lease, "ok", tokens=_result_tokens(result))
+            return result
+
+    async def arun(self, key: Tuple[str, str], call: Callable[[], Any], tokens: int = 0) -> Any:
+        """Async version of run(); call returns an awaitable"""
+        for attempt in range(self.max_retries + 1):
+            lease = await asyncio.to_thread(self.acquire, key, _scope.get(), tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                outcome, retry_after = classify_error(e)
+                self.release(lease, outcome, pause=self._pause(attempt, retry_after))
+                if outcome == "error" or attempt == self.max_retries:
+                    raise
+                logger.warning("LLM call to %s throttled or failed (%s), retrying", key[1], e)
+                if outcome == "retry":
+                    await asyncio.sleep(self._pause(attempt, None))
+                continue
+            self.release(lease, "ok", tokens=_result_tokens(result))
+            return result
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the pool.
+
+        Returns:
+            Adaptive limit, calls in flight and queued per lane, plus throttle and wait counts
+        """
+        with self._condition:
+            return {
+                "lanes": {
+                    f"{provider}/{model}": {
+                        "limit": round(lane.limit, 2),
+                        "max_in_flight": lane.max_in_flight,
+                        "active": lane.active,
+                        "waiting": len(lane.waiting),
+                    }
+                    for (provider, model), lane in self._lanes.items()
+                },
+                "throttled": self.throttled,
+                "waits": self.waits,
+            }
+
+
+def _result_tokens(result: Any) -> Optional[int]:
+    """Total tokens reported in a ChatResult, or None if the provider did not report usage"""
+    for generation in getattr(result, "generations", []):
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            return usage.get("total_tokens")
+    return None
+
+
+# Global pool shared by all agents of the process
+_pool: Optional[LLMPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMPool:
+    """Get the global LLM pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LLMPool()
+        return _pool
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose requests go through the shared LLM pool.
+
+    The pool retries throttled calls itself, so the OpenAI client's own
+    retries are disabled unless max_retries is given. Cached responses
+    (ChatOpenAI(cache=...)) never reach the pool.
+    """
+
+    def __init__(self, **kwargs: Any):
+        if settings.llm_pool_enabled:
+            kwargs.setdefault("max_retries", 0)
+        super().__init__(**kwargs)
+
+    @property
+    def _pool_key(self) -> Tuple[str, str]:
+        provider = urlparse(self.openai_api_base or "").hostname or "api.openai.com"
+        return provider, self.model_name
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not settings.llm_pool_enabled:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return get_llm_pool().run(
+            self._pool_key,
+            lambda: super(PooledChatOpenAI, self)._generate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            tokens=sum(message_tokens(message) for message in messages),
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not settings.llm_pool_enabled:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return await get_llm_pool().arun(
+            self._pool_key,
+            lambda: super(PooledChatOpenAI, self)._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            tokens=sum(message_tokens(message) for message in messages),
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if not settings.llm_pool_enabled:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        # Streams hold their slot until the last chunk and are not retried
+        pool = get_llm_pool()
+        lease = pool.acquire(self._pool_key, tokens=sum(message_tokens(message) for message in messages))
+        outcome, pause = "ok", None
+        try:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except Exception as e:
+            outcome, pause = classify_error(e)
+            raise
+        finally:
+            pool.release(lease, outcome, pause=pause)
@@ -0,0 +1,124 @@
+"""
+Model Routing - Model tiers per workflow phase and task severity
+
+Every phase of the workflow used to run on the same model. The router maps
+each phase (ranking, investigation, summary) and, for investigations, the
+task severity from INVESTIGATION_TASKS to a model tier:
+- fast: cheap, quick model for ranking and the bulk of "Bajo"/"Medio" checks
+- standard: the default model for "Alto" tasks and the summary
+- strong: only used when an investigation is escalated
+
+An investigation whose findings come back with low confidence is re-run once
+on the next tier up (the shared evidence store makes the re-run's tool calls
+cache hits, so escalation mostly costs LLM tokens).
+"""
+from typing import Optional
+
+from app.config import settings
+from app.schemas import FraudDetectionOutput
+
+TIERS = ("fast", "standard", "strong")
+
+PHASE_TIERS = {
+    "ranking": "fast",
+    "investigation": "standard",  # Tasks without a known severity
+    "summary": "standard",
+}
+
+SEVERITY_TIERS = {
+    "Bajo": "fast",
+    "Medio": "fast",
+    "Alto": "standard",
+    "Muy Alto": "standard",
+    "Crítico": "standard",
+}
+
+
+class ModelRouter:
+    """
+    Chooses the model for each phase of the workflow.
+
+    Usage:
+        router = ModelRouter()
+        tier = router.tier_for("investigation", severity=task["severity"])
+        model_name = router.model_for(tier)
+        if router.should_escalate(result):
+            tier = router.escalate(tier)
+    """
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        models: dict = None,
+        pinned: dict = None,
+        escalation_confidence: float = None,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            enabled: Route by phase and severity (default from config); when off every phase uses the standard tier
+            models: Model name by tier (default from config)
+            pinned: Model name by phase, bypassing routing and escalation for that phase
+            escalation_confidence: Findings below this confidence trigger escalation (default from config)
+        """
+        self.enabled = settings.model_routing_enabled if enabled is None else enabled
+        self.models = models or {
+            "fast": settings.model_tier_fast,
+            "standard": settings.model_tier_standard,
+            "strong": settings.model_tier_strong,
+        }
+        self.pinned = {phase: model for phase, model in (pinned or {}).items() if model}
+        self.escalation_confidence = (
+            settings.model_routing_escalation_confidence
+            if escalation_confidence is None
+            else escalation_confidence
+        )
+
+    def tier_for(self, phase: str, severity: str = None) -> str:
+        """
+        Get the tier for a phase.
+
+        Args:
+            phase: "ranking", "investigation" or "summary"
+            severity: Task severity (investigations only)
+
+        Returns:
+            Tier name
+        """
+        if not self.enabled:
+            return "standard"
+        if phase == "investigation" and severity in SEVERITY_TIERS:
+            return SEVERITY_TIERS[severity]
+        return PHASE_TIERS.get(phase, "standard")
+
+    def model_for(self, tier: str, phase: str = None) -> str:
+        """Model name for a tier (or the model pinned for the phase)"""
+        if phase in self.pinned:
+            return self.pinned[phase]
+        return self.models[tier]
+
+    def escalate(self, tier: str) -> Optional[str]:
+        """Next stronger tier with a different model, or None if there is none"""
+        for stronger in TIERS[TIERS.index(tier) + 1:]:
+            if self.models.get(stronger) and self.models[stronger] != self.models[tier]:
+                return stronger
+        return None
+
+    def should_escalate(self, result: FraudDetectionOutput, phase: str = "investigation") -> bool:
+        """
+        Check whether an investigation result is too uncertain to keep.
+
+        Results from runs that hit the iteration limit are not escalated: the
+        limit, not the model, is what cut them short.
+
+        Args:
+            result: Result of the investigation
+            phase: Phase of the result (pinned phases are never escalated)
+
+        Returns:
+            True if any finding has a confidence below the escalation threshold
+        """
+        if not self.enabled or phase in self.pinned or result.iteration_limit_reached:
+            return False
+        return any(anomaly.confidence < self.escalation_confidence for anomaly in result.anomalies)
@@ -0,0 +1,79 @@
+"""
+Partial Salvage - Findings from the evidence of an agent run that hit its iteration limit
+
+When a task agent reaches its recursion limit, the evidence it gathered is in
+its message history but no structured answer was produced. Instead of
+discarding the run, the agent streams its state and, at the limit, makes one
+cheap structured-output call (no tools) over a condensed transcript of that
+evidence. The result is flagged as incomplete.
+"""
+from typing import Any, Dict, List
+import json
+
+from langchain.messages import AIMessage, ToolMessage
+
+# Characters kept from each tool output in the transcript
+MAX_TOOL_OUTPUT_CHARS = 3000
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+
+def build_evidence_transcript(
+    messages: List[Any],
+    max_chars: int,
+    subtask_results: Dict[int, Dict[str, str]] = None,
+) -> str:
+    """
+    Condense an agent's message history into the evidence it gathered.
+
+    Tool calls, tool outputs (each shortened) and the agent's own notes are
+    kept in order; when the transcript is over the size, the oldest entries
+    are dropped first. Recorded subtask results are always included.
+
+    Args:
+        messages: Agent message history
+        max_chars: Maximum transcript size
+        subtask_results: Optional results recorded with record_subtask_result, by subtask number
+
+    Returns:
+        Transcript text
+    """
+    entries = []
+    for message in messages:
+        if isinstance(message, AIMessage):
+            notes = _text(message.content).strip()
+            if notes:
+                entries.append(f"[Agent notes]\n{notes}")
+            for call in message.tool_calls:
+                entries.append(
+                    f"[Tool call] {call['name']} {json.dumps(call['args'], ensure_ascii=False, default=str)}"
+                )
+        elif isinstance(message, ToolMessage):
+            output = _text(message.content)
+            if len(output) > MAX_TOOL_OUTPUT_CHARS:
+                output = output[:MAX_TOOL_OUTPUT_CHARS] + f"... [{len(output) - MAX_TOOL_OUTPUT_CHARS} chars omitted]"
+            entries.append(f"[Tool output: {message.name}]\n{output}")
+
+    header = ""
+    if subtask_results:
+        header = "RECORDED SUBTASK RESULTS:\n" + "\n".join(
+            f"- Subtask {number}: {result['verdict']} - {result['evidence']}"
+            for number, result in sorted(subtask_results.items())
+        ) + "\n\n"
+
+    kept, size = [], len(header)
+    for entry in reversed(entries):
+        if size + len(entry) > max_chars:
+            break
+        kept.append(entry)
+        size += len(entry) + 2
+    dropped = len(entries) - len(kept)
+
+    transcript = "\n\n".join(reversed(kept))
+    if dropped:
+        transcript = f"[{dropped} earlier entries omitted]\n\n" + transcript
+    return header + "EVIDENCE GATHERED:\n" + transcript
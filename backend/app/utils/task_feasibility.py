@@ -0,0 +1,265 @@
+"""
+Task Feasibility - Rule-based pre-ranking of investigation tasks
+
+Most feasibility decisions do not need an LLM: whether a task can be validated
+follows from data the workflow already has before ranking, namely the names and
+types of the buyer attachments, whether the tender was awarded, and the number
+of evaluation criteria and guarantees published in the tender record.
+
+Each investigation task code has a rule that decides the task as feasible,
+infeasible, or ambiguous. Only the ambiguous tasks are sent to the RankingAgent;
+when none are ambiguous, the ranking step makes no LLM call at all.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import unicodedata
+
+from pydantic import BaseModel, Field
+
+from app.utils.get_tender import TenderResponse
+
+# Mercado Público status code for awarded tenders
+AWARDED_STATUS_CODE = 8
+
+# Keywords matched against attachment names, types and descriptions (accent-free, lowercase)
+BASES_KEYWORDS = ("bases", "pliego")
+ADMIN_BASES_KEYWORDS = ("administrativ",)
+TECHNICAL_KEYWORDS = ("tecnic", "especificacion", "terminos de referencia", "tdr")
+CONTRACT_KEYWORDS = ("contrato",)
+BUDGET_KEYWORDS = ("presupuesto", "monto estimado", "disponibilidad presupuestaria")
+
+# Rule outcome: True (feasible), False (infeasible) or None (ambiguous), with a reason
+RuleOutcome = Tuple[Optional[bool], str]
+
+
+def _normalize(value: Any) -> str:
+    """Lowercase a value and strip accents so keywords match regardless of spelling"""
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+class TenderFacts(BaseModel):
+    """Facts about a tender that the feasibility rules decide on"""
+
+    attachments: Optional[List[Dict[str, str]]] = Field(
+        default=None,
+        description="Buyer attachments (name, type, description), or None if they could not be listed",
+    )
+    awarded: bool = Field(default=False, description="Whether the tender has an award")
+    evaluation_criteria_count: int = Field(default=0, description="Evaluation criteria in the tender record")
+    guarantees_count: int = Field(default=0, description="Guarantees in the tender record")
+
+    @property
+    def no_attachments(self) -> bool:
+        """The attachments were listed and there are none"""
+        return self.attachments is not None and not self.attachments
+
+    def has_attachment(self, *keywords: str) -> bool:
+        """
+        Check whether any attachment mentions one of the keywords.
+
+        Args:
+            *keywords: Accent-free, lowercase keywords
+
+        Returns:
+            True if a keyword appears in an attachment's name, type or description
+        """
+        for attachment in self.attachments or []:
+            text = " ".join(_normalize(value) for value in attachment.values())
+            if any(keyword in text for keyword in keywords):
+                return True
+        return False
+
+
+def normalize_attachments(attachments: Optional[List[Any]]) -> Optional[List[Dict[str, str]]]:
+    """
+    Convert the buyer attachments table into a list of dicts.
+
+    Accepts the table returned by read_buyer_attachments_table
+    ([[id, file_name, type, description, file_size, uploaded_at], ...], with a
+    header row) as well as lists of dicts.
+
+    Args:
+        attachments: Raw attachments table, or None if it could not be read
+
+    Returns:
+        List of {"name", "type", "description"} dicts, or None if unknown
+    """
+    if attachments is None:
+        return None
+
+    normalized = []
+    for row in attachments:
+        if isinstance(row, dict):
+            normalized.append({
+                "name": str(row.get("name") or row.get("file_name") or ""),
+                "type": str(row.get("type") or ""),
+                "description": str(row.get("description") or ""),
+            })
+        elif isinstance(row, (list, tuple)) and len(row) >= 4:
+            if row[0] == "id":
+                continue  # header row
+            normalized.append({"name": str(row[1]), "type": str(row[2]), "description": str(row[3])})
+    return normalized
+
+
+def build_tender_facts(
+    tender_response: Optional[TenderResponse], attachments: Optional[List[Any]]
+) -> TenderFacts:
+    """
+    Collect the facts the feasibility rules need.
+
+    Args:
+        tender_response: TenderResponse from get_tender(), or None if it could not be fetched
+        attachments: Raw buyer attachments table, or None if it could not be read
+
+    Returns:
+        TenderFacts for the tender
+    """
+    facts = TenderFacts(attachments=normalize_attachments(attachments))
+    if tender_response is not None:
+        facts.awarded = (
+            tender_response.statusCode == AWARDED_STATUS_CODE
+            or _normalize(tender_response.status).startswith("adjudicad")
+        )
+        facts.evaluation_criteria_count = len(tender_response.TenderEvaluationCriteria)
+        facts.guarantees_count = len(tender_response.TenderGuarantees)
+    return facts
+
+
+# Rules by task code
+
+def _differentiated_bases(facts: TenderFacts) -> RuleOutcome:
+    if facts.no_attachments:
+        return False, "no buyer attachments to compare"
+    if facts.has_attachment(*BASES_KEYWORDS):
+        return True, "bases documents attached"
+    return None, "attachments do not mention bases"
+
+
+def _technical_bases(facts: TenderFacts) -> RuleOutcome:
+    if facts.no_attachments:
+        return False, "no buyer attachments with technical specifications"
+    if facts.has_attachment(*TECHNICAL_KEYWORDS):
+        return True, "technical specifications attached"
+    return None, "technical specifications may be inside other documents"
+
+
+def _administrative_bases(facts: TenderFacts) -> RuleOutcome:
+    if facts.has_attachment(*ADMIN_BASES_KEYWORDS, *BASES_KEYWORDS):
+        return True, "administrative bases attached"
+    if facts.no_attachments:
+        return False, "no buyer attachments with administrative bases"
+    return None, "attachments do not mention bases"
+
+
+def _evaluation_criteria(facts: TenderFacts) -> RuleOutcome:
+    if facts.evaluation_criteria_count > 0:
+        return True, f"{facts.evaluation_criteria_count} evaluation criteria published"
+    if facts.has_attachment(*BASES_KEYWORDS):
+        return True, "criteria can be read from the attached bases"
+    if facts.no_attachments:
+        return False, "no evaluation criteria and no attachments"
+    return None, "no published evaluation criteria"
+
+
+def _arbitrary_requirements(facts: TenderFacts) -> RuleOutcome:
+    if facts.has_attachment(*BASES_KEYWORDS, *TECHNICAL_KEYWORDS):
+        return True, "bases attached"
+    if facts.no_attachments:
+        return False, "no bases to review for requirements"
+    return None, "attachments do not mention bases"
+
+
+def _sme_participation(facts: TenderFacts) -> RuleOutcome:
+    if facts.has_attachment(*BASES_KEYWORDS):
+        return True, "bases attached"
+    if facts.guarantees_count > 0:
+        return True, f"{facts.guarantees_count} guarantees published"
+    if facts.no_attachments:
+        return False, "no bases and no guarantees"
+    return None, "attachments do not mention bases"
+
+
+def _integrity_criterion(facts: TenderFacts) -> RuleOutcome:
+    if facts.evaluation_criteria_count > 0:
+        return True, f"{facts.evaluation_criteria_count} evaluation criteria published"
+    if facts.no_attachments:
+        return False, "no evaluation criteria and no attachments"
+    return None, "no published evaluation criteria"
+
+
+def _contract_publication(facts: TenderFacts) -> RuleOutcome:
+    if not facts.awarded:
+        return False, "tender has not been awarded"
+    if facts.has_attachment(*CONTRACT_KEYWORDS):
+        return True, "contract attached"
+    return None, "awarded, contract may be in the award documents"
+
+
+def _estimated_budget(facts: TenderFacts) -> RuleOutcome:
+    if facts.has_attachment(*BUDGET_KEYWORDS, *BASES_KEYWORDS):
+        return True, "budget or bases documents attached"
+    return None, "budget may only appear in the tender record"
+
+
+def _cost_benefit(facts: TenderFacts) -> RuleOutcome:
+    if facts.evaluation_criteria_count > 0:
+        return True, f"{facts.evaluation_criteria_count} evaluation criteria published"
+    if facts.no_attachments:
+        return False, "no evaluation criteria and no attachments"
+    return None, "no published evaluation criteria"
+
+
+FEASIBILITY_RULES: Dict[str, Callable[[TenderFacts], RuleOutcome]] = {
+    "H-01": _differentiated_bases,
+    "H-02": _technical_bases,
+    "H-03": _administrative_bases,
+    "H-05": _estimated_budget,
+    "H-06": _cost_benefit,
+    "H-07": _evaluation_criteria,
+    "H-08": _evaluation_criteria,
+    "H-09": _arbitrary_requirements,
+    "H-13": _sme_participation,
+    "H-14": _integrity_criterion,
+    "H-31": _contract_publication,
+}
+
+
+class FeasibilityClassification(BaseModel):
+    """Result of the rule-based pre-ranking"""
+
+    feasible: List[Dict[str, Any]] = Field(default_factory=list)
+    infeasible: List[Dict[str, Any]] = Field(default_factory=list)
+    ambiguous: List[Dict[str, Any]] = Field(default_factory=list)
+    reasons: Dict[str, str] = Field(default_factory=dict, description="Reason for each decision, by task code")
+
+
+def classify_tasks(tasks: List[Dict[str, Any]], facts: TenderFacts) -> FeasibilityClassification:
+    """
+    Decide which tasks are feasible using the rule for each task code.
+
+    Tasks without a rule, or whose rule cannot decide, are ambiguous.
+
+    Args:
+        tasks: Investigation tasks (as in INVESTIGATION_TASKS)
+        facts: Facts about the tender
+
+    Returns:
+        FeasibilityClassification with the tasks split by outcome, in input order
+    """
+    classification = FeasibilityClassification()
+    for task in tasks:
+        rule = FEASIBILITY_RULES.get(task["code"])
+        if rule is None:
+            outcome, reason = None, "no rule for this task"
+        else:
+            outcome, reason = rule(facts)
+
+        if outcome is True:
+            classification.feasible.append(task)
+        elif outcome is False:
+            classification.infeasible.append(task)
+        else:
+            classification.ambiguous.append(task)
+        classification.reasons[task["code"]] = reason
+    return classification
@@ -0,0 +1,162 @@
+"""
+Task Plans - Precomputed investigation plans per task code
+
+The get_plan tool used to build a new PlanAgent and make a full LLM call
+inside every task agent's loop, although the plan for a task code barely
+changes: it follows from the task's subtasks and where to look. Plans for
+every INVESTIGATION_TASKS code are now derived from the task definition when
+the module loads, and the task prompt includes them, so task agents no longer
+need to call get_plan at all.
+
+Requests for other tasks still go to the PlanAgent; those plans are cached
+per (task code, tender type), so each combination costs one LLM call per process.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import re
+import threading
+
+from app.config import settings
+from app.investigation_tasks import INVESTIGATION_TASKS
+
+# Where-to-look keywords of documents published with the award (lowercase)
+AWARD_KEYWORDS = ("contrato", "adjudic", "oferta")
+
+
+def build_task_plan(task: Dict[str, Any], record_subtasks: bool = None) -> List[str]:
+    """
+    Derive the investigation steps of a task from its subtasks.
+
+    Args:
+        task: Investigation task (as in INVESTIGATION_TASKS)
+        record_subtasks: Ask for record_subtask_result after each subtask; the tool only
+            exists with the termination policy enabled (default from config)
+
+    Returns:
+        Plan steps, one per subtask plus document discovery and conclusion
+    """
+    where = task.get("where_to_look") or "tender documents"
+    sources = "read_buyer_attachment_doc"
+    if any(keyword in where.lower() for keyword in AWARD_KEYWORDS):
+        sources += " or read_award_result_attachment_doc"
+
+    if record_subtasks is None:
+        record_subtasks = settings.termination_policy_enabled
+
+    steps = [
+        f"Locate the documents for '{where}' in the Available Documents of the tender context "
+        "(row ids, types and pages; call read_buyer_attachments_table only if that list is empty), "
+        "and use search_tender_documents with the key terms of the subtasks to find the relevant pages"
+    ]
+    for number, subtask in enumerate(task.get("subtasks", []), start=1):
+        step = (
+            f"Subtask {number}: {subtask} Read only the pages that cover it with {sources}, "
+            "note the document and page of the evidence"
+        )
+        if record_subtasks:
+            step += f", and call record_subtask_result(subtask={number}, ...)"
+        steps.append(step)
+    steps.append(
+        "Conclude: report each failed subtask as an anomaly with its evidence and fraud risk, "
+        "and state which subtasks could not be verified"
+    )
+    return steps
+
+
+# Plans for every known task code, with and without record_subtask_result steps
+TASK_PLANS: Dict[bool, Dict[str, List[str]]] = {
+    record_subtasks: {task["code"]: build_task_plan(task, record_subtasks) for task in INVESTIGATION_TASKS}
+    for record_subtasks in (True, False)
+}
+
+
+def get_task_plan(task_code: Optional[str]) -> Optional[List[str]]:
+    """
+    Get the precomputed plan of a task code.
+
+    Args:
+        task_code: Task code (e.g. "H-07")
+
+    Returns:
+        Plan steps matching the current termination policy setting, or None for unknown codes
+    """
+    return TASK_PLANS[settings.termination_policy_enabled].get(task_code)
+
+
+def tender_type(tender_id: Optional[str]) -> str:
+    """
+    Get the procurement type from a Mercado Público tender code.
+
+    Args:
+        tender_id: Tender code (e.g. "1234-56-LR22")
+
+    Returns:
+        Type prefix of the last segment (e.g. "LR"), or "unknown"
+    """
+    if not tender_id or "-" not in tender_id:
+        return "unknown"
+    match = re.match(r"[A-Za-z]+", tender_id.rsplit("-", 1)[-1])
+    return match.group(0).upper() if match else "unknown"
+
+
+class PlanCache:
+    """
+    Thread-safe cache of LLM-generated plans by (task code, tender type).
+
+    Usage:
+        plans = PlanCache()
+        steps = plans.get_or_create(("H-99", "LR"), lambda: PlanAgent().run(request).steps)
+    """
+
+    def __init__(self):
+        self._plans: Dict[Tuple[str, str], List[str]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: Tuple[str, str], create: Callable[[], List[str]]) -> List[str]:
+        """
+        Get a cached plan, generating it once if missing.
+
+        Concurrent requests for the same key wait for the first one instead of
+        making their own LLM call.
+
+        Args:
+            key: (task code, tender type)
+            create: Function generating the plan steps
+
+        Returns:
+            Plan steps
+        """
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._plans:
+                    self.hits += 1
+                    return self._plans[key]
+            steps = create()
+            with self._lock:
+                self._plans[key] = steps
+                self.misses += 1
+            return steps
+
+
+def plan_key(task_code: Optional[str], tender_id: Optional[str], user_request: str) -> Tuple[str, str]:
+    """
+    Cache key of a generated plan.
+
+    Requests without a task code are keyed by their text, so unrelated requests never share a plan.
+    """
+    code = task_code or "request:" + hashlib.sha256(user_request.encode("utf-8")).hexdigest()[:16]
+    return code, tender_type(tender_id)
+
+
+# Global cache shared by all agents of the process
+_plan_cache = PlanCache()
+
+
+def get_plan_cache() -> PlanCache:
+    """Get the global plan cache"""
+    return _plan_cache
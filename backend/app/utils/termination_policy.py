@@ -0,0 +1,141 @@
+"""
+Termination Policy - Early exit for task agents that have enough evidence
+
+Task agents tend to keep reading pages after every subtask of their task has
+been settled, until they run into the recursion limit. The policy tracks two
+signals during an agent run:
+- subtask coverage: the agent records a verdict and evidence for each subtask
+  of task["subtasks"] with the record_subtask_result tool
+- progress: each step whose tool calls return no evidence that was not
+  already seen in this run counts towards a max-steps-without-new-evidence cutoff
+
+Once all subtasks are covered, or the cutoff is reached,
+TerminationPolicyMiddleware removes the investigation tools so the model
+returns its structured FraudDetectionOutput.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+import threading
+
+from app.utils.evidence_store import evidence_key, is_storable_evidence
+
+SUBTASK_VERDICTS = ("pass", "fail", "not_verifiable")
+
+# Tools whose results are not evidence about the tender
+NON_EVIDENCE_TOOLS = {"get_plan", "record_subtask_result"}
+
+
+class TerminationPolicy:
+    """
+    Tracks subtask coverage and evidence progress for one agent run.
+
+    Usage:
+        policy = TerminationPolicy(task["subtasks"], max_steps_without_evidence=6)
+        policy.record_subtask(1, "pass", "Bases p. 12 publish the weights")
+        policy.observe_tool_result("read_award_result", {"id": tender_id}, message)
+        policy.end_step()
+        reason = policy.stop_reason()
+    """
+
+    def __init__(self, subtasks: List[str] = None, max_steps_without_evidence: int = None):
+        """
+        Initialize the policy.
+
+        Args:
+            subtasks: Subtasks of the task (numbered from 1 in the task prompt)
+            max_steps_without_evidence: Steps without new evidence before stopping (None: no cutoff)
+        """
+        self.subtasks = list(subtasks or [])
+        self.max_steps_without_evidence = max_steps_without_evidence
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything recorded (start of a new agent run)"""
+        with self._lock:
+            self.results: Dict[int, Dict[str, str]] = {}
+            self._seen: Set[Tuple[str, str]] = set()
+            self._tools_this_step = False
+            self._progress_this_step = False
+            self.steps_without_evidence = 0
+
+    def record_subtask(self, number: int, verdict: str, evidence: str) -> Optional[str]:
+        """
+        Record the conclusion of a subtask.
+
+        Args:
+            number: Subtask number (1-indexed)
+            verdict: One of SUBTASK_VERDICTS
+            evidence: Evidence supporting the verdict
+
+        Returns:
+            Error message if the subtask or verdict is invalid, None otherwise
+        """
+        if not 1 <= number <= len(self.subtasks):
+            return f"Subtask must be between 1 and {len(self.subtasks)}"
+        if verdict not in SUBTASK_VERDICTS:
+            return f"Verdict must be one of {', '.join(SUBTASK_VERDICTS)}"
+        if not evidence.strip():
+            return "Evidence is required"
+        with self._lock:
+            self.results[number] = {"verdict": verdict, "evidence": evidence}
+            self._progress_this_step = True
+        return None
+
+    def observe_tool_result(self, tool_name: str, args: Dict[str, Any], result: Any) -> None:
+        """
+        Note a tool result; successful results not seen before in this run are new evidence.
+
+        Args:
+            tool_name: Name of the tool
+            args: Tool call arguments
+            result: Tool result (ToolMessage or Command)
+        """
+        with self._lock:
+            self._tools_this_step = True
+            if tool_name in NON_EVIDENCE_TOOLS or not is_storable_evidence(result):
+                return
+            key = evidence_key(tool_name, args)
+            if key not in self._seen:
+                self._seen.add(key)
+                self._progress_this_step = True
+
+    def end_step(self) -> None:
+        """Close the step whose tool results were observed (called before each model call)"""
+        with self._lock:
+            if not self._tools_this_step:
+                return
+            if self._progress_this_step:
+                self.steps_without_evidence = 0
+            else:
+                self.steps_without_evidence += 1
+            self._tools_this_step = False
+            self._progress_this_step = False
+
+    @property
+    def missing_subtasks(self) -> List[int]:
+        """Numbers of the subtasks without a recorded result"""
+        return [number for number in range(1, len(self.subtasks) + 1) if number not in self.results]
+
+    def coverage(self) -> str:
+        """Short description of the subtask coverage"""
+        covered = len(self.subtasks) - len(self.missing_subtasks)
+        text = f"{covered}/{len(self.subtasks)} subtasks covered"
+        if self.missing_subtasks:
+            text += f"; missing: {', '.join(str(number) for number in self.missing_subtasks)}"
+        return text
+
+    def stop_reason(self) -> Optional[str]:
+        """
+        Check whether the agent should stop investigating.
+
+        Returns:
+            Reason to stop, or None to continue
+        """
+        if self.subtasks and not self.missing_subtasks:
+            return f"all {len(self.subtasks)} subtasks have recorded evidence"
+        if (
+            self.max_steps_without_evidence
+            and self.steps_without_evidence >= self.max_steps_without_evidence
+        ):
+            return f"{self.steps_without_evidence} steps without new evidence ({self.coverage()})"
+        return None
@@ -0,0 +1,102 @@
+"""
+Tool Concurrency - Per-tool limits on concurrent tool executions
+
+When the model requests several tool calls in one step, the agent's tool node
+runs them concurrently in a thread pool, so a step that reads the award result
+and two attachments costs the slowest call instead of the sum. Across the
+parallel task agents of an investigation (and concurrent investigations), that
+can put many downloads and OCR requests in flight against Mercado Público and
+the OCR API at once.
+
+The limiter holds one semaphore per tool, shared by every agent in the
+process, and ToolConcurrencyMiddleware runs each tool call inside a slot.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import threading
+
+from app.config import settings
+
+# Maximum concurrent executions by tool (other tools use settings.tool_max_concurrency)
+TOOL_CONCURRENCY_LIMITS = {
+    "read_buyer_attachment_doc": 4,  # Downloads and OCR API calls
+    "read_award_result_attachment_doc": 4,
+    "read_award_result": 2,  # Several Mercado Público pages per call
+    "read_buyer_attachments_table": 4,
+}
+
+
+class ToolConcurrencyLimiter:
+    """
+    Thread-safe per-tool concurrency limits.
+
+    Usage:
+        limiter = ToolConcurrencyLimiter()
+        with limiter.slot("read_buyer_attachment_doc"):
+            result = run_tool()
+    """
+
+    def __init__(self, limits: Dict[str, int] = None, default_limit: int = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            limits: Maximum concurrent executions by tool name (default TOOL_CONCURRENCY_LIMITS)
+            default_limit: Limit for other tools (default from config)
+        """
+        self.limits = TOOL_CONCURRENCY_LIMITS if limits is None else limits
+        self.default_limit = default_limit or settings.tool_max_concurrency
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+        self.waits = 0
+
+    def limit_for(self, tool_name: str) -> int:
+        """Concurrency limit of a tool"""
+        return self.limits.get(tool_name, self.default_limit)
+
+    @contextmanager
+    def slot(self, tool_name: str) -> Iterator[None]:
+        """
+        Hold one of a tool's execution slots for the duration of the block.
+
+        Args:
+            tool_name: Name of the tool
+        """
+        semaphore = self._semaphore(tool_name)
+        if not semaphore.acquire(blocking=False):
+            with self._lock:
+                self.waits += 1
+            semaphore.acquire()
+        with self._lock:
+            self._active[tool_name] = self._active.get(tool_name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[tool_name] -= 1
+            semaphore.release()
+
+    def active(self, tool_name: str) -> int:
+        """Number of executions of a tool currently running"""
+        with self._lock:
+            return self._active.get(tool_name, 0)
+
+    def _semaphore(self, tool_name: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(tool_name)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.limit_for(tool_name))
+                self._semaphores[tool_name] = semaphore
+            return semaphore
+
+
+_tool_limiter = None
+
+
+def get_tool_limiter() -> ToolConcurrencyLimiter:
+    """Get or create the process-wide tool concurrency limiter"""
+    global _tool_limiter
+    if _tool_limiter is None:
+        _tool_limiter = ToolConcurrencyLimiter()
+    return _tool_limiter
@@ -0,0 +1,281 @@
+"""
+Tool Output Governor - Bounded tool results in the agents' message history
+
+Every tool result is appended to the agent's messages and re-sent on each later
+LLM call, so a single large result (read_award_result with every bid of every
+item, or a long page range of OCR text) inflates the cost and latency of all
+remaining steps.
+
+The governor applies a token budget per tool. Results over budget are reduced:
+- award results keep, per item, the awarded bids and the lowest offers plus
+  aggregates over all bids (count, min, max, median offer)
+- document text keeps whole pages up to the budget and lists the omitted ones
+- anything else is cut at the budget
+The full result is kept under a handle, and the agent can page through it with
+the read_tool_output tool registered by ToolOutputGovernorMiddleware.
+"""
+from typing import Any, Dict, List, Optional
+import itertools
+import json
+import re
+import statistics
+import threading
+
+from app.config import settings
+
+# Rough token estimate for mixed Spanish text and JSON
+CHARS_PER_TOKEN = 4
+
+# Token budgets by tool (other tools use settings.tool_output_max_tokens)
+TOOL_OUTPUT_BUDGETS = {
+    "read_award_result": 4000,
+    "read_buyer_attachments_table": 2000,
+    "search_tender_documents": 2000,
+    "read_buyer_attachment_doc": 6000,
+    "read_award_result_attachment_doc": 6000,
+}
+
+# Longest string kept in a summarized award result (supplier specifications, overview text)
+MAX_FIELD_CHARS = 600
+
+PAGE_MARKER = re.compile(r"--- Page (\d+) ---")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """
+    Parse a Mercado Público amount such as "$ 1.234.567,5" or "CLP 12.000".
+
+    Returns:
+        The amount as a float, or None if the value has no number
+    """
+    digits = re.sub(r"[^\d,]", "", str(value or ""))
+    if not re.search(r"\d", digits):
+        return None
+    try:
+        return float(digits.replace(",", "."))
+    except ValueError:
+        return None
+
+
+def summarize_bids(bids: List[Dict[str, Any]], top_n: int) -> Dict[str, Any]:
+    """
+    Reduce the bids of one item to the awarded bids, the lowest offers and aggregates.
+
+    Args:
+        bids: Bids as parsed by read_award_result
+        top_n: Number of lowest offers to keep (awarded bids are always kept)
+
+    Returns:
+        dict: {bids, bid_count, omitted_bids, offer_min, offer_max, offer_median}
+    """
+    offers = [(parse_amount(bid.get("unit_offer_amount")), index) for index, bid in enumerate(bids)]
+    priced = sorted((amount, index) for amount, index in offers if amount is not None)
+    keep = {index for index, bid in enumerate(bids) if bid.get("status") == "Adjudicada"}
+    keep.update(index for _, index in priced[:top_n])
+    if not priced:
+        keep.update(range(min(top_n, len(bids))))
+
+    summary = {
+        "bids": [_truncate_fields(bids[index]) for index in sorted(keep)],
+        "bid_count": len(bids),
+        "omitted_bids": len(bids) - len(keep),
+    }
+    amounts = [amount for amount, _ in priced]
+    if amounts:
+        summary.update({
+            "offer_min": min(amounts),
+            "offer_max": max(amounts),
+            "offer_median": statistics.median(amounts),
+        })
+    return summary
+
+
+def summarize_award_result(data: Dict[str, Any], top_n: int) -> Dict[str, Any]:
+    """
+    Summarize a read_award_result result.
+
+    Args:
+        data: Full award result
+        top_n: Lowest offers kept per item
+
+    Returns:
+        Award result with each item's bids summarized and long text fields shortened
+    """
+    summary = _truncate_fields({key: value for key, value in data.items() if key != "award_result"})
+    items = []
+    for item in data.get("award_result") or []:
+        reduced = _truncate_fields({key: value for key, value in item.items() if key != "bids"})
+        if "bids" in item:
+            reduced.update(summarize_bids(item["bids"], top_n))
+        items.append(reduced)
+    summary["award_result"] = items
+    return summary
+
+
+def truncate_document_text(text: str, max_chars: int) -> Dict[str, Any]:
+    """
+    Keep whole "--- Page N ---" blocks of a document text up to a size.
+
+    Args:
+        text: Document text as returned by the document tools
+        max_chars: Maximum characters kept
+
+    Returns:
+        dict: {text, omitted_pages}
+    """
+    blocks = [block for block in re.split(r"(?=--- Page \d+ ---)", text) if block.strip()]
+    if not blocks:
+        return {"text": text[:max_chars], "omitted_pages": []}
+    kept, size = [], 0
+    for block in blocks:
+        if size + len(block) > max_chars:
+            break
+        kept.append(block)
+        size += len(block)
+    if not kept:
+        # The first page alone is over the size: keep its beginning
+        kept = [blocks[0][:max_chars]]
+        omitted = blocks[1:]
+    else:
+        omitted = blocks[len(kept):]
+    omitted_pages = [int(match.group(1)) for block in omitted for match in [PAGE_MARKER.match(block)] if match]
+    return {"text": "".join(kept).rstrip(), "omitted_pages": omitted_pages}
+
+
+def _truncate_fields(value: Any) -> Any:
+    """Shorten long strings in a nested structure"""
+    if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+        return value[:MAX_FIELD_CHARS] + f"... [{len(value) - MAX_FIELD_CHARS} chars omitted]"
+    if isinstance(value, dict):
+        return {key: _truncate_fields(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_truncate_fields(item) for item in value]
+    return value
+
+
+class ToolOutputGovernor:
+    """
+    Applies per-tool token budgets to tool results and keeps the full results for paging.
+
+    One governor is created per agent; handles are only valid for that agent.
+
+    Usage:
+        governor = ToolOutputGovernor()
+        content = governor.govern("read_award_result", message.content)
+        page = governor.page(handle, part=2)
+    """
+
+    def __init__(self, budgets: Dict[str, int] = None, default_budget: int = None, top_bids: int = None):
+        """
+        Initialize the governor.
+
+        Args:
+            budgets: Token budget by tool name (default TOOL_OUTPUT_BUDGETS)
+            default_budget: Budget for other tools (default from config)
+            top_bids: Lowest offers kept per award item (default from config)
+        """
+        self.budgets = TOOL_OUTPUT_BUDGETS if budgets is None else budgets
+        self.default_budget = default_budget or settings.tool_output_max_tokens
+        self.top_bids = top_bids or settings.tool_output_top_bids
+        self._outputs: Dict[str, Dict[str, Any]] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def budget_for(self, tool_name: str) -> int:
+        """Token budget of a tool"""
+        return self.budgets.get(tool_name, self.default_budget)
+
+    def govern(self, tool_name: str, content: str) -> str:
+        """
+        Reduce a tool result to its tool's budget.
+
+        Args:
+            tool_name: Name of the tool
+            content: Tool result content (JSON for dict results)
+
+        Returns:
+            The content unchanged if within budget, otherwise a reduced version
+            with an "_output" entry describing how to read the rest
+        """
+        budget = self.budget_for(tool_name)
+        if estimate_tokens(content) <= budget:
+            return content
+
+        max_chars = budget * CHARS_PER_TOKEN
+        handle = self._store(tool_name, content, max_chars)
+        notice = {
+            "truncated": True,
+            "handle": handle,
+            "original_tokens": estimate_tokens(content),
+            "total_parts": self._outputs[handle]["total_parts"],
+            "hint": f"Call read_tool_output with handle '{handle}' and part 1..N to read the full result",
+        }
+
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+
+        if isinstance(data, dict):
+            if tool_name == "read_award_result" and "award_result" in data:
+                data = summarize_award_result(data, self.top_bids)
+            elif isinstance(data.get("text"), str):
+                # Leave room for the other fields of the result and the omitted page list
+                text = data.pop("text")
+                overhead = len(json.dumps({**data, "_output": notice}, ensure_ascii=False, default=str))
+                truncated = truncate_document_text(text, max(0, int(max_chars * 0.9) - overhead))
+                data["text"] = truncated["text"]
+                notice["omitted_pages"] = truncated["omitted_pages"]
+            reduced = json.dumps({**data, "_output": notice}, ensure_ascii=False, default=str)
+            if estimate_tokens(reduced) <= budget:
+                return reduced
+
+        # Generic cut at the budget
+        return json.dumps({
+            "content": content[:max_chars],
+            "_output": notice,
+        }, ensure_ascii=False)
+
+    def page(self, handle: str, part: int) -> Dict[str, Any]:
+        """
+        Read one part of a stored full result.
+
+        Args:
+            handle: Handle returned in a truncated result's "_output"
+            part: Part number (1-indexed)
+
+        Returns:
+            dict: {handle, tool, part, total_parts, content} or {error}
+        """
+        with self._lock:
+            output = self._outputs.get(handle)
+        if output is None:
+            return {"error": f"Unknown handle '{handle}'"}
+        if not 1 <= part <= output["total_parts"]:
+            return {"error": f"Part must be between 1 and {output['total_parts']}"}
+
+        size = output["part_chars"]
+        return {
+            "handle": handle,
+            "tool": output["tool"],
+            "part": part,
+            "total_parts": output["total_parts"],
+            "content": output["content"][(part - 1) * size:part * size],
+        }
+
+    def _store(self, tool_name: str, content: str, part_chars: int) -> str:
+        """Keep a full result and return its handle"""
+        handle = f"out-{next(self._counter)}"
+        with self._lock:
+            self._outputs[handle] = {
+                "tool": tool_name,
+                "content": content,
+                "part_chars": part_chars,
+                "total_parts": -(-len(content) // part_chars),
+            }
+        return handle
@@ -1,48 +1,256 @@
 """
 WebSocket connection manager for real-time agent observations
 """
-from typing import Dict, Set, Optional
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Set, Optional
 from fastapi import WebSocket
-import json
+import asyncio
+import itertools
 import logging
+import threading
+import time
 
-from app.services.websocket_log_service import save_websocket_message
+from app.config import settings
+from app.services.websocket_log_service import log_writer
+from app.utils.event_backplane import PostgresBackplane
 
 logger = logging.getLogger(__name__)
 
+# Event types that are never dropped for slow clients
+CRITICAL_EVENT_TYPES = {"result", "task_result", "error"}
+
+
+class ClientChannel:
+    """
+    Bounded outgoing queue and sender task for one WebSocket client.
+
+    Events are pushed from the server event loop without awaiting the client,
+    and a dedicated task sends them in order. When the client falls behind:
+    - merge: a "log" event identical to the last queued one is coalesced into it
+    - drop: once the queue is full, the oldest non-critical event is dropped
+    Critical events (result, task_result, error) are always delivered.
+    """
+
+    def __init__(self, websocket: Optional[WebSocket] = None, max_size: int = None):
+        self.websocket = websocket
+        self.max_size = max_size or settings.websocket_client_queue_size
+        self.merged = 0
+        self.dropped = 0
+        self._events: Deque[dict] = deque()
+        self._ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def push(self, event: dict):
+        """
+        Queue an event for this client. Must be called on the server event loop.
+
+        Args:
+            event: The observation to send (JSON-serializable)
+        """
+        if (
+            event.get("type") == "log"
+            and self._events
+            and self._events[-1].get("type") == "log"
+            and self._events[-1].get("message") == event.get("message")
+        ):
+            self.merged += 1
+            return
+
+        if len(self._events) >= self.max_size:
+            for index, queued in enumerate(self._events):
+                if queued.get("type") not in CRITICAL_EVENT_TYPES:
+                    del self._events[index]
+                    self.dropped += 1
+                    break
+
+        self._events.append(event)
+        self._ready.set()
+
+    async def next_event(self) -> dict:
+        """Wait for and return the next queued event"""
+        while not self._events:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._events.popleft()
+
+    async def run(self):
+        """Send queued events to the WebSocket client until it disconnects"""
+        while True:
+            event = await self.next_event()
+            if "_text" in event:
+                await self.websocket.send_text(event["_text"])
+            else:
+                await self.websocket.send_json(event)
+
+
+class SessionStream:
+    """
+    Ring buffer of a session's most recent events.
+
+    Every event gets a monotonically increasing event_id when it is published.
+    Clients that connect late or reconnect pass the last event_id they saw and
+    receive the missed events from this buffer, without a database replay.
+    The event_id counter lives with the buffer, so both are evicted together; it
+    starts from the clock in microseconds, so a buffer recreated after eviction
+    numbers its events above every event_id handed out before, and clients that
+    resume with an older event_id still receive them.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.events: Deque[dict] = deque(maxlen=max_size or settings.websocket_event_buffer_size)
+        self._updated = asyncio.Event()
+        self._event_ids = itertools.count(time.time_ns() // 1000)
+
+    def next_event_id(self) -> int:
+        """Next event_id for an event published by this process"""
+        return next(self._event_ids)
+
+    def append(self, event: dict):
+        """Buffer an event and wake up waiting long-poll requests"""
+        self.events.append(event)
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def since(self, last_event_id: Optional[int] = None) -> List[dict]:
+        """
+        Get the buffered events after last_event_id.
+
+        Args:
+            last_event_id: Last event_id the client received (None for all buffered events)
+
+        Returns:
+            Buffered events in order (oldest ones may have been evicted)
+        """
+        if last_event_id is None:
+            return list(self.events)
+        return [event for event in self.events if event.get("event_id", 0) > last_event_id]
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Wait until a new event is buffered.
+
+        Returns:
+            True if an event arrived, False on timeout
+        """
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
 
 class ConnectionManager:
     """
     Manages WebSocket connections and broadcasts messages to connected clients.
 
     Supports multiple sessions, where each session can have multiple connected clients.
+
+    Acts as a thread-safe event bus: producers call publish() from any thread
+    (agent middleware, workflow nodes, background tasks) and delivery always
+    happens on the server event loop, which owns the WebSocket objects. Each
+    client has its own bounded ClientChannel so one slow client cannot stall
+    the others or the producers.
+
+    With a backplane attached, published events are also broadcast to the other
+    processes, which deliver them to the clients connected there.
+
+    Events are numbered per session and kept in a SessionStream ring buffer, so
+    WebSocket, SSE and long-poll clients can resume from the last event_id they saw.
     """
 
     def __init__(self):
-        # Maps session_id -> set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # Maps session_id -> set of connections (WebSockets, or channels for SSE clients)
+        self.active_connections: Dict[str, Set[Any]] = {}
+        # Maps connection -> its outgoing channel
+        self.channels: Dict[Any, ClientChannel] = {}
+        # Maps session_id -> recent events and event_id counter, most recently used last
+        self.streams: "OrderedDict[str, SessionStream]" = OrderedDict()
+        # Publishers create streams from any thread
+        self._streams_lock = threading.Lock()
         # Maps session_id -> tender_id for message logging
         self.session_to_tender_id: Dict[str, str] = {}
         # Set of session_ids that are in replay mode (don't save messages)
         self.replay_sessions: Set[str] = set()
+        # Server event loop that owns the WebSocket connections
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # Cross-process fan-out (None when running a single process)
+        self.backplane: Optional[PostgresBackplane] = None
+
+    def attach_backplane(self, backplane: PostgresBackplane):
+        """
+        Broadcast published events to other processes through a backplane.
+
+        Args:
+            backplane: The backplane to publish to
+        """
+        self.backplane = backplane
 
-    async def connect(self, websocket: WebSocket, session_id: str):
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Bind the server event loop that delivers events to clients.
+
+        Args:
+            loop: The running server event loop
+        """
+        self.loop = loop
+
+    async def connect(self, websocket: WebSocket, session_id: str, last_event_id: Optional[int] = None):
         """
         Accept a WebSocket connection and add it to the session.
 
+        Buffered events after last_event_id are sent first, so clients that connect
+        late or reconnect do not miss events.
+
         Args:
             websocket: The WebSocket connection to add
             session_id: The session ID to associate with this connection
+            last_event_id: Last event_id the client received (None for all buffered events)
         """
         await websocket.accept()
+        channel = self.subscribe(session_id, last_event_id, websocket)
+        channel.task = asyncio.create_task(self._run_channel(channel, session_id))
 
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = set()
-
-        self.active_connections[session_id].add(websocket)
         logger.info(f"Client connected to session {session_id}. Total connections: {len(self.active_connections[session_id])}")
 
-    def disconnect(self, websocket: WebSocket, session_id: str):
+    def subscribe(
+        self,
+        session_id: str,
+        last_event_id: Optional[int] = None,
+        websocket: Optional[WebSocket] = None,
+    ) -> ClientChannel:
+        """
+        Register a client channel for a session, pre-filled with the missed events.
+
+        Used directly by SSE clients, which read the channel themselves; WebSocket
+        clients go through connect(). Must be called on the server event loop.
+
+        Args:
+            session_id: The session ID to subscribe to
+            last_event_id: Last event_id the client received (None for all buffered events)
+            websocket: The WebSocket connection, if any
+
+        Returns:
+            The client's channel
+        """
+        if self.loop is None:
+            self.bind_loop(asyncio.get_running_loop())
+
+        channel = ClientChannel(websocket)
+        connection = websocket if websocket is not None else channel
+        self.channels[connection] = channel
+        self.active_connections.setdefault(session_id, set()).add(connection)
+
+        stream = self.streams.get(session_id)
+        if stream is not None:
+            for event in stream.since(last_event_id):
+                channel.push(event)
+        return channel
+
+    def unsubscribe(self, channel: ClientChannel, session_id: str):
+        """Remove a channel registered with subscribe() (SSE clients)"""
+        self.disconnect(channel.websocket if channel.websocket is not None else channel, session_id)
+
+    def disconnect(self, websocket: Any, session_id: str):
         """
         Remove a WebSocket connection from the session.
 
@@ -50,6 +258,16 @@ class ConnectionManager:
             websocket: The WebSocket connection to remove
             session_id: The session ID to remove the connection from
         """
+        channel = self.channels.pop(websocket, None)
+        if channel is not None:
+            if channel.task is not None and channel.task is not asyncio.current_task():
+                channel.task.cancel()
+            if channel.dropped or channel.merged:
+                logger.info(
+                    f"Client in session {session_id} was slow: "
+                    f"{channel.dropped} events dropped, {channel.merged} merged"
+                )
+
         if session_id in self.active_connections:
             self.active_connections[session_id].discard(websocket)
 
@@ -58,11 +276,21 @@ class ConnectionManager:
                 del self.active_connections[session_id]
 
             logger.info(f"Client disconnected from session {session_id}")
-    
+
+    async def _run_channel(self, channel: ClientChannel, session_id: str):
+        """Run a client's sender task, dropping the client when sending fails"""
+        try:
+            await channel.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to client in session {session_id}: {e}")
+            self.disconnect(channel.websocket, session_id)
+
     def register_tender_id(self, session_id: str, tender_id: str, is_replay: bool = False):
         """
         Register a tender_id for a session to enable message logging.
-        
+
         Args:
             session_id: The session ID
             tender_id: The tender ID associated with this session
@@ -73,42 +301,122 @@ class ConnectionManager:
             self.replay_sessions.add(session_id)
         logger.debug(f"Registered tender_id {tender_id} for session {session_id} (replay={is_replay})")
 
+    def publish(self, session_id: str, observation: dict):
+        """
+        Publish an observation from any thread without blocking.
+
+        The message is queued for persistence immediately and handed to the server
+        event loop for delivery to the session's clients.
+
+        Args:
+            session_id: The session ID to send the observation to
+            observation: The observation data to send (will be JSON serialized)
+        """
+        self._persist(session_id, observation)
+        event = {**observation, "event_id": self._next_event_id(session_id)}
+
+        if self.backplane is not None:
+            self.backplane.publish(session_id, event)
+
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            # No server loop (e.g. CLI runs): nobody can be connected
+            logger.debug(f"No server loop bound, not delivering event for session {session_id}")
+            return
+
+        if _running_loop() is loop:
+            self._deliver(session_id, event)
+        else:
+            loop.call_soon_threadsafe(self._deliver, session_id, event)
+
     async def send_observation(self, session_id: str, observation: dict):
         """
         Send an observation to all clients connected to a session.
-        Also saves the message to the database if tender_id is registered for this session.
+        Also queues the message for persistence if tender_id is registered for this session.
 
         Args:
             session_id: The session ID to send the observation to
             observation: The observation data to send (will be JSON serialized)
         """
-        # Send to websocket clients first
-        if session_id in self.active_connections:
-            # Create a copy of the set to avoid modification during iteration
-            connections = self.active_connections[session_id].copy()
-
-            # Send to all connected clients
-            disconnected = []
-            for connection in connections:
-                try:
-                    await connection.send_json(observation)
-                except Exception as e:
-                    import traceback
-                    logger.error(f"Error sending to client in session {session_id}: {e}")
-                    traceback.print_exc()
-                    disconnected.append(connection)
-
-            # Clean up disconnected clients
-            for connection in disconnected:
-                self.disconnect(connection, session_id)
+        self.publish(session_id, observation)
+
+    def deliver_remote(self, session_id: str, observation: dict):
+        """
+        Deliver an event published by another process (server loop only).
+
+        The event is buffered even without a client here, so a client that
+        reconnects to this process can still resume the session.
+        """
+        self._deliver(session_id, observation)
+
+    async def wait_for_events(self, session_id: str, last_event_id: Optional[int], timeout: float) -> List[dict]:
+        """
+        Long-poll: return the events after last_event_id, waiting up to timeout for new ones.
+
+        Args:
+            session_id: The session ID to read
+            last_event_id: Last event_id the client received (None for all buffered events)
+            timeout: Maximum seconds to wait when there are no new events
+
+        Returns:
+            Buffered events after last_event_id (empty on timeout)
+        """
+        stream = self._stream(session_id)
+        events = stream.since(last_event_id)
+        if not events and await stream.wait(timeout):
+            events = stream.since(last_event_id)
+        return events
+
+    def _next_event_id(self, session_id: str) -> int:
+        """Next event_id for a session (thread-safe, increasing across buffer evictions)"""
+        with self._streams_lock:
+            return self._stream_locked(session_id).next_event_id()
+
+    def _stream(self, session_id: str) -> SessionStream:
+        """Get or create a session's event buffer (thread-safe)"""
+        with self._streams_lock:
+            return self._stream_locked(session_id)
+
+    def _stream_locked(self, session_id: str) -> SessionStream:
+        """
+        Get or create a session's event buffer, evicting the least recently used ones.
+
+        Sessions with connected clients are never evicted, so their event_ids
+        keep increasing. Call with _streams_lock held.
+        """
+        stream = self.streams.get(session_id)
+        if stream is None:
+            stream = self.streams[session_id] = SessionStream()
+            if len(self.streams) > settings.websocket_buffered_sessions:
+                idle = [
+                    buffered for buffered in self.streams
+                    if buffered != session_id and buffered not in self.active_connections
+                ]
+                for buffered in idle[: len(self.streams) - settings.websocket_buffered_sessions]:
+                    del self.streams[buffered]
         else:
-            logger.warning(f"No active connections for session {session_id}")
+            self.streams.move_to_end(session_id)
+        return stream
+
+    def _deliver(self, session_id: str, observation: dict):
+        """Buffer an event and fan it out to the session's client channels (server loop only)"""
+        self._stream(session_id).append(observation)
 
-        # Save message to database if tender_id is registered for this session and not in replay mode
+        if session_id not in self.active_connections:
+            logger.debug(f"No active connections for session {session_id}, event buffered")
+            return
+
+        for connection in list(self.active_connections[session_id]):
+            channel = self.channels.get(connection)
+            if channel is not None:
+                channel.push(observation)
+
+    def _persist(self, session_id: str, observation: dict):
+        """Queue a message for the database if the session logs and is not a replay"""
         tender_id = self.session_to_tender_id.get(session_id)
         if tender_id and session_id not in self.replay_sessions:
             try:
-                save_websocket_message(tender_id, observation)
+                log_writer.enqueue(tender_id, observation)
             except Exception as e:
                 # Log but don't break the websocket flow
                 logger.error(f"Failed to save websocket message for session {session_id}: {e}", exc_info=True)
@@ -125,21 +433,21 @@ class ConnectionManager:
             logger.warning(f"No active connections for session {session_id}")
             return
 
-        connections = self.active_connections[session_id].copy()
+        for connection in list(self.active_connections[session_id]):
+            channel = self.channels.get(connection)
+            if channel is not None:
+                channel.push({"_text": message})
 
-        disconnected = []
-        for connection in connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                import traceback
-                logger.error(f"Error sending to client in session {session_id}: {e}")
-                traceback.print_exc()
-                disconnected.append(connection)
 
-        for connection in disconnected:
-            self.disconnect(connection, session_id)
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the event loop running in the current thread, if any"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
 
 
 # Global connection manager instance
 manager = ConnectionManager()
+if settings.websocket_backplane_enabled:
+    manager.attach_backplane(PostgresBackplane())
@@ -13,6 +13,8 @@ import os
 import glob
 import tempfile
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from contextvars import copy_context
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
@@ -37,9 +39,30 @@ from app.utils.build_ranking_input import (
     build_ranking_input,
     fetch_and_extract_documents,
 )
+from app.tools.read_supplier_attachments import (
+    read_buyer_attachments_table as _read_buyer_attachments_table,
+)
 from app.investigation_tasks import INVESTIGATION_TASKS, InvestigationTask
+from app.utils.task_feasibility import build_tender_facts, classify_tasks
 from app.schemas import TaskClassificationOutput, TaskInvestigationOutput
 from app.utils.websocket_manager import manager
+from app.utils.investigation_budget import (
+    InvestigationBudget,
+    CancellationToken,
+    InvestigationCancelledError,
+    register_budget,
+    unregister_budget,
+)
+from app.utils.evidence_store import EvidenceStore
+from app.utils.evidence_prefetch import EvidencePrefetcher
+from app.utils.model_routing import ModelRouter
+from app.utils.llm_cache import llm_cache_scope
+from app.utils.llm_pool import llm_pool_scope
+
+
+def _keep_latest(current: Any, update: Any) -> Any:
+    """Reducer for keys written by parallel nodes: keep the latest non-empty value"""
+    return update or current
 
 
 class WorkflowState(TypedDict):
@@ -52,6 +75,10 @@ class WorkflowState(TypedDict):
     # Fetched tender data
     tender_response: TenderResponse
     tender_documents: List[Dict[str, Any]]
+    attachments: Optional[List[Any]]  # Buyer attachments table (None if it could not be read)
+
+    # Buyer attachments downloaded and probed by the prefetch stage (row_id, name, type, pages...)
+    document_inventory: Annotated[List[Dict[str, Any]], _keep_latest]
 
     # Investigation tasks
     investigation_tasks: List[InvestigationTask]
@@ -59,6 +86,8 @@ class WorkflowState(TypedDict):
 
     # Processed input for ranking (tender context)
     input_data: RankingInput
+    # Tender context section of the task agents' system prompt (shared by all branches)
+    tender_prompt: str
 
     # Task investigation results (accumulated from parallel processing)
     task_investigation_results: Annotated[List[TaskInvestigationOutput], add]
@@ -67,10 +96,43 @@ class WorkflowState(TypedDict):
     tasks_by_id: List[TaskInvestigationOutput]
     workflow_summary: str
 
+    # Resource budget shared by all parallel task agents, and its final usage report
+    budget: InvestigationBudget
+    budget_usage: Dict[str, Any]
+
+    # Tool results shared by all parallel task agents (single-flight per tool and arguments)
+    evidence: EvidenceStore
+
     # Error tracking
     errors: Annotated[List[str], add]
 
 
+def serialize_task_result(task: TaskInvestigationOutput) -> Dict[str, Any]:
+    """
+    Serialize a task result for the WebSocket client.
+
+    Used both for the per-task "task_result" event and for the final "result" message.
+
+    Args:
+        task: Task investigation result
+
+    Returns:
+        JSON-serializable dict with the task status, summary and structured findings
+    """
+    return {
+        "task_id": task.task_id,
+        "task_code": task.task_code,
+        "task_name": task.task_name,
+        "validation_passed": task.validation_passed,
+        "findings_count": len(task.findings),
+        "findings": [finding.model_dump() for finding in task.findings],
+        "investigation_summary": task.investigation_summary,
+        "timed_out": task.timed_out,
+        "cancelled": task.cancelled,
+        "incomplete": task.incomplete,
+    }
+
+
 class FraudDetectionWorkflow:
     """
     LangGraph workflow that coordinates fraud detection through ranking and parallel investigation.
@@ -98,8 +160,8 @@ class FraudDetectionWorkflow:
 
     def __init__(
         self,
-        ranking_model: str = "google/gemini-2.5-flash-preview-09-2025:nitro",
-        detection_model: str = "google/gemini-2.5-flash-preview-09-2025:nitro",
+        ranking_model: str = None,
+        detection_model: str = None,
         temperature: float = 0,
         max_iterations: int = None,
         max_execution_time: int = None,
@@ -108,16 +170,24 @@ class FraudDetectionWorkflow:
         Initialize the workflow with agent configurations.
 
         Args:
-            ranking_model: Model for ranking agent
-            detection_model: Model for detection agents
+            ranking_model: Model for ranking agent (default: routed by ModelRouter)
+            detection_model: Model for detection and summary agents (default: routed by ModelRouter)
             temperature: Temperature for all agents
             max_iterations: Maximum tool calls per investigation (default from config)
             max_execution_time: Maximum execution time per investigation in seconds (default from config)
         """
+        # Explicit models pin their phases; the other phases are routed by tier
+        self.router = ModelRouter(
+            pinned={
+                "ranking": ranking_model,
+                "investigation": detection_model,
+                "summary": detection_model,
+            }
+        )
         self.ranking_agent = RankingAgent(
-            model_name=ranking_model, temperature=temperature
+            model_name=self.router.model_for(self.router.tier_for("ranking"), "ranking"),
+            temperature=temperature,
         )
-        self.detection_model = detection_model
         self.temperature = temperature
         self.max_iterations = max_iterations
         self.max_execution_time = max_execution_time
@@ -132,28 +202,65 @@ class FraudDetectionWorkflow:
         """
         Send a log message via WebSocket if session_id is provided.
 
-        This is a synchronous wrapper that handles async WebSocket communication internally.
+        Publishes to the connection manager's event bus, so it never blocks the node
+        on client delivery.
 
         Args:
             session_id: Optional session ID for WebSocket streaming
             message: Log message to send
             task_code: Optional task code (e.g., "H-01") to associate this log with a specific task
         """
+        observation = {
+            "type": "log",
+            "message": message,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if task_code:
+            observation["task_code"] = task_code
+
+        self._send_event(session_id, observation)
+
+    def _send_task_result(
+        self, session_id: Optional[str], task_result: TaskInvestigationOutput
+    ):
+        """
+        Push a finished task's result to the client as soon as its branch completes.
+
+        Sent as a "task_result" event so the frontend TaskCard can render the
+        findings without waiting for the summary and the final "result" message.
+
+        Args:
+            session_id: Optional session ID for WebSocket streaming
+            task_result: Result of the finished task investigation
+        """
+        self._send_event(
+            session_id,
+            {
+                "type": "task_result",
+                "message": f"{task_result.task_code} investigation complete",
+                "task_code": task_result.task_code,
+                "task_result": serialize_task_result(task_result),
+                "timestamp": datetime.now().isoformat(),
+            },
+        )
+
+    def _send_event(self, session_id: Optional[str], observation: Dict[str, Any]):
+        """
+        Send an event via WebSocket if session_id is provided.
+
+        This is a synchronous wrapper that handles async WebSocket communication internally.
+
+        Args:
+            session_id: Optional session ID for WebSocket streaming
+            observation: Event payload to send
+        """
         if session_id:
             try:
-                observation = {
-                    "type": "log",
-                    "message": message,
-                    "timestamp": datetime.now().isoformat(),
-                }
-                if task_code:
-                    observation["task_code"] = task_code
-
-                asyncio.run(manager.send_observation(session_id, observation))
+                manager.publish(session_id, observation)
             except Exception as e:
                 import traceback
 
-                print(f"Failed to send log to WebSocket: {e}")
+                print(f"Failed to send event to WebSocket: {e}")
                 traceback.print_exc()
 
     def _build_graph(self) -> StateGraph:
@@ -166,6 +273,7 @@ class FraudDetectionWorkflow:
         graph.add_node("fetch_tender_data", self._fetch_tender_data)
         graph.add_node("load_investigation_tasks", self._load_investigation_tasks)
         graph.add_node("ranking_node", self._ranking_node)
+        graph.add_node("prefetch_evidence", self._prefetch_evidence)
         graph.add_node("distribute_investigations", self._distribute_investigations)
         graph.add_node("investigate_task", self._investigate_task)
         graph.add_node("aggregate_results", self._aggregate_results)
@@ -174,7 +282,9 @@ class FraudDetectionWorkflow:
         graph.add_edge(START, "fetch_tender_data")
         graph.add_edge("fetch_tender_data", "load_investigation_tasks")
         graph.add_edge("load_investigation_tasks", "ranking_node")
-        graph.add_edge("ranking_node", "distribute_investigations")
+        # Prefetch runs in parallel with ranking; distribution waits for both
+        graph.add_edge("load_investigation_tasks", "prefetch_evidence")
+        graph.add_edge(["ranking_node", "prefetch_evidence"], "distribute_investigations")
         # Note: distribute_investigations uses Command/Send pattern, no direct edge needed
         # The investigate_task nodes will route to aggregate_results
         graph.add_edge("investigate_task", "aggregate_results")
@@ -208,8 +318,19 @@ class FraudDetectionWorkflow:
             # Fetch and extract documents (first 3 documents, first 5 pages each)
             self._send_log(session_id, "Fetching tender documents...")
             print("Fetching tender documents...")
+            # Read the attachments table once: documents are extracted from it
+            # and the ranking rules decide on its names and types
+            try:
+                # None (table not found) stays unknown: an empty list would mark document tasks infeasible
+                state["attachments"] = _read_buyer_attachments_table(tender_id)
+            except Exception as e:
+                print(f"Could not list attachments for {tender_id}: {e}")
+                state["attachments"] = None
             tender_documents = fetch_and_extract_documents(
-                tender_id, max_docs=3, session_id=session_id
+                tender_id,
+                max_docs=3,
+                session_id=session_id,
+                attachments=state["attachments"],
             )
             state["tender_documents"] = tender_documents
 
@@ -277,78 +398,54 @@ class FraudDetectionWorkflow:
 
     def _ranking_node(self, state: WorkflowState) -> WorkflowState:
         """
-        Ranking node that prioritizes investigation tasks.
+        Ranking node that selects the feasible investigation tasks.
 
-        Analyzes tender context and ranks investigation tasks by priority.
+        Clear-cut tasks are decided by the feasibility rules (attachments, award,
+        evaluation criteria and guarantees); only the ambiguous ones are sent to
+        the RankingAgent, and the LLM call is skipped when none are.
         """
         session_id = state.get("session_id")
+        tasks = state["investigation_tasks"]
 
         self._send_log(session_id, "Starting task ranking...")
         print("Starting task ranking...")
 
-        try:
-            # Prepare message for ranking agent
-            tender_context = f"""
-TENDER INFORMATION:
-- ID: {state["input_data"].tender_id}
-- Name: {state["input_data"].tender_name}
-- Date: {state["input_data"].tender_date}
-- Organization: {state["input_data"].additional_context.get("organization", "Unknown")}
-
-AVAILABLE DOCUMENTS ({len(state["tender_documents"])}):
-{chr(10).join(f"- {doc.get('name', 'Unknown')}" for doc in state["tender_documents"]) if state["tender_documents"] else "- No documents available"}
-
-TENDER CONTEXT:
-{state["input_data"].bases[:500]}...
-
-INVESTIGATION TASKS TO RANK ({len(state["investigation_tasks"])}):
-"""
-            # Add all tasks
-            for task in state["investigation_tasks"]:
-                tender_context += f"""
-{task.get("title", "Unknown")} - {task["code"]}: {task["name"]}
-- Description: {task["desc"]}
-- Where to look: {task["where_to_look"]}
-- Severity: {task["severity"]}
-- Subtasks: {len(task["subtasks"])}
-"""
-
-            tender_context += """
-
-Classify which tasks are FEASIBLE to validate given available data (5-11 tasks).
-Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
-"""
+        # Rule-based pre-ranking (needs the tender record; otherwise every task goes to the LLM)
+        rule_feasible = []
+        candidates = tasks
+        if settings.ranking_heuristics_enabled and state.get("tender_response") is not None:
+            facts = build_tender_facts(state["tender_response"], state.get("attachments"))
+            classification = classify_tasks(tasks, facts)
+            rule_feasible = classification.feasible
+            candidates = classification.ambiguous
 
-            # Run ranking agent
-            self._send_log(
-                session_id, "Classification agent filtering feasible tasks..."
-            )
             self._send_log(
                 session_id,
-                f"Assembling context: {len(state['investigation_tasks'])} tasks, {len(state['tender_documents'])} documents",
-            )
-            classification_result: TaskClassificationOutput = self.ranking_agent.run(
-                RankingInput(
-                    tender_id=state["input_data"].tender_id,
-                    tender_name=state["input_data"].tender_name,
-                    tender_date=state["input_data"].tender_date,
-                    bases=tender_context,
-                    bases_tecnicas="",
-                    additional_context={},
-                ),
-                session_id=session_id,
+                f"Feasibility rules: {len(classification.feasible)} feasible, "
+                f"{len(classification.infeasible)} not feasible, {len(classification.ambiguous)} need review",
             )
-            self._send_log(
-                session_id,
-                f"Classification agent completed. Selected {len(classification_result.feasible_task_ids)} feasible tasks",
+            print(
+                f"Feasibility rules: {len(classification.feasible)} feasible, "
+                f"{len(classification.infeasible)} infeasible, {len(classification.ambiguous)} ambiguous"
             )
+            for task in classification.infeasible:
+                self._send_log(
+                    session_id,
+                    f"Skipping {task['code']}: {classification.reasons[task['code']]}",
+                )
 
-            # Filter tasks from investigation_tasks using the feasible IDs
-            feasible_ids = classification_result.feasible_task_ids
+        try:
+            if candidates:
+                agent_ids = self._classify_with_agent(state, candidates, session_id)
+            else:
+                self._send_log(session_id, "All tasks decided by rules, skipping classification agent")
+                print("All tasks decided by rules, skipping classification agent")
+                agent_ids = []
+
+            # Keep the original task order
+            feasible_ids = {task["id"] for task in rule_feasible} | set(agent_ids)
             state["ranked_tasks"] = [
-                task
-                for task in state["investigation_tasks"]
-                if task["id"] in feasible_ids
+                task for task in tasks if task["id"] in feasible_ids
             ]
 
             self._send_log(
@@ -371,22 +468,155 @@ Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
             import traceback
 
             self._send_log(session_id, f"ERROR: Task classification failed - {str(e)}")
-            self._send_log(
-                session_id, "Using fallback strategy: selecting first 5 tasks by ID"
-            )
-            self._send_log(
-                session_id,
-                "Warning: Results may be less accurate due to ranking failure",
-            )
             print(f"Task ranking failed: {e}")
             traceback.print_exc()
             state["errors"].append(f"Task ranking error: {str(e)}")
-            # Fallback: use first 5 tasks
-            state["ranked_tasks"] = state["investigation_tasks"][:5]
-            print(f"Using fallback: first 5 tasks")
+
+            if candidates is not tasks:
+                # Rules ran: keep their feasible tasks and give the ambiguous ones the benefit of the doubt
+                self._send_log(
+                    session_id,
+                    "Using fallback strategy: rule-based feasible tasks plus tasks needing review",
+                )
+                fallback_ids = {task["id"] for task in rule_feasible + candidates}
+                state["ranked_tasks"] = [task for task in tasks if task["id"] in fallback_ids]
+                print(f"Using fallback: {len(state['ranked_tasks'])} rule-based tasks")
+            else:
+                self._send_log(
+                    session_id, "Using fallback strategy: selecting first 5 tasks by ID"
+                )
+                self._send_log(
+                    session_id,
+                    "Warning: Results may be less accurate due to ranking failure",
+                )
+                # Fallback: use first 5 tasks
+                state["ranked_tasks"] = tasks[:5]
+                print(f"Using fallback: first 5 tasks")
 
         return state
 
+    def _classify_with_agent(
+        self,
+        state: WorkflowState,
+        tasks: List[InvestigationTask],
+        session_id: Optional[str],
+    ) -> List[int]:
+        """
+        Ask the RankingAgent which of the given tasks are feasible.
+
+        Args:
+            state: Workflow state with the tender context
+            tasks: Tasks the feasibility rules could not decide (or all tasks)
+            session_id: Optional session ID for WebSocket streaming
+
+        Returns:
+            IDs of the tasks the agent classified as feasible
+        """
+        # Prepare message for ranking agent
+        tender_context = f"""
+TENDER INFORMATION:
+- ID: {state["input_data"].tender_id}
+- Name: {state["input_data"].tender_name}
+- Date: {state["input_data"].tender_date}
+- Organization: {state["input_data"].additional_context.get("organization", "Unknown")}
+
+AVAILABLE DOCUMENTS ({len(state["tender_documents"])}):
+{chr(10).join(f"- {doc.get('name', 'Unknown')}" for doc in state["tender_documents"]) if state["tender_documents"] else "- No documents available"}
+
+TENDER CONTEXT:
+{state["input_data"].bases[:500]}...
+
+INVESTIGATION TASKS TO RANK ({len(tasks)}):
+"""
+        # Add the tasks to classify
+        for task in tasks:
+            tender_context += f"""
+{task.get("title", "Unknown")} - {task["code"]}: {task["name"]}
+- Description: {task["desc"]}
+- Where to look: {task["where_to_look"]}
+- Severity: {task["severity"]}
+- Subtasks: {len(task["subtasks"])}
+"""
+
+        if len(tasks) == len(state["investigation_tasks"]):
+            tender_context += """
+
+Classify which tasks are FEASIBLE to validate given available data (5-11 tasks).
+Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
+"""
+        else:
+            tender_context += """
+
+The other tasks were already classified from the tender metadata. These could not be decided
+from document names alone: check the attachments and award if needed.
+Return ONLY the IDs of the feasible tasks among these. Focus on filtering OUT impossible tasks.
+"""
+
+        # Run ranking agent
+        self._send_log(
+            session_id, "Classification agent filtering feasible tasks..."
+        )
+        self._send_log(
+            session_id,
+            f"Assembling context: {len(tasks)} tasks, {len(state['tender_documents'])} documents",
+        )
+        classification_result: TaskClassificationOutput = self.ranking_agent.run(
+            RankingInput(
+                tender_id=state["input_data"].tender_id,
+                tender_name=state["input_data"].tender_name,
+                tender_date=state["input_data"].tender_date,
+                bases=tender_context,
+                bases_tecnicas="",
+                additional_context={},
+            ),
+            session_id=session_id,
+        )
+        self._send_log(
+            session_id,
+            f"Classification agent completed. Selected {len(classification_result.feasible_task_ids)} feasible tasks",
+        )
+
+        # Only accept IDs of the tasks the agent was asked about
+        candidate_ids = {task["id"] for task in tasks}
+        return [
+            task_id
+            for task_id in classification_result.feasible_task_ids
+            if task_id in candidate_ids
+        ]
+
+    def _prefetch_evidence(self, state: WorkflowState) -> Dict[str, Any]:
+        """
+        Prefetch node that warms documents and award data, in parallel with ranking.
+
+        Downloads the buyer attachments into the file cache, probes their type and
+        page count, and fetches the award result, seeding the shared evidence store.
+        Returns only its own key, since it runs in the same step as ranking_node.
+        """
+        session_id = state.get("session_id")
+        if not settings.prefetch_enabled or state.get("attachments") is None:
+            return {}
+
+        self._send_log(session_id, "Prefetching tender documents and award data...")
+        print("Prefetching tender documents and award data...")
+
+        try:
+            prefetcher = EvidencePrefetcher(
+                state["tender_id"],
+                store=state.get("evidence"),
+                budget=state.get("budget"),
+            )
+            inventory = prefetcher.run(state["attachments"])
+        except Exception as e:
+            # Agents fetch on demand if the prefetch fails
+            print(f"Prefetch failed: {e}")
+            traceback.print_exc()
+            return {}
+
+        ready = sum(1 for entry in inventory if "mime_type" in entry)
+        self._send_log(session_id, f"Prefetch complete: {ready}/{len(inventory)} documents ready")
+        print(f"Prefetch complete: {ready}/{len(inventory)} documents ready")
+        return {"document_inventory": inventory}
+
     def _distribute_investigations(self, state: WorkflowState) -> Command:
         """
         Distribution node using Command and Send pattern.
@@ -395,12 +625,27 @@ Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
         """
         session_id = state.get("session_id")
 
+        # Skip the fan-out entirely if the investigation was cancelled meanwhile
+        budget = state.get("budget")
+        cancelled_reason = budget.cancelled_reason() if budget is not None else None
+        if cancelled_reason:
+            self._send_log(
+                session_id, f"Investigation cancelled ({cancelled_reason}). Skipping task investigations."
+            )
+            return Command(goto="aggregate_results", update=state)
+
         self._send_log(
             session_id,
             f"Launching {len(state['ranked_tasks'])} parallel task investigations...",
         )
         print(f"Launching {len(state['ranked_tasks'])} parallel task investigations...")
 
+        # Tender context shared by every branch's system prompt, assembled once
+        # so the prefix is identical and cacheable across the parallel agents
+        state["tender_prompt"] = FraudDetectionAgent.build_tender_prompt(
+            state["input_data"], state["tender_documents"], state.get("document_inventory")
+        )
+
         # Create Send commands for each ranked task
         send_commands = []
 
@@ -418,8 +663,11 @@ Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
                 "task": task,
                 "tender_context": state["input_data"],
                 "tender_documents": state["tender_documents"],
+                "tender_prompt": state["tender_prompt"],
                 "investigation_id": f"task_{task['id']}_{uuid.uuid4().hex[:8]}",
                 "session_id": session_id,  # Pass session_id to child nodes
+                "budget": state.get("budget"),  # Shared across all parallel branches
+                "evidence": state.get("evidence"),  # Shared across all parallel branches
             }
 
             # Create Send command to investigate_task node
@@ -451,23 +699,29 @@ Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
             f"Investigation {investigation_id} starting for {task.get('title', 'Unknown')} ({task_code})..."
         )
 
-        try:
-            # Create fraud detection agent
-            agent = FraudDetectionAgent(
-                model_name=self.detection_model,
-                temperature=self.temperature,
-                max_iterations=self.max_iterations,
-                max_execution_time=self.max_execution_time,
+        # Per-branch deadline, capped by what is left of the investigation wall-time budget
+        budget = inputs.get("budget")
+        branch_timeout = self.max_execution_time or settings.fraud_detection_max_execution_time
+        if budget is not None:
+            branch_timeout = min(
+                branch_timeout,
+                budget.remaining_time() + settings.investigation_timeout_grace,
             )
+        branch_token = CancellationToken(
+            parent=budget.cancellation if budget is not None else None,
+            timeout=branch_timeout,
+        )
+
+        try:
+            # Create fraud detection agent on the tier for the task severity
+            tier = self.router.tier_for("investigation", severity=task.get("severity"))
+            agent = self._create_detection_agent(inputs, tier, budget, branch_token)
 
-            # Prepare message for investigation
+            # Per-task message; the tender context is in the shared system prompt
             tender_context = inputs.get("tender_context")
             task_id = task.get("id", 0)
             task_title = task.get("title", "Unknown title")
             task_name = task.get("name", "Unknown task")
-            task_desc = task.get("desc", "No description")
-            task_where = task.get("where_to_look", "Not specified")
-            task_severity = task.get("severity", "Unknown")
             task_subtasks = task.get("subtasks", [])
 
             # Log subtask information
@@ -477,37 +731,7 @@ Return ONLY the IDs of feasible tasks. Focus on filtering OUT impossible tasks.
                 task_code=task_code,
             )
 
-            message = f"""
-INVESTIGATION TASK:
-
-Task ID: {task_id}
-Task Code: {task_code}
-Task Name: {task_name}
-
-WHAT TO VALIDATE:
-{task_desc}
-
-WHERE TO LOOK:
-{task_where}
-
-SEVERITY: {task_severity}
-
-SUBTASKS:
-{chr(10).join(f"{i + 1}. {subtask}" for i, subtask in enumerate(task_subtasks))}
-
-TENDER CONTEXT:
-- Tender ID: {tender_context.tender_id}
-- Tender Name: {tender_context.tender_name}
-- Organization: {tender_context.additional_context.get("organization", "Unknown")}
-
-AVAILABLE DOCUMENTS:
-{chr(10).join(f"- {doc.get('name', 'Unknown')}" for doc in inputs.get("tender_documents", []))}
-
-TENDER INFORMATION:
-{tender_context.bases[:1000]}...
-
-Please investigate this task systematically and report your findings.
-"""
+            message = FraudDetectionAgent.build_task_prompt(task)
 
             # Run investigation (reusing FraudDetectionAgent but with task-based input)
             self._send_log(
@@ -518,15 +742,49 @@ Please investigate this task systematically and report your findings.
             detection_input = FraudDetectionInput(
                 tender_id=tender_context.tender_id,
                 risk_indicators=[task_name],
-                full_context={"task": task, "message": message},
+                full_context={"task": task},
+                task_prompt=message,
             )
 
-            result = agent.run(
+            result = self._run_agent_with_deadline(
+                agent,
                 detection_input,
+                branch_token,
                 session_id=session_id,
                 task_info={"id": task_id, "code": task_code, "name": task_name},
             )
 
+            # Re-run once on a stronger model when the findings are uncertain
+            stronger = self.router.escalate(tier)
+            if (
+                stronger
+                and self.router.should_escalate(result)
+                and not (budget is not None and budget.exhausted_reason())
+                and not branch_token.cancelled_reason()
+            ):
+                self._send_log(
+                    session_id,
+                    f"{task_title}: Low-confidence findings on the {tier} model, escalating to the {stronger} model...",
+                    task_code=task_code,
+                )
+                try:
+                    result = self._run_agent_with_deadline(
+                        self._create_detection_agent(inputs, stronger, budget, branch_token),
+                        detection_input,
+                        branch_token,
+                        session_id=session_id,
+                        task_info={"id": task_id, "code": task_code, "name": task_name},
+                    )
+                except Exception as e:
+                    # The first run is complete: keep it rather than failing the branch
+                    self._send_log(
+                        session_id,
+                        f"{task_title}: Escalated run on the {stronger} model did not finish ({e}), "
+                        f"keeping the {tier} model result",
+                        task_code=task_code,
+                    )
+                    print(f"{task_title} ({task_code}): escalated run failed, keeping first result: {e}")
+
             # Log agent completion
             self._send_log(
                 session_id,
@@ -542,6 +800,7 @@ Please investigate this task systematically and report your findings.
                 validation_passed=not result.is_fraudulent,  # Inverse: fraud detected = validation failed
                 findings=result.anomalies,
                 investigation_summary=result.investigation_summary,
+                incomplete=result.iteration_limit_reached,
             )
 
             self._send_log(
@@ -552,10 +811,38 @@ Please investigate this task systematically and report your findings.
             print(
                 f"{task_title} investigation complete. Validation passed: {task_result.validation_passed}"
             )
+            self._send_task_result(session_id, task_result)
 
             # Return state update - this will be accumulated via the 'add' reducer
             return {"task_investigation_results": [task_result]}
 
+        except InvestigationCancelledError as e:
+            # Deadline or user cancellation - return a partial result so the fan-in can proceed
+            reason = str(e)
+            timed_out = reason == "deadline exceeded"
+            if timed_out:
+                status_msg = f"Investigation timed out after {branch_timeout:.0f}s. Results are incomplete."
+            else:
+                status_msg = f"Investigation cancelled ({reason}). Results are incomplete."
+            self._send_log(
+                session_id,
+                f"{task.get('title', 'Unknown')}: {status_msg}",
+                task_code=task_code,
+            )
+            print(f"{task.get('title', 'Unknown')} ({task_code}): {status_msg}")
+            partial_result = TaskInvestigationOutput(
+                task_id=task.get("id", 0),
+                task_code=task_code,
+                task_name=task.get("name", "Unknown task"),
+                validation_passed=False,
+                findings=[],
+                investigation_summary=status_msg,
+                timed_out=timed_out,
+                cancelled=not timed_out,
+            )
+            self._send_task_result(session_id, partial_result)
+            return {"task_investigation_results": [partial_result]}
+
         except Exception as e:
             import traceback
 
@@ -581,8 +868,60 @@ Please investigate this task systematically and report your findings.
                 findings=[],
                 investigation_summary=f"Investigation failed: {error_msg}",
             )
+            self._send_task_result(session_id, error_result)
             return {"task_investigation_results": [error_result]}
 
+    def _create_detection_agent(
+        self,
+        inputs: Dict[str, Any],
+        tier: str,
+        budget: Optional[InvestigationBudget],
+        token: CancellationToken,
+    ) -> FraudDetectionAgent:
+        """Create the fraud detection agent for one task branch on the given model tier"""
+        return FraudDetectionAgent(
+            model_name=self.router.model_for(tier, "investigation"),
+            temperature=self.temperature,
+            max_iterations=self.max_iterations,
+            max_execution_time=self.max_execution_time,
+            budget=budget,
+            cancellation=token,
+            tender_prompt=inputs.get("tender_prompt"),
+            evidence=inputs.get("evidence"),
+            subtasks=inputs["task"].get("subtasks", []),
+        )
+
+    def _run_agent_with_deadline(
+        self,
+        agent: FraudDetectionAgent,
+        detection_input: FraudDetectionInput,
+        token: CancellationToken,
+        **run_kwargs,
+    ) -> FraudDetectionOutput:
+        """
+        Run an agent in a worker thread, waiting only until its token is cancelled.
+
+        The branch returns as soon as the deadline passes or the investigation is
+        cancelled, even if the agent is blocked inside a slow tool or LLM call. The
+        agent thread itself stops cooperatively at its next step (CancellationMiddleware).
+
+        Raises:
+            InvestigationCancelledError: If the token was cancelled before the agent finished
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="investigate_task")
+        # Copy the context so the agent thread keeps the investigation's LLM cache scope
+        future = executor.submit(copy_context().run, agent.run, detection_input, **run_kwargs)
+        executor.shutdown(wait=False)
+
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except FuturesTimeoutError:
+                reason = token.cancelled_reason()
+                if reason:
+                    token.cancel(reason)
+                    raise InvestigationCancelledError(reason)
+
     def _cleanup_temp_files(self, tender_id: str, session_id: Optional[str] = None):
         """
         Clean up old cache files (age-based cleanup).
@@ -684,6 +1023,32 @@ Please investigate this task systematically and report your findings.
             f"Summary: {failed_validations} failed, {total_investigated - failed_validations} passed, {total_findings} total findings",
         )
 
+        # Report resource usage of the investigation budget
+        budget = state.get("budget")
+        if budget is not None:
+            state["budget_usage"] = budget.report()
+            usage = state["budget_usage"]
+            budget_msg = (
+                f"Budget usage: {usage['tokens']['used']}/{usage['tokens']['limit']} tokens, "
+                f"{usage['ocr_pages']['used']}/{usage['ocr_pages']['limit']} OCR pages, "
+                f"{usage['requests']['used']}/{usage['requests']['limit']} requests, "
+                f"{usage['wall_time_seconds']['used']:.0f}s/{usage['wall_time_seconds']['limit']}s"
+            )
+            if usage["forced_finishes"]:
+                budget_msg += f" ({usage['forced_finishes']} agent steps forced to finish early)"
+            self._send_log(session_id, budget_msg)
+            print(budget_msg)
+
+        evidence = state.get("evidence")
+        if evidence is not None:
+            evidence_usage = evidence.report()
+            evidence_msg = (
+                f"Shared evidence: {evidence_usage['misses']} tool calls executed, "
+                f"{evidence_usage['hits'] + evidence_usage['waits']} reused across tasks"
+            )
+            self._send_log(session_id, evidence_msg)
+            print(evidence_msg)
+
         # Generate agentic summary using SummaryAgent
         self._send_log(
             session_id,
@@ -692,8 +1057,12 @@ Please investigate this task systematically and report your findings.
         print("\nGenerating agentic summary with correlation analysis...")
 
         try:
+            # Don't spend another LLM call on a cancelled investigation
+            if budget is not None and budget.cancelled_reason():
+                raise InvestigationCancelledError(budget.cancelled_reason())
+
             summary_agent = SummaryAgent(
-                model_name=self.detection_model,
+                model_name=self.router.model_for(self.router.tier_for("summary"), "summary"),
                 temperature=0.3,  # Lower temperature for more focused analysis
             )
             summary_output: SummaryOutput = summary_agent.run(
@@ -789,6 +1158,7 @@ Please investigate this task systematically and report your findings.
             - task_investigation_results: Results from parallel task investigations
             - tasks_by_id: Task results ordered by task ID
             - workflow_summary: Summary of the investigation
+            - budget_usage: Resource usage report of the investigation budget
             - errors: List of errors encountered
         """
         # Log workflow initialization
@@ -797,18 +1167,29 @@ Please investigate this task systematically and report your findings.
         )
         self._send_log(session_id, "Initializing workflow state...")
 
+        # Budget shared by all task agents; registered so the run can be cancelled via the API
+        budget = InvestigationBudget()
+        if session_id:
+            register_budget(session_id, budget)
+
         # Initialize state with tender_id and session_id
         initial_state: WorkflowState = {
             "tender_id": tender_id,
             "session_id": session_id,
             "tender_response": None,
             "tender_documents": [],
+            "attachments": None,
+            "document_inventory": [],
             "investigation_tasks": [],
             "ranked_tasks": [],
             "input_data": None,
+            "tender_prompt": "",
             "task_investigation_results": [],
             "tasks_by_id": [],
             "workflow_summary": "",
+            "budget": budget,
+            "budget_usage": {},
+            "evidence": EvidenceStore(),
             "errors": [],
         }
 
@@ -816,7 +1197,12 @@ Please investigate this task systematically and report your findings.
         config = {
             "recursion_limit": settings.workflow_recursion_limit,
         }
-        result = self.app.invoke(initial_state, config=config)
+        try:
+            with llm_cache_scope(tender_id), llm_pool_scope(session_id or tender_id):
+                result = self.app.invoke(initial_state, config=config)
+        finally:
+            if session_id:
+                unregister_budget(session_id)
 
         self._send_log(session_id, "Workflow execution complete. Returning results...")
         return result
@@ -832,24 +1218,40 @@ Please investigate this task systematically and report your findings.
         Yields:
             State updates as the workflow progresses
         """
+        # Budget shared by all task agents; registered so the run can be cancelled via the API
+        budget = InvestigationBudget()
+        if session_id:
+            register_budget(session_id, budget)
+
         # Initialize state with tender_id and session_id
         initial_state: WorkflowState = {
             "tender_id": tender_id,
             "session_id": session_id,
             "tender_response": None,
             "tender_documents": [],
+            "attachments": None,
+            "document_inventory": [],
             "investigation_tasks": [],
             "ranked_tasks": [],
             "input_data": None,
+            "tender_prompt": "",
             "task_investigation_results": [],
             "tasks_by_id": [],
             "workflow_summary": "",
+            "budget": budget,
+            "budget_usage": {},
+            "evidence": EvidenceStore(),
             "errors": [],
         }
 
         # Stream the workflow execution
-        for state in self.app.stream(initial_state):
-            yield state
+        try:
+            with llm_cache_scope(tender_id), llm_pool_scope(session_id or tender_id):
+                for state in self.app.stream(initial_state):
+                    yield state
+        finally:
+            if session_id:
+                unregister_budget(session_id)
 
 
 # Convenience function for quick execution
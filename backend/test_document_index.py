@@ -0,0 +1,88 @@
+"""
+Test script for the tender document index and the search_tender_documents tool
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import json
+import uuid
+
+from app.tools.search_tender_documents import search_tender_documents
+from app.utils.cache_manager import get_cache_manager
+from app.utils.document_index import DocumentIndex, chunk_page, get_document_index, tokenize
+
+
+def test_tokenize_normalizes_spanish_terms():
+    """Accents, case, stopwords and simple plurals do not affect matching."""
+    assert tokenize("Garantías de Fiel Cumplimiento") == tokenize("garantia fiel cumplimiento")
+    assert "de" not in tokenize("plazo de entrega")
+
+    print("✓ Tokenizer test passed!")
+
+
+def test_chunk_page_overlaps_windows():
+    """Long pages are split into overlapping windows that cover every word."""
+    words = [f"w{i}" for i in range(25)]
+    chunks = chunk_page(" ".join(words), chunk_words=10, overlap_words=2)
+
+    assert chunks[0].split() == words[:10]
+    assert chunks[1].split()[0] == "w8"
+    assert chunks[-1].split()[-1] == "w24"
+    assert chunk_page("", 10, 2) == []
+
+    print("✓ Chunking test passed!")
+
+
+def test_search_ranks_relevant_page_first():
+    """The page that discusses the queried clause is returned with its anchor."""
+    index = DocumentIndex("1234-56-LR22", chunk_words=50, overlap_words=10)
+    index.add_page(0, 1, "Bases administrativas. Objeto de la licitación: adquisición de equipos.")
+    index.add_page(0, 7, "Garantía de fiel cumplimiento del contrato: 5% del monto total, vigencia 90 días.")
+    index.add_page(1, 2, "Especificaciones técnicas de los equipos y plazo de entrega de 30 días.")
+    index.build()
+
+    hits = index.search("garantias fiel cumplimiento", k=2)
+    assert (hits[0]["row_id"], hits[0]["page"]) == (0, 7)
+    assert hits[0]["score"] > 0
+    assert index.search("zzzz", k=3) == []
+
+    print("✓ Search ranking test passed!")
+
+
+def test_search_tool_indexes_cached_pages():
+    """The tool searches cached OCR pages and picks up pages extracted later."""
+    tender_id = f"TEST-{uuid.uuid4().hex[:8]}"
+    cache = get_cache_manager()
+    cache.set_ocr_result(tender_id, 0, 1, "Criterios de evaluación: precio 60%, plazo de entrega 40%.")
+    try:
+        message = search_tender_documents.invoke({
+            "type": "tool_call",
+            "name": "search_tender_documents",
+            "args": {"tender_id": tender_id, "query": "garantía"},
+            "id": "call_1",
+        })
+        result = json.loads(message.content)
+        assert result["results"] == [] and result["indexed_pages"] == 1
+
+        cache.set_ocr_result(tender_id, 2, 4, "Se exige garantía de seriedad de la oferta por $500.000.")
+        result = search_tender_documents.invoke(
+            {"tender_id": tender_id, "query": "garantía seriedad", "k": 3}
+        )
+        assert result["indexed_pages"] == 2 and result["indexed_documents"] == [0, 2]
+        assert (result["results"][0]["row_id"], result["results"][0]["page"]) == (2, 4)
+        assert "garantía de seriedad" in result["results"][0]["snippet"]
+        assert get_document_index(tender_id) is get_document_index(tender_id)
+    finally:
+        for cache_file in cache.ocr_dir.glob(f"{tender_id}_*"):
+            cache_file.unlink()
+
+    print("✓ Search tool test passed!")
+
+
+if __name__ == "__main__":
+    test_tokenize_normalizes_spanish_terms()
+    test_chunk_page_overlaps_windows()
+    test_search_ranks_relevant_page_first()
+    test_search_tool_indexes_cached_pages()
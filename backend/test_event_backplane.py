@@ -0,0 +1,118 @@
+"""
+Test script for PostgresBackplane - chunked LISTEN/NOTIFY payloads across processes
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import asyncio
+import importlib
+import sys
+
+from app.services.session_control_service import apply_control
+from app.utils import event_backplane
+from app.utils.event_backplane import PostgresBackplane
+from app.utils.investigation_budget import InvestigationBudget, register_budget, unregister_budget
+
+
+class LoopbackBackplane(PostgresBackplane):
+    """Backplane whose notifications reach its peer workers on the event loop instead of Postgres"""
+
+    def __init__(self):
+        super().__init__()
+        self.peers = []
+
+    def _enqueue(self, payloads, session_id):
+        loop = asyncio.get_running_loop()
+        for peer in self.peers:
+            for payload in payloads:
+                loop.call_soon(peer.receive, payload)
+
+
+def test_round_trip_between_processes():
+    """Events published by one process are reassembled and delivered by another."""
+    publisher = PostgresBackplane(max_chunk_size=50)
+    listener = PostgresBackplane(max_chunk_size=50)
+    received = []
+    listener._on_event = lambda session_id, event: received.append((session_id, event))
+
+    event = {"type": "result", "message": "Investigación completada " * 10, "status": "completed"}
+    payloads = publisher.encode("session-test", event)
+    assert len(payloads) > 1
+    assert all(len(payload.encode("utf-8")) < 8000 for payload in payloads)
+
+    for payload in payloads:
+        listener.receive(payload)
+
+    assert received == [("session-test", event)]
+    assert listener._pending == {}
+
+    print("✓ Backplane round trip test passed!")
+
+
+def test_ignores_own_notifications():
+    """A process does not deliver its own events twice."""
+    backplane = PostgresBackplane()
+    received = []
+    backplane._on_event = lambda session_id, event: received.append(event)
+
+    for payload in backplane.encode("session-test", {"type": "log", "message": "hola"}):
+        backplane.receive(payload)
+
+    assert received == []
+
+    print("✓ Own notifications test passed!")
+
+
+def test_import_does_not_need_listener_driver():
+    """The module loads without asyncpg; only the listener needs it."""
+    driver = sys.modules.get("asyncpg")
+    sys.modules["asyncpg"] = None  # Makes "import asyncpg" raise ImportError
+    try:
+        importlib.reload(event_backplane)
+    finally:
+        if driver is None:
+            del sys.modules["asyncpg"]
+        else:
+            sys.modules["asyncpg"] = driver
+        importlib.reload(event_backplane)
+
+    print("✓ Lazy driver import test passed!")
+
+
+def test_control_commands_reach_the_worker_holding_the_session():
+    """A cancel sent to one worker is applied and acknowledged by the worker running the investigation."""
+    budget = InvestigationBudget()
+    applied = []
+
+    def worker_b_control(session_id, command):
+        applied.append(command)
+        return apply_control(session_id, command)
+
+    async def scenario():
+        worker_a, worker_b = LoopbackBackplane(), LoopbackBackplane()
+        worker_a.peers, worker_b.peers = [worker_b], [worker_a]
+        worker_a._on_control = lambda session_id, command: False
+        worker_b._on_control = worker_b_control
+
+        register_budget("session-b", budget)
+        cancelled = await worker_a.request("session-b", {"action": "cancel"}, timeout=1.0)
+        unregister_budget("session-b")
+        missing = await worker_a.request("session-b", {"action": "cancel"}, timeout=0.1)
+        return cancelled, missing
+
+    cancelled, missing = asyncio.run(scenario())
+
+    assert cancelled and budget.cancelled_reason() == "cancelled by user"
+    assert not missing
+    assert applied == [{"action": "cancel"}, {"action": "cancel"}]
+
+    print("✓ Cross-worker control test passed!")
+
+
+if __name__ == "__main__":
+    test_round_trip_between_processes()
+    test_ignores_own_notifications()
+    test_import_does_not_need_listener_driver()
+    test_control_commands_reach_the_worker_holding_the_session()
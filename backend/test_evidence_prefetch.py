@@ -0,0 +1,89 @@
+"""
+Test script for the evidence prefetch stage - documents and award data warmed ahead of the agents
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import json
+
+from app.utils.evidence_prefetch import EvidencePrefetcher, format_document_inventory
+from app.utils.evidence_store import EvidenceStore, evidence_key
+from app.utils.investigation_budget import InvestigationBudget
+
+ATTACHMENTS_TABLE = [
+    ["id", "file_name", "type", "description", "file_size", "uploaded_at"],
+    [0, "Bases Administrativas.pdf", "Anexo", "Bases", "1 Mb", "01-01-2024"],
+    [1, "Anexo Técnico.pdf", "Anexo", "Especificaciones", "2 Mb", "01-01-2024"],
+    [2, "Formulario.docx", "Anexo", "Formulario", "1 Kb", "01-01-2024"],
+]
+
+
+class RecordingPrefetcher(EvidencePrefetcher):
+    """Prefetcher that serves fake files instead of downloading them"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loaded = []
+
+    def load_document(self, row_id):
+        self.loaded.append(row_id)
+        if row_id == 1:
+            raise RuntimeError("download failed")
+        return b"%PDF-1.4 << /Type /Pages /Kids [3 0 R] /Count 12 >>", "application/pdf", False
+
+    def prefetch_award(self):
+        pass
+
+
+def test_prefetch_builds_inventory():
+    """Documents are probed, failures recorded and the rest left for the agents."""
+    budget = InvestigationBudget(max_requests=100)
+    prefetcher = RecordingPrefetcher("1234-56-LR22", budget=budget, max_documents=2, max_workers=2)
+    inventory = prefetcher.run(ATTACHMENTS_TABLE)
+
+    assert sorted(prefetcher.loaded) == [0, 1]
+    assert [entry["row_id"] for entry in inventory] == [0, 1, 2]
+    assert inventory[0]["pages"] == 12 and inventory[0]["mime_type"] == "application/pdf"
+    assert inventory[1]["error"] == "download failed"
+    assert "mime_type" not in inventory[2]
+    assert budget.report()["requests"]["used"] == 1
+
+    text = format_document_inventory(inventory)
+    assert "- row_id 0: Bases Administrativas.pdf (Anexo, PDF, 12 pages)" in text
+    assert "- row_id 2: Formulario.docx (Anexo)" in text
+
+    print("✓ Prefetch inventory test passed!")
+
+
+def test_prefetch_seeds_attachments_table():
+    """The attachments table is answered from the store without scraping again."""
+    store = EvidenceStore()
+    RecordingPrefetcher("1234-56-LR22", store=store).run(ATTACHMENTS_TABLE)
+
+    key = evidence_key("read_buyer_attachments_table", {"tender_id": "1234-56-LR22"})
+    assert key in store
+    message = store.get_or_compute(key, lambda: None)
+    assert json.loads(message.content)[2][1] == "Anexo Técnico.pdf"
+
+    print("✓ Attachments table seeding test passed!")
+
+
+def test_prefetch_stops_when_cancelled():
+    """A cancelled investigation downloads nothing."""
+    budget = InvestigationBudget()
+    budget.cancellation.cancel("user cancelled")
+    prefetcher = RecordingPrefetcher("1234-56-LR22", budget=budget)
+    inventory = prefetcher.run(ATTACHMENTS_TABLE)
+
+    assert prefetcher.loaded == []
+    assert all("error" in entry for entry in inventory)
+
+    print("✓ Cancelled prefetch test passed!")
+
+
+if __name__ == "__main__":
+    test_prefetch_builds_inventory()
+    test_prefetch_seeds_attachments_table()
+    test_prefetch_stops_when_cancelled()
@@ -0,0 +1,111 @@
+"""
+Test script for the per-investigation evidence store - single-flight tool results
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import threading
+import time
+
+from langchain.messages import ToolMessage
+
+from app.middleware import EvidenceStoreMiddleware
+from app.utils.evidence_store import EvidenceStore, evidence_key
+
+
+class FakeToolCallRequest:
+    """Minimal ToolCallRequest stand-in with just the tool call"""
+
+    def __init__(self, name, args, call_id):
+        self.tool_call = {"name": name, "args": args, "id": call_id}
+
+
+def test_concurrent_calls_run_once():
+    """Concurrent callers of the same key share one computation."""
+    store = EvidenceStore()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "pages 1-5"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(store.get_or_compute(("ocr", "1"), compute)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["pages 1-5"] * 5
+    assert store.get_or_compute(("ocr", "1"), compute) == "pages 1-5"
+    report = store.report()
+    assert report["misses"] == 1 and report["waits"] + report["hits"] == 5
+
+    print("✓ Single-flight test passed!")
+
+
+def test_failures_are_not_kept():
+    """Exceptions and non-storable results are retried by later callers."""
+    store = EvidenceStore()
+
+    def fail():
+        raise RuntimeError("download failed")
+
+    try:
+        store.get_or_compute(("doc", "1"), fail)
+        assert False, "expected the error to propagate"
+    except RuntimeError:
+        pass
+    assert store.get_or_compute(("doc", "1"), lambda: "ok") == "ok"
+
+    assert store.get_or_compute(("doc", "2"), lambda: {"success": False}, storable=lambda r: r["success"]) == {"success": False}
+    assert ("doc", "2") not in store
+    assert store.get_or_compute(("doc", "2"), lambda: {"success": True}) == {"success": True}
+
+    print("✓ Failure handling test passed!")
+
+
+def test_argument_order_does_not_matter():
+    """Keys are canonical regardless of argument order."""
+    assert evidence_key("read_buyer_attachment_doc", {"row_id": 1, "tender_id": "x"}) == \
+        evidence_key("read_buyer_attachment_doc", {"tender_id": "x", "row_id": 1})
+
+    print("✓ Canonical key test passed!")
+
+
+def test_middleware_reuses_result_for_other_agents():
+    """A second agent's call is answered from the store with its own tool call id."""
+    middleware = EvidenceStoreMiddleware(EvidenceStore())
+    executed = []
+
+    def handler(request):
+        executed.append(request.tool_call["id"])
+        return ToolMessage(content='{"ok": true}', tool_call_id=request.tool_call["id"], name=request.tool_call["name"])
+
+    args = {"id": "1234-56-LR22"}
+    first = middleware.wrap_tool_call(FakeToolCallRequest("read_award_result", args, "call-a"), handler)
+    second = middleware.wrap_tool_call(FakeToolCallRequest("read_award_result", args, "call-b"), handler)
+    # Task-specific tools are never shared
+    middleware.wrap_tool_call(FakeToolCallRequest("get_plan", {"user_request": "x"}, "call-c"), handler)
+    middleware.wrap_tool_call(FakeToolCallRequest("get_plan", {"user_request": "x"}, "call-d"), handler)
+
+    assert executed == ["call-a", "call-c", "call-d"]
+    assert first.tool_call_id == "call-a"
+    assert second.tool_call_id == "call-b"
+    assert second.content == first.content
+
+    print("✓ Evidence middleware test passed!")
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_run_once()
+    test_failures_are_not_kept()
+    test_argument_order_does_not_matter()
+    test_middleware_reuses_result_for_other_agents()
@@ -0,0 +1,101 @@
+"""
+Test script for message-history compaction - digests of old tool outputs in long agent loops
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import json
+
+from langchain.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.middleware import HistoryCompactionMiddleware, expand_tool_output
+from app.utils.history_compaction import COMPACTED_PREFIX, compact_messages, digest_tool_output
+
+
+def make_history(steps=6, page_chars=4000):
+    messages = [HumanMessage(content="Investigate task H-07")]
+    for step in range(steps):
+        call_id = f"call-{step}"
+        args = {"tender_id": "1234-56-LR22", "row_id": 0, "start_page": step + 1, "end_page": step + 1}
+        messages.append(AIMessage(
+            content="",
+            tool_calls=[{"name": "read_buyer_attachment_doc", "args": args, "id": call_id}],
+        ))
+        messages.append(ToolMessage(
+            content=json.dumps({"text": f"--- Page {step + 1} ---\n" + "criterio " * (page_chars // 9), "success": True}),
+            tool_call_id=call_id,
+            name="read_buyer_attachment_doc",
+        ))
+    return messages
+
+
+class FakeModelRequest:
+    """Minimal ModelRequest stand-in with messages and override()"""
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    def override(self, **overrides):
+        return FakeModelRequest(overrides.get("messages", self.messages))
+
+
+def test_digest_keeps_reference_and_arguments():
+    """Digests name the tool, its arguments and the reference used to expand them."""
+    history = make_history(steps=1)
+    digest = digest_tool_output(history[2], history[1].tool_calls[0], max_chars=50)
+
+    assert digest.startswith(COMPACTED_PREFIX)
+    assert "ref=call-0" in digest and '"start_page": 1' in digest
+    assert '"success": true' in digest
+    assert "expand_tool_output(ref='call-0')" in digest
+
+    print("✓ Digest test passed!")
+
+
+def test_compaction_replaces_only_old_outputs():
+    """Below the threshold nothing changes; above it only old tool outputs are digested."""
+    history = make_history()
+
+    unchanged, count = compact_messages(history, threshold_tokens=1_000_000, keep_recent=2)
+    assert unchanged is history and count == 0
+
+    compacted, count = compact_messages(history, threshold_tokens=1000, keep_recent=2)
+    assert count == 4 and len(compacted) == len(history)
+    tool_outputs = [m for m in compacted if isinstance(m, ToolMessage)]
+    assert all(m.content.startswith(COMPACTED_PREFIX) for m in tool_outputs[:4])
+    assert tool_outputs[-1].content == history[-1].content
+    assert [m.tool_call_id for m in tool_outputs] == [f"call-{i}" for i in range(6)]
+
+    # Compacting again is a no-op for already compacted outputs
+    _, again = compact_messages(compacted, threshold_tokens=0, keep_recent=2)
+    assert again == 0
+
+    print("✓ Compaction test passed!")
+
+
+def test_middleware_sends_compacted_history_and_expands():
+    """The model sees digests while the state keeps the full outputs for expansion."""
+    history = make_history()
+    middleware = HistoryCompactionMiddleware(threshold_tokens=1000, keep_recent=1)
+    seen = []
+
+    middleware.wrap_model_call(FakeModelRequest(history), lambda request: seen.append(request.messages))
+
+    sent = [m for m in seen[0] if isinstance(m, ToolMessage)]
+    assert sum(m.content.startswith(COMPACTED_PREFIX) for m in sent) == 5
+    assert not history[2].content.startswith(COMPACTED_PREFIX)
+
+    expanded = expand_tool_output.func(ref="call-0", state={"messages": history})
+    assert expanded["content"] == history[2].content and expanded["tool"] == "read_buyer_attachment_doc"
+    assert "error" in expand_tool_output.func(ref="call-99", state={"messages": history})
+    assert middleware.tools == [expand_tool_output]
+
+    print("✓ Compaction middleware test passed!")
+
+
+if __name__ == "__main__":
+    test_digest_keeps_reference_and_arguments()
+    test_compaction_replaces_only_old_outputs()
+    test_middleware_sends_compacted_history_and_expands()
@@ -0,0 +1,175 @@
+"""
+Test script for InvestigationBudget - shared per-investigation resource limits
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import time
+
+from app.api import agent as agent_api
+from app.workflow import FraudDetectionWorkflow
+from app.utils.investigation_budget import (
+    InvestigationBudget,
+    CancellationToken,
+    InvestigationCancelledError,
+    register_budget,
+    unregister_budget,
+    cancel_investigation,
+)
+
+
+def test_budget_limits():
+    """Each resource exhausts the budget independently."""
+    budget = InvestigationBudget(max_tokens=1000, max_ocr_pages=10, max_requests=5, max_wall_time=600)
+    assert budget.exhausted_reason() is None
+
+    budget.charge_tokens(999)
+    assert budget.exhausted_reason() is None
+    budget.charge_tokens(1)
+    assert "token" in budget.exhausted_reason()
+
+    budget = InvestigationBudget(max_tokens=1000, max_ocr_pages=10, max_requests=5, max_wall_time=600)
+    budget.charge_ocr_pages(10)
+    assert "OCR" in budget.exhausted_reason()
+
+    budget = InvestigationBudget(max_tokens=1000, max_ocr_pages=10, max_requests=5, max_wall_time=600)
+    for _ in range(5):
+        budget.charge_request()
+    assert "request" in budget.exhausted_reason()
+
+    print("✓ Budget limits test passed!")
+
+
+def test_budget_report():
+    """The report exposes used/limit pairs for every resource."""
+    budget = InvestigationBudget(max_tokens=1000, max_ocr_pages=10, max_requests=5, max_wall_time=600)
+    budget.charge_tokens(250)
+    budget.charge_tokens(250)
+    budget.charge_ocr_pages(3)
+    budget.record_forced_finish()
+
+    report = budget.report()
+    assert report["tokens"] == {"used": 500, "limit": 1000}
+    assert report["ocr_pages"] == {"used": 3, "limit": 10}
+    assert report["requests"] == {"used": 0, "limit": 5}
+    assert report["llm_calls"] == 2
+    assert report["forced_finishes"] == 1
+    assert report["wall_time_seconds"]["limit"] == 600
+
+    print("✓ Budget report test passed!")
+
+
+def test_cancellation_token():
+    """Branch tokens fire on their own deadline or when the parent is cancelled."""
+    parent = CancellationToken()
+    branch = CancellationToken(parent=parent, timeout=0.05)
+    other_branch = CancellationToken(parent=parent)
+    assert branch.cancelled_reason() is None
+
+    time.sleep(0.1)
+    assert branch.cancelled_reason() == "deadline exceeded"
+    assert other_branch.cancelled_reason() is None
+    assert parent.cancelled_reason() is None
+
+    parent.cancel("cancelled by user")
+    assert other_branch.cancelled_reason() == "cancelled by user"
+    try:
+        other_branch.raise_if_cancelled()
+        assert False, "raise_if_cancelled should raise once cancelled"
+    except InvestigationCancelledError as e:
+        assert str(e) == "cancelled by user"
+
+    print("✓ Cancellation token test passed!")
+
+
+def test_cancel_investigation_registry():
+    """Only registered (running) investigations can be cancelled by session_id."""
+    budget = InvestigationBudget()
+    assert not cancel_investigation("session-test")
+
+    register_budget("session-test", budget)
+    assert cancel_investigation("session-test")
+    assert budget.cancelled_reason() == "cancelled by user"
+    assert budget.report()["cancelled"] == "cancelled by user"
+
+    unregister_budget("session-test")
+    assert not cancel_investigation("session-test")
+
+    print("✓ Cancel investigation registry test passed!")
+
+
+def test_streamed_investigation_can_be_cancelled():
+    """stream() registers its budget like run(), and unregisters it when the stream ends."""
+    workflow = FraudDetectionWorkflow()
+    budgets = []
+
+    class FakeGraph:
+        def stream(self, state):
+            budgets.append(state["budget"])
+            yield {"fetch_tender": {}}
+            yield {"summary": {}}
+
+    workflow.app = FakeGraph()
+    stream = workflow.stream("1234-56-LR22", session_id="session-stream")
+    next(stream)
+    assert cancel_investigation("session-stream")
+    assert budgets[0].cancelled_reason() == "cancelled by user"
+
+    list(stream)
+    assert not cancel_investigation("session-stream")
+
+    print("✓ Streamed investigation cancel test passed!")
+
+
+class FakeWorkflow:
+    """Workflow stand-in returning a fixed result"""
+
+    result = None
+
+    def run(self, tender_id, session_id):
+        return FakeWorkflow.result
+
+
+def run_fake_workflow(cancelled):
+    """Run run_workflow_sync with a fake workflow and record what happens to the log"""
+    calls = []
+    names = ["FraudDetectionWorkflow", "build_replay_snapshot", "delete_websocket_messages", "manager", "log_writer"]
+    originals = {name: getattr(agent_api, name) for name in names}
+    FakeWorkflow.result = {
+        "tasks_by_id": [],
+        "workflow_summary": "",
+        "budget_usage": {"cancelled": "cancelled by user"} if cancelled else {},
+    }
+    agent_api.FraudDetectionWorkflow = FakeWorkflow
+    agent_api.build_replay_snapshot = lambda tender_id: calls.append(("snapshot", tender_id))
+    agent_api.delete_websocket_messages = lambda tender_id: calls.append(("delete", tender_id))
+    agent_api.manager = type("FakeManager", (), {
+        "register_tender_id": lambda self, *args, **kwargs: None,
+        "publish": lambda self, session_id, message: calls.append(("publish", message["status"])),
+    })()
+    agent_api.log_writer = type("FakeWriter", (), {"flush": lambda self: True})()
+    try:
+        agent_api.run_workflow_sync("session-test", "1234-56-LR22")
+    finally:
+        for name, value in originals.items():
+            setattr(agent_api, name, value)
+    return calls
+
+
+def test_cancelled_run_is_not_replayable():
+    """A cancelled run drops its log instead of snapshotting it, so the tender can be investigated again."""
+    assert run_fake_workflow(cancelled=True) == [("publish", "cancelled"), ("delete", "1234-56-LR22")]
+    assert run_fake_workflow(cancelled=False) == [("publish", "completed"), ("snapshot", "1234-56-LR22")]
+
+    print("✓ Cancelled run replay test passed!")
+
+
+if __name__ == "__main__":
+    test_budget_limits()
+    test_budget_report()
+    test_cancellation_token()
+    test_cancel_investigation_registry()
+    test_streamed_investigation_can_be_cancelled()
+    test_cancelled_run_is_not_replayable()
@@ -0,0 +1,114 @@
+"""
+Test script for the LLM response cache - replays of identical model calls served from disk
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import tempfile
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.config import settings
+from app.utils.cache_manager import CacheManager
+from app.utils.llm_cache import LLMResponseCache, get_llm_cache, llm_cache_scope, normalize_prompt
+
+
+def make_cache():
+    return LLMResponseCache(ttl_seconds=3600, cache_manager=CacheManager(tempfile.mkdtemp()))
+
+
+def conversation(message_id, call_id):
+    return [
+        HumanMessage(content="Classify the tasks"),
+        AIMessage(
+            content="",
+            id=message_id,
+            tool_calls=[{"name": "read_award_result", "args": {"id": "1234-56-LR22"}, "id": call_id}],
+        ),
+        ToolMessage(content='{"ok": false}', tool_call_id=call_id, name="read_award_result"),
+    ]
+
+
+def test_normalization_ignores_run_specific_ids():
+    """Message ids and tool call ids do not change the key; content does."""
+    first = normalize_prompt(dumps(conversation("run-a", "call_abc")))
+    second = normalize_prompt(dumps(conversation("run-b", "call_xyz")))
+    assert first == second
+
+    changed = conversation("run-a", "call_abc")
+    changed[2] = ToolMessage(content='{"ok": true}', tool_call_id="call_abc", name="read_award_result")
+    assert normalize_prompt(dumps(changed)) != first
+
+    print("✓ Prompt normalization test passed!")
+
+
+def test_replay_is_served_from_cache():
+    """An identical call is answered from the cache without calling the model again."""
+    cache = make_cache()
+    model = FakeListChatModel(responses=["first answer", "second answer"], cache=cache)
+
+    with llm_cache_scope("1234-56-LR22"):
+        assert model.invoke(conversation("run-a", "call_1")).content == "first answer"
+        assert model.invoke(conversation("run-b", "call_2")).content == "first answer"
+    assert cache.hits == 1 and cache.misses == 1
+
+    # Another tender does not see the entry
+    with llm_cache_scope("9999-99-LR99"):
+        assert model.invoke(conversation("run-a", "call_1")).content == "second answer"
+
+    print("✓ Replay test passed!")
+
+
+def test_scope_can_be_cleared_per_tender():
+    """Clearing a tender's cache removes its LLM responses."""
+    cache = make_cache()
+    model = FakeListChatModel(responses=["answer"] * 3, cache=cache)
+
+    with llm_cache_scope("1234-56-LR22"):
+        model.invoke("hello")
+    assert list(cache.cache_manager.llm_dir.glob("1234-56-LR22_*"))
+
+    cache.cache_manager.clear_cache_for_tender("1234-56-LR22")
+    assert not list(cache.cache_manager.llm_dir.glob("1234-56-LR22_*"))
+
+    print("✓ Tender scope test passed!")
+
+
+def test_expired_entries_are_ignored():
+    """Entries older than the TTL are treated as misses."""
+    cache = make_cache()
+    model = FakeListChatModel(responses=["old", "new"], cache=cache)
+    model.invoke("hello")
+
+    cache.ttl_seconds = -1
+    assert model.invoke("hello").content == "new"
+
+    print("✓ TTL test passed!")
+
+
+def test_get_llm_cache_is_opt_in():
+    """The cache is only used when enabled and for low-temperature models."""
+    original = settings.llm_cache_enabled
+    try:
+        settings.llm_cache_enabled = False
+        assert get_llm_cache(0) is None
+
+        settings.llm_cache_enabled = True
+        assert isinstance(get_llm_cache(0), LLMResponseCache)
+        assert get_llm_cache(0.9) is None
+    finally:
+        settings.llm_cache_enabled = original
+
+    print("✓ Opt-in test passed!")
+
+
+if __name__ == "__main__":
+    test_normalization_ignores_run_specific_ids()
+    test_replay_is_served_from_cache()
+    test_scope_can_be_cleared_per_tender()
+    test_expired_entries_are_ignored()
+    test_get_llm_cache_is_opt_in()
@@ -0,0 +1,134 @@
+"""
+Test script for the shared LLM concurrency pool (AIMD limits, coordinated retries, fair queueing)
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import threading
+import time
+
+import httpx
+
+from app.utils import llm_pool
+from app.utils.llm_pool import LLMPool, PooledChatOpenAI, llm_pool_scope
+
+KEY = ("openrouter.ai", "test-model")
+
+
+def completion(content):
+    return {
+        "id": "gen-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+    }
+
+
+def test_limit_adapts_to_throttling():
+    """The limit halves on a 429/5xx (once per burst) and grows back additively."""
+    pool = LLMPool(max_in_flight=8, min_in_flight=1, backoff_seconds=0.01, limits={})
+
+    leases = [pool.acquire(KEY) for _ in range(3)]
+    pool.release(leases[0], "throttled")
+    pool.release(leases[1], "throttled")  # Same burst: no second decrease
+    pool.release(leases[2], "ok")
+    lane = pool._lane(KEY)
+    assert 4.0 < lane.limit < 4.5
+    assert pool.throttled == 2
+
+    # Paused lanes admit again once the backoff has passed
+    time.sleep(0.02)
+    for _ in range(40):
+        pool.release(pool.acquire(KEY), "ok")
+    assert lane.limit == 8
+
+    print("✓ AIMD limit test passed!")
+
+
+def test_slots_are_shared_fairly_between_investigations():
+    """A freed slot goes to the investigation that was served least recently."""
+    pool = LLMPool(max_in_flight=1, limits={})
+    order = []
+
+    held = pool.acquire(KEY, scope="big")
+
+    def call(scope, name):
+        lease = pool.acquire(KEY, scope=scope)
+        order.append(name)
+        pool.release(lease)
+
+    threads = []
+    for scope, name in [("big", "big-2"), ("big", "big-3"), ("small", "small-1")]:
+        thread = threading.Thread(target=call, args=(scope, name))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+
+    pool.release(held)
+    for thread in threads:
+        thread.join()
+
+    assert order == ["small-1", "big-2", "big-3"]
+    assert pool.waits == 3
+
+    print("✓ Fair queueing test passed!")
+
+
+def test_tokens_per_minute_limit_delays_calls():
+    """Calls wait while the last minute's tokens would go over the limit."""
+    pool = LLMPool(max_in_flight=4, tokens_per_minute=100, limits={})
+    pool.release(pool.acquire(KEY, tokens=80), tokens=80)
+
+    lane = pool._lane(KEY)
+    ticket = ("global", 0)
+    lane.waiting.append(ticket)
+    assert pool._admission_delay(lane, ticket, 50) > 59
+    assert pool._admission_delay(lane, ticket, 10) == 0
+
+    print("✓ Tokens per minute test passed!")
+
+
+def test_pooled_model_retries_rate_limited_calls():
+    """A 429 is retried by the pool after the Retry-After pause; usage replaces the estimate."""
+    responses = [
+        httpx.Response(429, headers={"retry-after": "0.05"}, json={"error": {"message": "rate limited"}}),
+        httpx.Response(200, json=completion("hello")),
+    ]
+    requests = []
+
+    def handler(request):
+        requests.append(time.monotonic())
+        return responses.pop(0)
+
+    pool = LLMPool(max_in_flight=4, limits={}, max_retries=2)
+    llm_pool._pool = pool
+    try:
+        model = PooledChatOpenAI(
+            model="test-model",
+            base_url="https://openrouter.ai/api/v1",
+            api_key="x",
+            http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+        with llm_pool_scope("session-1"):
+            reply = model.invoke("hi")
+    finally:
+        llm_pool._pool = None
+
+    assert reply.content == "hello"
+    assert len(requests) == 2 and requests[1] - requests[0] >= 0.05
+    lane = pool._lane(KEY)
+    assert pool.throttled == 1 and lane.active == 0
+    assert [tokens for _, tokens in lane.window][-1] == 25
+
+    print("✓ Pooled model retry test passed!")
+
+
+if __name__ == "__main__":
+    test_limit_adapts_to_throttling()
+    test_slots_are_shared_fairly_between_investigations()
+    test_tokens_per_minute_limit_delays_calls()
+    test_pooled_model_retries_rate_limited_calls()
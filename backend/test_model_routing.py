@@ -0,0 +1,122 @@
+"""
+Test script for model routing tiers per phase and task severity
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from types import SimpleNamespace
+
+from app.schemas import Anomaly, FraudDetectionOutput
+from app.utils.investigation_budget import InvestigationCancelledError
+from app.utils.model_routing import ModelRouter
+from app.workflow import FraudDetectionWorkflow
+
+MODELS = {"fast": "fast-model", "standard": "standard-model", "strong": "strong-model"}
+
+
+def detection_result(confidence, **kwargs):
+    return FraudDetectionOutput(
+        tender_id="1234-56-LR22",
+        is_fraudulent=True,
+        anomalies=[Anomaly(anomaly_name="a", description="d", evidence=["e"], confidence=confidence)],
+        investigation_summary="summary",
+        **kwargs,
+    )
+
+
+def test_router_maps_phases_and_severity_to_tiers():
+    """Ranking and low-severity tasks go to the fast tier; pinned phases keep their model."""
+    router = ModelRouter(enabled=True, models=MODELS, pinned={"summary": "pinned-model"})
+
+    assert router.tier_for("ranking") == "fast"
+    assert router.tier_for("investigation", severity="Bajo") == "fast"
+    assert router.tier_for("investigation", severity="Muy Alto") == "standard"
+    assert router.tier_for("investigation", severity=None) == "standard"
+    assert router.model_for("fast") == "fast-model"
+    assert router.model_for(router.tier_for("summary"), "summary") == "pinned-model"
+
+    disabled = ModelRouter(enabled=False, models=MODELS)
+    assert disabled.tier_for("ranking") == "standard"
+
+    print("✓ Tier mapping test passed!")
+
+
+def test_router_escalates_only_uncertain_results():
+    """Only low-confidence findings escalate, to the next tier with a different model."""
+    router = ModelRouter(enabled=True, models=MODELS, escalation_confidence=0.5)
+
+    assert router.should_escalate(detection_result(0.3)) is True
+    assert router.should_escalate(detection_result(0.9)) is False
+    assert router.should_escalate(detection_result(0.3, iteration_limit_reached=True)) is False
+    assert router.escalate("fast") == "standard"
+    assert router.escalate("strong") is None
+
+    same = ModelRouter(enabled=True, models=dict(MODELS, strong="standard-model"))
+    assert same.escalate("standard") is None
+
+    pinned = ModelRouter(enabled=True, models=MODELS, pinned={"investigation": "pinned-model"})
+    assert pinned.should_escalate(detection_result(0.3)) is False
+
+    print("✓ Escalation test passed!")
+
+
+def test_workflow_escalates_low_confidence_task():
+    """A low-severity task runs on the fast model and is re-run one tier up when uncertain."""
+    workflow = FraudDetectionWorkflow()
+    workflow.router = ModelRouter(enabled=True, models=MODELS, escalation_confidence=0.5)
+
+    models = []
+    results = iter([detection_result(0.2), detection_result(0.8)])
+    workflow._run_agent_with_deadline = lambda agent, *args, **kwargs: (
+        models.append(agent.model.model_name) or next(results)
+    )
+
+    update = workflow._investigate_task({
+        "task": {"id": 9, "code": "H-08", "name": "check", "severity": "Bajo", "subtasks": ["one"]},
+        "tender_context": SimpleNamespace(tender_id="1234-56-LR22"),
+        "investigation_id": "task_9",
+    })
+
+    assert models == ["fast-model", "standard-model"]
+    [task_result] = update["task_investigation_results"]
+    assert task_result.findings[0].confidence == 0.8
+
+    print("✓ Workflow escalation test passed!")
+
+
+def test_failed_escalation_keeps_first_result():
+    """If the stronger-tier run hits the branch deadline, the first complete result is kept."""
+    workflow = FraudDetectionWorkflow()
+    workflow.router = ModelRouter(enabled=True, models=MODELS, escalation_confidence=0.5)
+
+    calls = []
+
+    def run_agent(agent, *args, **kwargs):
+        calls.append(agent.model.model_name)
+        if len(calls) == 2:
+            raise InvestigationCancelledError("deadline exceeded")
+        return detection_result(0.2)
+
+    workflow._run_agent_with_deadline = run_agent
+
+    update = workflow._investigate_task({
+        "task": {"id": 9, "code": "H-08", "name": "check", "severity": "Bajo", "subtasks": ["one"]},
+        "tender_context": SimpleNamespace(tender_id="1234-56-LR22"),
+        "investigation_id": "task_9",
+    })
+
+    assert calls == ["fast-model", "standard-model"]
+    [task_result] = update["task_investigation_results"]
+    assert task_result.findings[0].confidence == 0.2
+    assert not task_result.timed_out and not task_result.cancelled
+
+    print("✓ Failed escalation test passed!")
+
+
+if __name__ == "__main__":
+    test_router_maps_phases_and_severity_to_tiers()
+    test_router_escalates_only_uncertain_results()
+    test_workflow_escalates_low_confidence_task()
+    test_failed_escalation_keeps_first_result()
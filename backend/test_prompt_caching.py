@@ -0,0 +1,131 @@
+"""
+Test script for shared prompt prefixes and OpenRouter prompt caching
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from langchain.agents.middleware import ModelRequest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.agents.fraud_detection_agent import FraudDetectionAgent
+from app.config import settings
+from app.investigation_tasks import INVESTIGATION_TASKS
+from app.middleware import PromptCachingMiddleware, supports_cache_control
+from app.schemas import RankingInput
+
+TENDER = RankingInput(
+    tender_id="1234-56-LR22",
+    tender_name="Servicio de aseo",
+    tender_date="2024-01-15",
+    bases="Bases administrativas " * 100,
+    bases_tecnicas="",
+    additional_context={"organization": "Municipalidad"},
+)
+DOCUMENTS = [{"name": "Bases.pdf"}, {"name": "Anexo técnico.pdf"}]
+
+
+def _request(system_prompt):
+    return ModelRequest(
+        model=None,
+        system_prompt=system_prompt,
+        messages=[HumanMessage(content="task")],
+        tool_choice=None,
+        tools=[],
+        response_format=None,
+        state={},
+        runtime=None,
+    )
+
+
+def test_tender_prompt_is_shared_and_task_prompt_is_not():
+    """The tender prefix is identical for every task; only the task suffix differs."""
+    prefix = FraudDetectionAgent.build_tender_prompt(TENDER, DOCUMENTS)
+    assert prefix == FraudDetectionAgent.build_tender_prompt(TENDER, DOCUMENTS)
+    assert "- Anexo técnico.pdf" in prefix
+    assert "Municipalidad" in prefix
+
+    first = FraudDetectionAgent.build_task_prompt(INVESTIGATION_TASKS[0])
+    second = FraudDetectionAgent.build_task_prompt(INVESTIGATION_TASKS[1])
+    assert first != second
+    assert "Task Code: H-01" in first
+    assert TENDER.tender_name not in first
+
+    print("✓ Shared prefix test passed!")
+
+
+def test_middleware_marks_prefix_as_cacheable():
+    """The shared prefix becomes a cache_control block; appended text stays outside it."""
+    prefix = FraudDetectionAgent.build_system_prompt() + FraudDetectionAgent.build_tender_prompt(TENDER, DOCUMENTS)
+    middleware = PromptCachingMiddleware(prefix)
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return None
+
+    middleware.wrap_model_call(_request(prefix + "\n\nBUDGET EXHAUSTED"), handler)
+    request = seen[-1]
+    assert request.system_prompt is None
+    system = request.messages[0]
+    assert isinstance(system, SystemMessage)
+    assert system.content[0] == {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}
+    assert system.content[1] == {"type": "text", "text": "\n\nBUDGET EXHAUSTED"}
+    assert request.messages[1].content == "task"
+
+    # A different system prompt is left untouched
+    middleware.wrap_model_call(_request("other prompt"), handler)
+    assert seen[-1].system_prompt == "other prompt"
+
+    print("✓ Cache control middleware test passed!")
+
+
+def test_cache_control_providers():
+    """Only providers that need explicit breakpoints get cache_control."""
+    assert supports_cache_control("google/gemini-2.5-flash-preview-09-2025:nitro")
+    assert supports_cache_control("anthropic/claude-sonnet-4.5")
+    assert not supports_cache_control("openai/gpt-4o-mini")
+
+    print("✓ Cache control provider test passed!")
+
+
+def test_system_prompt_lists_only_registered_tools():
+    """Tools behind a feature setting are only advertised when the setting registers them."""
+    assert "7. **record_subtask_result**" in FraudDetectionAgent.build_system_prompt()
+
+    original = settings.termination_policy_enabled
+    settings.termination_policy_enabled = False
+    try:
+        prompt = FraudDetectionAgent.build_system_prompt()
+    finally:
+        settings.termination_policy_enabled = original
+    assert "record_subtask_result" not in prompt
+    assert "7. **read_tool_output**" in prompt
+
+    original = settings.tool_output_governor_enabled
+    settings.tool_output_governor_enabled = False
+    try:
+        prompt = FraudDetectionAgent.build_system_prompt()
+    finally:
+        settings.tool_output_governor_enabled = original
+    assert "read_tool_output" not in prompt
+    assert "8. **expand_tool_output**" in prompt
+
+    original = settings.history_compaction_enabled
+    settings.history_compaction_enabled = False
+    try:
+        prompt = FraudDetectionAgent.build_system_prompt()
+    finally:
+        settings.history_compaction_enabled = original
+    assert "expand_tool_output" not in prompt
+    assert "Compacted History" not in prompt
+
+    print("✓ Registered tools prompt test passed!")
+
+
+if __name__ == "__main__":
+    test_tender_prompt_is_shared_and_task_prompt_is_not()
+    test_middleware_marks_prefix_as_cacheable()
+    test_cache_control_providers()
+    test_system_prompt_lists_only_registered_tools()
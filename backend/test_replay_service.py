@@ -0,0 +1,184 @@
+"""
+Test script for ReplaySession - streamed, paced replay with seek and skip to end
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import websocket_log_service
+from app.services.replay_service import ReplaySession
+from app.services.websocket_log_service import WebSocketLogCursor
+from app.utils.websocket_manager import manager
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+
+# One saved message per second of the original run, the last one being the result
+SAVED_MESSAGES = [
+    {
+        "type": "log",
+        "message": f"event {i}",
+        "_db_timestamp": (START + timedelta(seconds=i)).isoformat(),
+    }
+    for i in range(9)
+] + [
+    {
+        "type": "result",
+        "message": "Investigation completed",
+        "_db_timestamp": (START + timedelta(seconds=9)).isoformat(),
+    }
+]
+
+
+class ListCursor:
+    """Cursor over SAVED_MESSAGES, fetched in chunks of 3 like the database cursor"""
+
+    opened = []
+
+    def __init__(self, tender_id, offset=0):
+        ListCursor.opened.append(offset)
+        self._messages = [dict(message) for message in SAVED_MESSAGES[offset:]]
+
+    def fetch(self):
+        chunk, self._messages = self._messages[:3], self._messages[3:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class RecordingReplay(ReplaySession):
+    """Replay over SAVED_MESSAGES that records what it publishes"""
+
+    cursor_class = ListCursor
+
+    async def _load_snapshot(self):
+        # Exercise the raw-log path
+        return None
+
+    async def _load_final_message(self):
+        return {k: v for k, v in SAVED_MESSAGES[-1].items() if k != "_db_timestamp"}
+
+
+def _record_published(bus):
+    """Capture manager.publish calls for the test session"""
+    published = []
+    original = bus.publish
+
+    def publish(session_id, observation):
+        published.append(observation)
+
+    bus.publish = publish
+    return published, original
+
+
+def test_replay_streams_in_order_without_db_timestamps():
+    """Every saved message is replayed in order, paced by the original timing."""
+    published, original = _record_published(manager)
+    try:
+        ListCursor.opened = []
+        replay = RecordingReplay("replay-test", "1234-56-LR22", replay_speed=100.0)
+        asyncio.run(replay.run())
+    finally:
+        manager.publish = original
+
+    assert [event["message"] for event in published] == [m["message"] for m in SAVED_MESSAGES]
+    assert all("_db_timestamp" not in event for event in published)
+    assert ListCursor.opened == [0]
+
+    print("✓ Streaming replay test passed!")
+
+
+def test_seek_and_skip_to_end():
+    """Seek restarts the cursor at the new position; skip sends the result at once."""
+    published, original = _record_published(manager)
+
+    async def scenario():
+        # 1 second between messages at 1x: without controls this would take 9 seconds
+        replay = RecordingReplay("replay-test", "1234-56-LR22", replay_speed=1.0)
+        task = asyncio.create_task(replay.run())
+        await asyncio.sleep(0.05)
+        replay.seek(6)
+        await asyncio.sleep(0.05)
+        replay.skip_to_end()
+        await asyncio.wait_for(task, timeout=2.0)
+
+    try:
+        ListCursor.opened = []
+        asyncio.run(scenario())
+    finally:
+        manager.publish = original
+
+    assert ListCursor.opened == [0, 6]
+    assert [event["message"] for event in published] == [
+        "event 0",
+        "event 6",
+        "Investigation completed",
+    ]
+
+    print("✓ Seek and skip to end test passed!")
+
+
+class FakeLogSession:
+    """Session over SAVED_MESSAGES that evaluates the cursor's LIMIT/OFFSET/keyset query"""
+
+    open_sessions = 0
+    queries = []
+
+    def __init__(self):
+        FakeLogSession.open_sessions += 1
+
+    def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        sql, params = str(compiled), list(compiled.params.values())
+        FakeLogSession.queries.append(sql)
+        rows = [
+            (m, datetime.fromisoformat(m["_db_timestamp"]), log_id)
+            for log_id, m in enumerate(SAVED_MESSAGES, start=1)
+        ]
+        if ") > (" in sql:
+            rows = [row for row in rows if (row[1], row[2]) > (params[1], params[2])]
+        elif "OFFSET" in sql:
+            rows = rows[params[2]:]
+        limit = params[-2] if "OFFSET" in sql else params[-1]
+        return type("Result", (), {"all": lambda self: rows[:limit]})()
+
+    def close(self):
+        FakeLogSession.open_sessions -= 1
+
+
+def test_log_cursor_releases_connection_between_chunks():
+    """Each chunk is one short keyset query; no session stays open while the replay is paced."""
+    original = websocket_log_service.SessionLocal
+    websocket_log_service.SessionLocal = FakeLogSession
+    FakeLogSession.queries = []
+    try:
+        cursor = WebSocketLogCursor("1234-56-LR22", offset=2, chunk_size=3)
+        chunks = []
+        while chunk := cursor.fetch():
+            assert FakeLogSession.open_sessions == 0
+            chunks.append([message["message"] for message in chunk])
+        cursor.close()
+    finally:
+        websocket_log_service.SessionLocal = original
+
+    assert chunks == [
+        ["event 2", "event 3", "event 4"],
+        ["event 5", "event 6", "event 7"],
+        ["event 8", "Investigation completed"],
+    ]
+    assert "OFFSET" in FakeLogSession.queries[0]
+    assert all(") > (" in sql and "OFFSET" not in sql for sql in FakeLogSession.queries[1:])
+
+    print("✓ Keyset log cursor test passed!")
+
+
+if __name__ == "__main__":
+    test_replay_streams_in_order_without_db_timestamps()
+    test_seek_and_skip_to_end()
+    test_log_cursor_releases_connection_between_chunks()
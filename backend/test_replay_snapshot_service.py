@@ -0,0 +1,105 @@
+"""
+Test script for replay snapshots - compaction of finished investigation logs
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from datetime import datetime, timedelta
+
+from app.services.replay_snapshot_service import (
+    compact_messages,
+    encode_snapshot,
+    decode_snapshot,
+    SnapshotCursor,
+)
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _saved(seconds, **message):
+    """Build a saved message as returned by WebSocketLogCursor"""
+    message["_db_timestamp"] = (START + timedelta(seconds=seconds)).isoformat()
+    message["timestamp"] = message["_db_timestamp"]
+    return message
+
+
+SAVED_MESSAGES = [
+    _saved(0, type="log", message="Starting investigation"),
+    _saved(1, type="log", message="[H-01] Analizando con IA: Plazos..."),
+    _saved(2, type="log", message="[H-01] Tool completed: read_award_result"),
+    _saved(3, type="log", message="[H-01] Analizando con IA: Plazos..."),
+    _saved(4, type="log", message="[H-01] Analizando con IA: Plazos..."),
+    _saved(5.5, type="task_result", message="H-01 investigation complete", task_code="H-01"),
+    _saved(7.25, type="result", message="Investigation completed", status="completed"),
+]
+
+
+def test_compaction_collapses_consecutive_repeats_and_uses_relative_times():
+    """Consecutive repeated log lines are collapsed and times become offsets from the first event."""
+    snapshot = compact_messages(SAVED_MESSAGES)
+
+    assert snapshot["source_event_count"] == 7
+    messages = [event["message"] for _, event in snapshot["events"]]
+    assert messages == [
+        "Starting investigation",
+        "[H-01] Analizando con IA: Plazos...",
+        "[H-01] Tool completed: read_award_result",
+        "[H-01] Analizando con IA: Plazos...",
+        "H-01 investigation complete",
+        "Investigation completed",
+    ]
+    assert snapshot["events"][3][1]["repeated"] == 2
+    assert "repeated" not in snapshot["events"][1][1]
+    assert [offset for offset, _ in snapshot["events"]] == [0.0, 1.0, 2.0, 3.0, 5.5, 7.25]
+    assert all("timestamp" not in event for _, event in snapshot["events"])
+    assert snapshot["events"][snapshot["result_index"]][1]["type"] == "result"
+
+    print("✓ Compaction test passed!")
+
+
+def test_compaction_keeps_repeats_with_other_events_between():
+    """A message that appears again after other events is part of the timeline and is kept."""
+    snapshot = compact_messages([
+        _saved(0, type="log", message="[H-01] Leyendo contenido del documento..."),
+        _saved(1, type="log", message="[H-02] Analizando con IA"),
+        _saved(2, type="log", message="[H-01] Leyendo contenido del documento..."),
+        _saved(3, type="result", message="Investigation completed", status="completed"),
+    ])
+
+    messages = [event["message"] for _, event in snapshot["events"]]
+    assert messages.count("[H-01] Leyendo contenido del documento...") == 2
+    assert len(messages) == 4
+
+    print("✓ Non-consecutive repeats test passed!")
+
+
+def test_unfinished_investigation_has_no_snapshot():
+    """Logs without a final result are not compacted."""
+    assert compact_messages(SAVED_MESSAGES[:-1]) is None
+
+    print("✓ Unfinished investigation test passed!")
+
+
+def test_snapshot_round_trip_and_cursor():
+    """Snapshots survive compression and replay with rebuilt absolute timestamps."""
+    snapshot = decode_snapshot(encode_snapshot(compact_messages(SAVED_MESSAGES)))
+
+    cursor = SnapshotCursor(snapshot, offset=4, chunk_size=1)
+    first = cursor.fetch()
+    second = cursor.fetch()
+    assert cursor.fetch() == []
+
+    assert first[0]["message"] == "H-01 investigation complete"
+    assert first[0]["timestamp"] == (START + timedelta(seconds=5.5)).isoformat()
+    assert second[0]["type"] == "result"
+
+    print("✓ Snapshot round trip test passed!")
+
+
+if __name__ == "__main__":
+    test_compaction_collapses_consecutive_repeats_and_uses_relative_times()
+    test_compaction_keeps_repeats_with_other_events_between()
+    test_unfinished_investigation_has_no_snapshot()
+    test_snapshot_round_trip_and_cursor()
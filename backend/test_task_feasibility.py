@@ -0,0 +1,120 @@
+"""
+Test script for the rule-based task feasibility pre-ranker
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from types import SimpleNamespace
+
+from app import workflow as workflow_module
+from app.investigation_tasks import INVESTIGATION_TASKS
+from app.utils.task_feasibility import (
+    TenderFacts,
+    normalize_attachments,
+    classify_tasks,
+)
+
+ATTACHMENTS_TABLE = [
+    ["id", "file_name", "type", "description", "file_size", "uploaded_at"],
+    [0, "Bases Administrativas.pdf", "Anexo", "Bases administrativas", "1 Mb", "01-01-2024"],
+    [1, "Especificaciones Técnicas.pdf", "Anexo", "Requerimientos técnicos", "2 Mb", "01-01-2024"],
+    [2, "Contrato firmado.pdf", "Anexo", "Contrato", "1 Mb", "02-02-2024"],
+]
+
+
+def _codes(tasks):
+    return [task["code"] for task in tasks]
+
+
+def test_normalize_attachments_table():
+    """The header row is skipped and rows become dicts; None stays unknown."""
+    attachments = normalize_attachments(ATTACHMENTS_TABLE)
+    assert len(attachments) == 3
+    assert attachments[1]["name"] == "Especificaciones Técnicas.pdf"
+    assert normalize_attachments(None) is None
+
+    print("✓ Attachment normalization test passed!")
+
+
+def test_well_documented_awarded_tender_needs_no_llm():
+    """With bases, contract, award and criteria every task is decided locally."""
+    facts = TenderFacts(
+        attachments=normalize_attachments(ATTACHMENTS_TABLE),
+        awarded=True,
+        evaluation_criteria_count=3,
+        guarantees_count=1,
+    )
+    classification = classify_tasks(INVESTIGATION_TASKS, facts)
+
+    assert classification.ambiguous == []
+    assert classification.infeasible == []
+    assert _codes(classification.feasible) == _codes(INVESTIGATION_TASKS)
+
+    print("✓ Fully decided tender test passed!")
+
+
+def test_tender_without_documents_or_award():
+    """Without attachments or award, document tasks are infeasible and the rest ambiguous."""
+    facts = TenderFacts(attachments=[], awarded=False, evaluation_criteria_count=2)
+    classification = classify_tasks(INVESTIGATION_TASKS, facts)
+
+    infeasible = _codes(classification.infeasible)
+    assert "H-01" in infeasible and "H-02" in infeasible and "H-31" in infeasible
+    # Published criteria are enough for the criteria tasks
+    assert {"H-07", "H-08", "H-14", "H-06"} <= set(_codes(classification.feasible))
+    assert _codes(classification.ambiguous) == ["H-05"]
+    assert classification.reasons["H-31"] == "tender has not been awarded"
+
+    print("✓ Undocumented tender test passed!")
+
+
+def test_unknown_attachments_are_ambiguous():
+    """If the attachments could not be listed, document tasks are left to the LLM."""
+    facts = TenderFacts(attachments=None, awarded=True)
+    classification = classify_tasks(INVESTIGATION_TASKS, facts)
+
+    assert classification.infeasible == []
+    assert "H-01" in _codes(classification.ambiguous)
+    assert "H-31" in _codes(classification.ambiguous)
+
+    print("✓ Unknown attachments test passed!")
+
+
+def test_unlisted_attachments_stay_unknown_in_workflow():
+    """A scrape that finds no attachments table keeps the listing unknown, not empty."""
+    patched = {
+        "get_tender": lambda tender_id: _async_value(SimpleNamespace(name="Tender")),
+        "_read_buyer_attachments_table": lambda tender_id: None,
+        "fetch_and_extract_documents": lambda tender_id, **kwargs: [],
+        "build_ranking_input": lambda tender_response, documents: None,
+    }
+    originals = {name: getattr(workflow_module, name) for name in patched}
+    for name, value in patched.items():
+        setattr(workflow_module, name, value)
+    try:
+        workflow = workflow_module.FraudDetectionWorkflow.__new__(workflow_module.FraudDetectionWorkflow)
+        state = workflow._fetch_tender_data({"tender_id": "1234-56-LR22", "session_id": None, "errors": []})
+    finally:
+        for name, value in originals.items():
+            setattr(workflow_module, name, value)
+
+    assert state["errors"] == []
+    assert state["attachments"] is None
+    facts = TenderFacts(attachments=normalize_attachments(state["attachments"]), awarded=True)
+    assert classify_tasks(INVESTIGATION_TASKS, facts).infeasible == []
+
+    print("✓ Unlisted attachments workflow test passed!")
+
+
+async def _async_value(value):
+    return value
+
+
+if __name__ == "__main__":
+    test_normalize_attachments_table()
+    test_well_documented_awarded_tender_needs_no_llm()
+    test_tender_without_documents_or_award()
+    test_unknown_attachments_are_ambiguous()
+    test_unlisted_attachments_stay_unknown_in_workflow()
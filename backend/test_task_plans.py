@@ -0,0 +1,106 @@
+"""
+Test script for precomputed task plans and the cached get_plan fallback
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from types import SimpleNamespace
+
+from app.agents.fraud_detection_agent import FraudDetectionAgent
+from app.config import settings
+from app.investigation_tasks import INVESTIGATION_TASKS
+from app.tools import get_plan as get_plan_module
+from app.utils.task_plans import PlanCache, get_task_plan, tender_type
+
+
+class FakePlanAgent:
+    """PlanAgent stand-in that counts its LLM calls"""
+
+    calls = 0
+
+    def run(self, message):
+        FakePlanAgent.calls += 1
+        return SimpleNamespace(steps=[f"plan for: {message}"])
+
+
+def test_every_task_code_has_a_precomputed_plan():
+    """Plans cover every subtask and are part of the task prompt."""
+    for task in INVESTIGATION_TASKS:
+        steps = get_task_plan(task["code"])
+        assert len(steps) == len(task["subtasks"]) + 2
+        assert all(subtask in step for subtask, step in zip(task["subtasks"], steps[1:]))
+
+    task = INVESTIGATION_TASKS[0]
+    prompt = FraudDetectionAgent.build_task_prompt(task)
+    assert "INVESTIGATION PLAN:\n1. Locate the documents" in prompt
+    assert f"record_subtask_result(subtask={len(task['subtasks'])}" in prompt
+    assert "Available Documents" in prompt
+
+    print("✓ Precomputed plans test passed!")
+
+
+def test_plans_without_termination_policy_do_not_name_record_tool():
+    """record_subtask_result is only registered with the termination policy, so plans omit it otherwise."""
+    original = settings.termination_policy_enabled
+    settings.termination_policy_enabled = False
+    try:
+        prompt = FraudDetectionAgent.build_task_prompt(INVESTIGATION_TASKS[0])
+        steps = get_task_plan("H-07")
+    finally:
+        settings.termination_policy_enabled = original
+
+    assert "record_subtask_result" not in prompt
+    assert not any("record_subtask_result" in step for step in steps)
+
+    print("✓ Plans without termination policy test passed!")
+
+
+def test_get_plan_uses_precomputed_plan_or_cached_llm_plan():
+    """Known codes never call the PlanAgent; unknown ones call it once per (code, tender type)."""
+    original_agent, original_cache = get_plan_module.PlanAgent, get_plan_module.get_plan_cache
+    cache = PlanCache()
+    get_plan_module.PlanAgent = FakePlanAgent
+    get_plan_module.get_plan_cache = lambda: cache
+    try:
+        known = get_plan_module.get_plan.invoke({"user_request": "validate weights", "task_code": "H-07"})
+        assert known["steps"] == get_task_plan("H-07") and FakePlanAgent.calls == 0
+
+        first = get_plan_module.get_plan.invoke(
+            {"user_request": "check X", "task_code": "H-99", "tender_id": "1234-56-LR22"}
+        )
+        again = get_plan_module.get_plan.invoke(
+            {"user_request": "check X again", "task_code": "H-99", "tender_id": "9999-1-LR23"}
+        )
+        other_type = get_plan_module.get_plan.invoke(
+            {"user_request": "check X", "task_code": "H-99", "tender_id": "1234-56-LE22"}
+        )
+        assert first == again == {"steps": ["plan for: check X"], "total_steps": 1}
+        assert other_type["steps"] == ["plan for: check X"]
+        assert FakePlanAgent.calls == 2 and cache.hits == 1
+
+        get_plan_module.get_plan.invoke({"user_request": "something else"})
+        assert FakePlanAgent.calls == 3
+    finally:
+        get_plan_module.PlanAgent = original_agent
+        get_plan_module.get_plan_cache = original_cache
+
+    print("✓ get_plan cache test passed!")
+
+
+def test_tender_type_from_code():
+    """The tender type is the letter prefix of the code's last segment."""
+    assert tender_type("1234-56-LR22") == "LR"
+    assert tender_type("2345-7-l124") == "L"
+    assert tender_type("1234") == "unknown"
+    assert tender_type(None) == "unknown"
+
+    print("✓ Tender type test passed!")
+
+
+if __name__ == "__main__":
+    test_every_task_code_has_a_precomputed_plan()
+    test_plans_without_termination_policy_do_not_name_record_tool()
+    test_get_plan_uses_precomputed_plan_or_cached_llm_plan()
+    test_tender_type_from_code()
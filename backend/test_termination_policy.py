@@ -0,0 +1,126 @@
+"""
+Test script for the termination policy - early exit once subtasks are covered or progress stalls
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import json
+
+from langchain.messages import ToolMessage
+
+from app.middleware import TerminationPolicyMiddleware
+from app.utils.termination_policy import TerminationPolicy
+
+SUBTASKS = ["numeric weights", "scoring formulas", "price formula"]
+
+
+def tool_result(content):
+    return ToolMessage(content=json.dumps(content), tool_call_id="call", name="read_buyer_attachment_doc")
+
+
+class FakeModelRequest:
+    """Minimal ModelRequest stand-in with tools, system prompt and override()"""
+
+    def __init__(self, tools, system_prompt="SYSTEM"):
+        self.tools = tools
+        self.system_prompt = system_prompt
+
+    def override(self, **overrides):
+        return FakeModelRequest(
+            overrides.get("tools", self.tools), overrides.get("system_prompt", self.system_prompt)
+        )
+
+
+class FakeToolCallRequest:
+    """Minimal ToolCallRequest stand-in with just the tool call"""
+
+    def __init__(self, name, args):
+        self.tool_call = {"name": name, "args": args, "id": "call"}
+
+
+def test_policy_stops_when_all_subtasks_are_covered():
+    """Recording every subtask ends the investigation; invalid records are rejected."""
+    policy = TerminationPolicy(SUBTASKS)
+
+    assert policy.record_subtask(4, "pass", "x") is not None
+    assert policy.record_subtask(1, "maybe", "x") is not None
+    assert policy.record_subtask(1, "pass", "Bases p. 12") is None
+    assert policy.record_subtask(2, "fail", "No formula in the bases") is None
+    assert policy.stop_reason() is None
+    assert policy.coverage() == "2/3 subtasks covered; missing: 3"
+
+    policy.record_subtask(3, "not_verifiable", "Price formula annex not published")
+    assert "all 3 subtasks" in policy.stop_reason()
+
+    print("✓ Subtask coverage test passed!")
+
+
+def test_policy_stops_after_steps_without_new_evidence():
+    """Re-reading the same page or failed reads do not count as progress."""
+    policy = TerminationPolicy(SUBTASKS, max_steps_without_evidence=2)
+    args = {"tender_id": "1234-56-LR22", "row_id": 0, "start_page": 1, "end_page": 2}
+
+    policy.observe_tool_result("read_buyer_attachment_doc", args, tool_result({"success": True}))
+    policy.end_step()
+    assert policy.steps_without_evidence == 0
+
+    policy.observe_tool_result("read_buyer_attachment_doc", args, tool_result({"success": True}))
+    policy.end_step()
+    policy.observe_tool_result("get_plan", {"user_request": "plan"}, tool_result({"steps": []}))
+    policy.end_step()
+    assert policy.steps_without_evidence == 2
+    assert "2 steps without new evidence" in policy.stop_reason()
+
+    # A model call without tool results in between does not count as a step
+    policy.end_step()
+    assert policy.steps_without_evidence == 2
+
+    other = dict(args, start_page=3, end_page=4)
+    policy.observe_tool_result("read_buyer_attachment_doc", other, tool_result({"success": False}))
+    policy.end_step()
+    assert policy.steps_without_evidence == 3
+
+    policy.observe_tool_result("read_buyer_attachment_doc", other, tool_result({"success": True}))
+    policy.end_step()
+    assert policy.steps_without_evidence == 0 and policy.stop_reason() is None
+
+    print("✓ Evidence progress test passed!")
+
+
+def test_middleware_forces_structured_output():
+    """Once the policy says stop, the model is called without investigation tools."""
+    middleware = TerminationPolicyMiddleware(TerminationPolicy(SUBTASKS[:1]))
+    [record_subtask_result] = middleware.tools
+    seen = []
+
+    middleware.wrap_model_call(FakeModelRequest(["read_award_result"]), seen.append)
+    assert seen[-1].tools == ["read_award_result"]
+
+    assert "Error" in record_subtask_result.invoke({"subtask": 2, "verdict": "pass", "evidence": "x"})
+    reply = record_subtask_result.invoke({"subtask": 1, "verdict": "fail", "evidence": "Bases p. 3"})
+    assert reply == "Recorded. 1/1 subtasks covered"
+
+    middleware.wrap_model_call(FakeModelRequest(["read_award_result"]), seen.append)
+    assert seen[-1].tools == []
+    assert "INVESTIGATION COMPLETE" in seen[-1].system_prompt
+    assert middleware.forced_reason.startswith("all 1 subtasks")
+
+    # A new run starts from scratch
+    middleware.before_agent({}, None)
+    assert middleware.policy.missing_subtasks == [1] and middleware.forced_reason is None
+
+    result = middleware.wrap_tool_call(
+        FakeToolCallRequest("read_award_result", {"id": "1234-56-LR22"}),
+        lambda request: tool_result({"ok": True}),
+    )
+    assert result.name == "read_buyer_attachment_doc"
+
+    print("✓ Termination middleware test passed!")
+
+
+if __name__ == "__main__":
+    test_policy_stops_when_all_subtasks_are_covered()
+    test_policy_stops_after_steps_without_new_evidence()
+    test_middleware_forces_structured_output()
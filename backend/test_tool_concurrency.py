@@ -0,0 +1,85 @@
+"""
+Test script for concurrent tool calls within an agent step and per-tool concurrency limits
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import threading
+import time
+
+from langchain.agents import create_agent
+from langchain.messages import AIMessage, ToolMessage
+from langchain.tools import tool
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+
+from app.middleware import ToolConcurrencyMiddleware
+from app.utils.tool_concurrency import ToolConcurrencyLimiter
+
+
+class FakeToolCallingModel(FakeMessagesListChatModel):
+    """Scripted model that accepts tool binding"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def make_agent(limiter, calls):
+    peak = {"active": 0, "max": 0}
+    lock = threading.Lock()
+
+    @tool
+    def read_document(row_id: int) -> str:
+        """Read a document"""
+        with lock:
+            peak["active"] += 1
+            peak["max"] = max(peak["max"], peak["active"])
+        time.sleep(0.2)
+        with lock:
+            peak["active"] -= 1
+        return f"document {row_id}"
+
+    model = FakeToolCallingModel(responses=[
+        AIMessage(content="", tool_calls=[
+            {"name": "read_document", "args": {"row_id": i}, "id": f"call-{i}"} for i in range(calls)
+        ]),
+        AIMessage(content="done"),
+    ])
+    agent = create_agent(model=model, tools=[read_document], middleware=[ToolConcurrencyMiddleware(limiter)])
+    return agent, peak
+
+
+def test_step_tool_calls_run_concurrently():
+    """Independent tool calls of one step take about the time of the slowest one."""
+    agent, peak = make_agent(ToolConcurrencyLimiter(default_limit=8), calls=4)
+
+    start = time.monotonic()
+    result = agent.invoke({"messages": [{"role": "user", "content": "read"}]}, config={"max_concurrency": 4})
+    elapsed = time.monotonic() - start
+
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_messages] == [f"call-{i}" for i in range(4)]
+    assert peak["max"] == 4
+    assert elapsed < 0.6
+
+    print("✓ Concurrent tool calls test passed!")
+
+
+def test_per_tool_limit_bounds_concurrency():
+    """A tool's limit caps how many of its calls run at once."""
+    limiter = ToolConcurrencyLimiter(limits={"read_document": 2})
+    agent, peak = make_agent(limiter, calls=4)
+
+    agent.invoke({"messages": [{"role": "user", "content": "read"}]}, config={"max_concurrency": 4})
+
+    assert peak["max"] == 2
+    assert limiter.waits >= 1
+    assert limiter.active("read_document") == 0
+
+    print("✓ Per-tool limit test passed!")
+
+
+if __name__ == "__main__":
+    test_step_tool_calls_run_concurrently()
+    test_per_tool_limit_bounds_concurrency()
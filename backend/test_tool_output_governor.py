@@ -0,0 +1,141 @@
+"""
+Test script for the tool output governor - per-tool token budgets and paging of large results
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import json
+
+from langchain.messages import ToolMessage
+
+from app.middleware import ToolOutputGovernorMiddleware
+from app.utils.tool_output_governor import (
+    ToolOutputGovernor,
+    estimate_tokens,
+    parse_amount,
+    summarize_bids,
+    truncate_document_text,
+)
+
+
+class FakeToolCallRequest:
+    """Minimal ToolCallRequest stand-in with just the tool call"""
+
+    def __init__(self, name, args, call_id):
+        self.tool_call = {"name": name, "args": args, "id": call_id}
+
+
+def make_award_result(bids_per_item=40):
+    bids = [
+        {
+            "provider": f"Proveedor {i}",
+            "supplier_specifications": "Especificación detallada " * 20,
+            "unit_offer_amount": f"$ {100 + i}.000",
+            "awarded_quantity": "1" if i == 30 else "",
+            "total_net_awarded": "",
+            "status": "Adjudicada" if i == 30 else "No Adjudicada",
+        }
+        for i in range(bids_per_item)
+    ]
+    return {
+        "ok": True,
+        "attachments": [],
+        "overview": {"resuelvo": "Adjudicar"},
+        "award_act": {},
+        "award_result": [{"item_number": "1", "bids": bids}, {"item_number": "2", "bids": bids}],
+        "details": {},
+    }
+
+
+def test_parse_amount():
+    """Chilean amounts use dots for thousands and a comma for decimals."""
+    assert parse_amount("$ 1.234.567") == 1234567
+    assert parse_amount("CLP 12.500,5") == 12500.5
+    assert parse_amount("--") is None
+
+    print("✓ Amount parsing test passed!")
+
+
+def test_summarize_bids_keeps_awarded_and_lowest():
+    """The awarded bid is kept even when it is not among the lowest offers."""
+    bids = make_award_result()["award_result"][0]["bids"]
+    summary = summarize_bids(bids, top_n=3)
+
+    providers = [bid["provider"] for bid in summary["bids"]]
+    assert providers == ["Proveedor 0", "Proveedor 1", "Proveedor 2", "Proveedor 30"]
+    assert summary["bid_count"] == 40 and summary["omitted_bids"] == 36
+    assert summary["offer_min"] == 100000 and summary["offer_max"] == 139000
+
+    print("✓ Bid summary test passed!")
+
+
+def test_truncate_document_text_keeps_whole_pages():
+    """Document text is cut at page boundaries and the omitted pages are listed."""
+    text = "\n\n".join(f"--- Page {n} ---\n" + "x" * 100 for n in range(1, 6))
+    truncated = truncate_document_text(text, max_chars=250)
+
+    assert "--- Page 2 ---" in truncated["text"] and "--- Page 3 ---" not in truncated["text"]
+    assert truncated["omitted_pages"] == [3, 4, 5]
+
+    print("✓ Document truncation test passed!")
+
+
+def test_governor_summarizes_and_pages_large_results():
+    """Large award results are summarized within budget and can be read back by handle."""
+    governor = ToolOutputGovernor(top_bids=3)
+    content = json.dumps(make_award_result(), ensure_ascii=False)
+    assert estimate_tokens(content) > governor.budget_for("read_award_result")
+
+    governed = governor.govern("read_award_result", content)
+    data = json.loads(governed)
+    assert estimate_tokens(governed) <= governor.budget_for("read_award_result")
+    assert data["award_result"][0]["omitted_bids"] == 36
+    assert data["_output"]["truncated"] is True
+
+    handle, total_parts = data["_output"]["handle"], data["_output"]["total_parts"]
+    parts = [governor.page(handle, part)["content"] for part in range(1, total_parts + 1)]
+    assert "".join(parts) == content
+    assert "error" in governor.page(handle, total_parts + 1)
+    assert "error" in governor.page("out-999", 1)
+
+    small = json.dumps({"ok": False})
+    assert governor.govern("read_award_result", small) is small
+
+    print("✓ Governor summary and paging test passed!")
+
+
+def test_middleware_governs_tool_messages():
+    """The middleware replaces large results and registers the paging tool."""
+    governor = ToolOutputGovernor(budgets={"read_buyer_attachment_doc": 100})
+    middleware = ToolOutputGovernorMiddleware(governor)
+    text = "\n\n".join(f"--- Page {n} ---\n" + "texto " * 50 for n in range(1, 4))
+
+    def handler(request):
+        return ToolMessage(
+            content=json.dumps({"text": text, "success": True}),
+            tool_call_id=request.tool_call["id"],
+            name=request.tool_call["name"],
+        )
+
+    result = middleware.wrap_tool_call(
+        FakeToolCallRequest("read_buyer_attachment_doc", {"tender_id": "1", "row_id": 0}, "call-a"), handler
+    )
+    data = json.loads(result.content)
+    assert result.tool_call_id == "call-a"
+    assert data["success"] is True and data["_output"]["omitted_pages"] == [2, 3]
+
+    [read_tool_output] = middleware.tools
+    page = read_tool_output.invoke({"handle": data["_output"]["handle"], "part": 1})
+    assert page["tool"] == "read_buyer_attachment_doc" and page["part"] == 1
+
+    print("✓ Governor middleware test passed!")
+
+
+if __name__ == "__main__":
+    test_parse_amount()
+    test_summarize_bids_keeps_awarded_and_lowest()
+    test_truncate_document_text_keeps_whole_pages()
+    test_governor_summarizes_and_pages_large_results()
+    test_middleware_governs_tool_messages()
@@ -0,0 +1,221 @@
+"""
+Test script for the WebSocket event bus - thread-safe publish, slow-client policies and resumable streams
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import asyncio
+import threading
+
+from app.config import settings
+from app.utils.websocket_manager import ClientChannel, ConnectionManager
+
+
+class FakeWebSocket:
+    """Minimal WebSocket stand-in that records what it was sent"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def send_text(self, data):
+        self.sent.append(data)
+
+
+def test_merges_repeated_logs():
+    """A log identical to the last queued one is merged instead of queued."""
+    channel = ClientChannel(FakeWebSocket(), max_size=10)
+    channel.push({"type": "log", "message": "Downloading..."})
+    channel.push({"type": "log", "message": "Downloading..."})
+    channel.push({"type": "log", "message": "Done"})
+
+    assert [event["message"] for event in channel._events] == ["Downloading...", "Done"]
+    assert channel.merged == 1
+
+    print("✓ Merge policy test passed!")
+
+
+def test_drops_oldest_log_but_keeps_results():
+    """A full queue drops the oldest non-critical event and never drops results."""
+    channel = ClientChannel(FakeWebSocket(), max_size=3)
+    channel.push({"type": "task_result", "message": "H-01 done"})
+    channel.push({"type": "log", "message": "log 1"})
+    channel.push({"type": "log", "message": "log 2"})
+    channel.push({"type": "result", "message": "Investigation completed"})
+
+    types = [event["type"] for event in channel._events]
+    assert types == ["task_result", "log", "result"], types
+    assert channel._events[1]["message"] == "log 2"
+    assert channel.dropped == 1
+
+    print("✓ Drop policy test passed!")
+
+
+def test_publish_from_worker_thread():
+    """Events published from another thread are delivered in order on the server loop."""
+
+    async def scenario():
+        bus = ConnectionManager()
+        websocket = FakeWebSocket()
+        await bus.connect(websocket, "session-test")
+
+        def producer():
+            for i in range(5):
+                bus.publish("session-test", {"type": "log", "message": f"event {i}"})
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        thread.join()
+
+        for _ in range(50):
+            if len(websocket.sent) == 5:
+                break
+            await asyncio.sleep(0.01)
+
+        bus.disconnect(websocket, "session-test")
+        return websocket.sent
+
+    sent = asyncio.run(scenario())
+    assert [event["message"] for event in sent] == [f"event {i}" for i in range(5)]
+
+    print("✓ Thread-safe publish test passed!")
+
+
+def test_late_and_reconnecting_clients_resume():
+    """Clients get the buffered events they missed, starting after last_event_id."""
+
+    async def scenario():
+        bus = ConnectionManager()
+        bus.bind_loop(asyncio.get_running_loop())
+        for i in range(5):
+            bus.publish("session-test", {"type": "log", "message": f"event {i}"})
+
+        # Connects after the events were published
+        late = FakeWebSocket()
+        await bus.connect(late, "session-test")
+        # Reconnects after seeing the third event
+        resumed = FakeWebSocket()
+        await bus.connect(resumed, "session-test", last_event_id=bus.streams["session-test"].events[2]["event_id"])
+
+        await asyncio.sleep(0.05)
+        bus.disconnect(late, "session-test")
+        bus.disconnect(resumed, "session-test")
+        return late.sent, resumed.sent
+
+    late, resumed = asyncio.run(scenario())
+    first = late[0]["event_id"]
+    assert [event["event_id"] - first for event in late] == [0, 1, 2, 3, 4]
+    assert [event["message"] for event in resumed] == ["event 3", "event 4"]
+
+    print("✓ Resume from last event id test passed!")
+
+
+def test_long_poll_waits_for_new_events():
+    """Long-poll returns buffered events at once, or waits for the next one."""
+
+    async def scenario():
+        bus = ConnectionManager()
+        bus.bind_loop(asyncio.get_running_loop())
+        bus.publish("session-test", {"type": "log", "message": "first"})
+
+        immediate = await bus.wait_for_events("session-test", None, timeout=1.0)
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, bus.publish, "session-test", {"type": "log", "message": "second"})
+        first = immediate[0]["event_id"]
+        waited = await bus.wait_for_events("session-test", first, timeout=1.0)
+
+        empty = await bus.wait_for_events("session-test", first + 1, timeout=0.05)
+        return immediate, waited, empty
+
+    immediate, waited, empty = asyncio.run(scenario())
+    assert [event["message"] for event in immediate] == ["first"]
+    first = immediate[0]["event_id"]
+    assert [(event["event_id"], event["message"]) for event in waited] == [(first + 1, "second")]
+    assert empty == []
+
+    print("✓ Long-poll test passed!")
+
+
+def test_connected_session_keeps_event_ids_under_eviction():
+    """Busy other sessions never evict a connected session's buffer or restart its event_ids."""
+
+    async def scenario():
+        bus = ConnectionManager()
+        bus.bind_loop(asyncio.get_running_loop())
+        client = FakeWebSocket()
+        await bus.connect(client, "session-live")
+        bus.publish("session-live", {"type": "log", "message": "before"})
+        for i in range(5):
+            bus.publish(f"session-other-{i}", {"type": "log", "message": "other"})
+        bus.publish("session-live", {"type": "log", "message": "after"})
+
+        await asyncio.sleep(0.05)
+        bus.disconnect(client, "session-live")
+        return bus, client.sent
+
+    original = settings.websocket_buffered_sessions
+    settings.websocket_buffered_sessions = 2
+    try:
+        bus, sent = asyncio.run(scenario())
+    finally:
+        settings.websocket_buffered_sessions = original
+
+    first = sent[0]["event_id"]
+    assert [(event["event_id"] - first, event["message"]) for event in sent] == [(0, "before"), (1, "after")]
+    assert "session-live" in bus.streams and len(bus.streams) == 2
+    assert "session-other-0" not in bus.streams
+
+    print("✓ Event id eviction test passed!")
+
+
+def test_event_ids_keep_increasing_after_eviction():
+    """A session whose idle buffer was evicted keeps numbering above the ids its clients saw."""
+
+    async def scenario():
+        bus = ConnectionManager()
+        bus.bind_loop(asyncio.get_running_loop())
+        for i in range(3):
+            bus.publish("session-idle", {"type": "log", "message": f"old {i}"})
+        last_seen = bus.streams["session-idle"].events[-1]["event_id"]
+
+        # Other sessions evict the idle buffer, then the investigation publishes again
+        for i in range(3):
+            bus.publish(f"session-other-{i}", {"type": "log", "message": "other"})
+        assert "session-idle" not in bus.streams
+        bus.publish("session-idle", {"type": "log", "message": "new"})
+
+        client = FakeWebSocket()
+        await bus.connect(client, "session-idle", last_event_id=last_seen)
+        await asyncio.sleep(0.05)
+        bus.disconnect(client, "session-idle")
+        return last_seen, client.sent
+
+    original = settings.websocket_buffered_sessions
+    settings.websocket_buffered_sessions = 2
+    try:
+        last_seen, sent = asyncio.run(scenario())
+    finally:
+        settings.websocket_buffered_sessions = original
+
+    assert [event["message"] for event in sent] == ["new"]
+    assert sent[0]["event_id"] > last_seen
+
+    print("✓ Event ids after eviction test passed!")
+
+
+if __name__ == "__main__":
+    test_merges_repeated_logs()
+    test_drops_oldest_log_but_keeps_results()
+    test_publish_from_worker_thread()
+    test_late_and_reconnecting_clients_resume()
+    test_long_poll_waits_for_new_events()
+    test_connected_session_keeps_event_ids_under_eviction()
+    test_event_ids_keep_increasing_after_eviction()
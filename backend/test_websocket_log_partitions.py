@@ -0,0 +1,47 @@
+"""
+Test script for websocket_logs partition maintenance - monthly partitions and retention
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from datetime import date
+
+from app.services.websocket_log_partitions import partitions_to_create, partitions_past_retention
+
+
+def test_partitions_to_create():
+    """The current month and the next months are prepared, across year boundaries."""
+    partitions = partitions_to_create(date(2025, 11, 27), months_ahead=2)
+
+    assert partitions == [
+        ("websocket_logs_2025_11", date(2025, 11, 1), date(2025, 12, 1)),
+        ("websocket_logs_2025_12", date(2025, 12, 1), date(2026, 1, 1)),
+        ("websocket_logs_2026_01", date(2026, 1, 1), date(2026, 2, 1)),
+    ]
+
+    print("✓ Partitions to create test passed!")
+
+
+def test_partitions_past_retention():
+    """Only monthly partitions older than the retention window are detached."""
+    attached = [
+        "websocket_logs_2025_03",
+        "websocket_logs_default",
+        "websocket_logs_2025_05",
+        "websocket_logs_2025_06",
+        "websocket_logs_2025_11",
+        "websocket_logs_2026_01",
+    ]
+
+    # Keeping 6 months in November 2025 keeps June onwards
+    expired = partitions_past_retention(attached, date(2025, 11, 27), retention_months=6)
+    assert expired == ["websocket_logs_2025_03", "websocket_logs_2025_05"]
+
+    print("✓ Retention test passed!")
+
+
+if __name__ == "__main__":
+    test_partitions_to_create()
+    test_partitions_past_retention()
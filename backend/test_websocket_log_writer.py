@@ -0,0 +1,72 @@
+"""
+Test script for WebSocketLogWriter - batched write-behind persistence of websocket logs
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import time
+
+from app.services.websocket_log_service import WebSocketLogWriter
+
+
+class RecordingLogWriter(WebSocketLogWriter):
+    """Writer that records batches instead of inserting them into Postgres"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _write_batch(self, batch):
+        if batch:
+            self.batches.append(list(batch))
+
+
+def test_batches_by_size():
+    """Full batches are written as soon as they reach batch_size."""
+    writer = RecordingLogWriter(batch_size=10, flush_interval=60.0)
+    for i in range(25):
+        writer.enqueue("1234-56-LR22", {"type": "log", "message": f"event {i}"})
+
+    assert writer.flush(timeout=5.0)
+    sizes = [len(batch) for batch in writer.batches]
+    assert sizes == [10, 10, 5], sizes
+
+    # Rows keep their queue order and payload
+    messages = [row["message_data"]["message"] for batch in writer.batches for row in batch]
+    assert messages == [f"event {i}" for i in range(25)]
+
+    print("✓ Batch size test passed!")
+
+
+def test_flushes_on_interval():
+    """A partial batch is written once the flush interval elapses."""
+    writer = RecordingLogWriter(batch_size=100, flush_interval=0.1)
+    writer.enqueue("1234-56-LR22", {"type": "log", "message": "only event"})
+
+    time.sleep(0.5)
+    assert len(writer.batches) == 1
+    assert writer.batches[0][0]["tender_id"] == "1234-56-LR22"
+
+    print("✓ Flush interval test passed!")
+
+
+def test_drops_when_buffer_full():
+    """Enqueue never blocks: messages beyond the buffer size are dropped."""
+    writer = RecordingLogWriter(batch_size=1000, flush_interval=60.0, max_queue_size=5)
+    # Keep the writer thread from draining the queue while we fill it
+    writer._ensure_started = lambda: None
+
+    for i in range(8):
+        writer.enqueue("1234-56-LR22", {"type": "log", "message": f"event {i}"})
+
+    assert writer.dropped == 3
+
+    print("✓ Full buffer test passed!")
+
+
+if __name__ == "__main__":
+    test_batches_by_size()
+    test_flushes_on_interval()
+    test_drops_when_buffer_full()
@@ -1,18 +1,30 @@
 import "./TaskCard.css";
 import { TASKS_MAP } from "../pages/tasksMap";
 interface TaskEvent {
-  type: "log" | "result" | "error";
+  type: "log" | "result" | "error" | "task_result";
   message: string;
   timestamp: string;
 }
 
+export interface TaskFinding {
+  anomaly_name: string;
+  description: string;
+  evidence: string[];
+  confidence: number;
+  affected_documents: string[];
+}
+
 interface TaskResult {
   task_id: number;
   task_code: string;
   task_name: string;
   validation_passed: boolean;
   findings_count: number;
+  findings?: TaskFinding[];
   investigation_summary?: string;
+  timed_out?: boolean;
+  cancelled?: boolean;
+  incomplete?: boolean;
 }
 
 interface TaskCardProps {
@@ -178,9 +190,36 @@ export function TaskCard({
           >
             {result.validation_passed ? "✓ APROBADO" : "✗ FALLADO"}
           </div>
+          {(result.timed_out || result.cancelled || result.incomplete) && (
+            <div className="task-result-incomplete">
+              {result.timed_out
+                ? "⏱ Tiempo agotado"
+                : result.cancelled
+                  ? "Cancelada"
+                  : "Límite de pasos alcanzado"}{" "}
+              — resultado parcial
+            </div>
+          )}
           <div className="task-result-findings">
             Hallazgos: {result.findings_count}
           </div>
+          {result.findings && result.findings.length > 0 && (
+            <ul className="task-result-findings-list">
+              {result.findings.map((finding, index) => (
+                <li key={index} className="task-result-finding">
+                  <span className="task-result-finding-name">
+                    {finding.anomaly_name}
+                  </span>
+                  <span className="task-result-finding-confidence">
+                    {Math.round(finding.confidence * 100)}%
+                  </span>
+                  <div className="task-result-finding-description">
+                    {finding.description}
+                  </div>
+                </li>
+              ))}
+            </ul>
+          )}
           {result.investigation_summary && (
             <div className="task-result-summary">
               {result.investigation_summary}
@@ -15,6 +15,10 @@ export const config = {
 // Helper to construct API endpoints
 export const endpoints = {
   investigate: `${config.apiURL}/api/investigate`,
-  ws: (sessionId: string) => `${config.wsURL}/api/ws/${sessionId}`,
+  // Pass the last received event_id when reconnecting to resume the stream
+  ws: (sessionId: string, lastEventId?: number) =>
+    `${config.wsURL}/api/ws/${sessionId}` +
+    (lastEventId !== undefined ? `?last_event_id=${lastEventId}` : ''),
+  events: (sessionId: string) => `${config.apiURL}/api/events/${sessionId}`,
   wishlist: `${config.apiURL}/api/wishlist`,
 }
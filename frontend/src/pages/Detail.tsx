@@ -3,32 +3,41 @@ import { useEffect, useState, useRef } from "react";
 import "./Detail.css";
 import { endpoints } from "../config/api";
 import { TaskCard } from "../components/TaskCard";
+import type { TaskFinding } from "../components/TaskCard";
 import { Wishlist } from "../components/Wishlist";
 
 interface LogEvent {
-  type: "log" | "result" | "error";
+  event_id?: number;
+  type: "log" | "result" | "error" | "task_result";
   message: string;
   timestamp: string;
   task_code?: string;
+  task_result?: TaskResult;
   tasks_by_id?: any[];
   workflow_summary?: string;
   status?: string;
 }
 
+interface TaskResult {
+  task_id: number;
+  task_code: string;
+  task_name: string;
+  validation_passed: boolean;
+  findings_count: number;
+  findings?: TaskFinding[];
+  investigation_summary?: string;
+  timed_out?: boolean;
+  cancelled?: boolean;
+  incomplete?: boolean;
+}
+
 interface TaskInfo {
   code: string;
   id: number;
   name: string;
   severity: string;
   events: LogEvent[];
-  result?: {
-    task_id: number;
-    task_code: string;
-    task_name: string;
-    validation_passed: boolean;
-    findings_count: number;
-    investigation_summary?: string;
-  };
+  result?: TaskResult;
   status: "pending" | "in_progress" | "completed" | "failed";
 }
 
@@ -40,6 +49,10 @@ export function Detail() {
   const [tasks, setTasks] = useState<Map<string, TaskInfo>>(new Map());
   const [isInvestigating, setIsInvestigating] = useState(false);
   const wsRef = useRef<WebSocket | null>(null);
+  // Last event_id received, used to resume the stream after a disconnect
+  const lastEventIdRef = useRef<number | undefined>(undefined);
+  // Set once the final result arrives (or on unmount) to stop reconnecting
+  const streamDoneRef = useRef(false);
   const latestLogRef = useRef<HTMLDivElement | null>(null);
   const timelineContainerRef = useRef<HTMLDivElement | null>(null);
   const dialogRef = useRef<HTMLDialogElement | null>(null);
@@ -54,6 +67,7 @@ export function Detail() {
 
   useEffect(() => {
     return () => {
+      streamDoneRef.current = true;
       if (wsRef.current) {
         wsRef.current.close();
       }
@@ -84,10 +98,12 @@ export function Detail() {
 
   const connectWebSocket = (sessionId: string) => {
     if (wsRef.current) {
-      wsRef.current.close();
+      const previous = wsRef.current;
+      wsRef.current = null;
+      previous.close();
     }
 
-    const ws = new WebSocket(endpoints.ws(sessionId));
+    const ws = new WebSocket(endpoints.ws(sessionId, lastEventIdRef.current));
 
     ws.onopen = () => {
       console.log("WebSocket connected");
@@ -97,6 +113,17 @@ export function Detail() {
       const log: LogEvent = JSON.parse(event.data);
       console.log("Received log:", log);
 
+      // Skip events already received before a reconnect
+      if (log.event_id !== undefined) {
+        if (
+          lastEventIdRef.current !== undefined &&
+          log.event_id <= lastEventIdRef.current
+        ) {
+          return;
+        }
+        lastEventIdRef.current = log.event_id;
+      }
+
       setLogs((prev) => [...prev, log]);
 
       // Handle task-related events
@@ -123,8 +150,15 @@ export function Detail() {
           // Add event to task
           taskInfo.events = [...taskInfo.events, log];
 
-          // Check for completion message
-          if (
+          // Per-task result streamed as soon as its branch finishes
+          if (log.type === "task_result" && log.task_result) {
+            taskInfo.id = log.task_result.task_id;
+            taskInfo.name = log.task_result.task_name;
+            taskInfo.result = log.task_result;
+            taskInfo.status = log.task_result.validation_passed
+              ? "completed"
+              : "failed";
+          } else if (
             log.message.includes(
               "Unknown title investigation complete. Validation passed: True"
             )
@@ -158,21 +192,14 @@ export function Detail() {
         setTasks((prevTasks) => {
           const newTasks = new Map(prevTasks);
 
-          log.tasks_by_id!.forEach((taskResult: any) => {
+          log.tasks_by_id!.forEach((taskResult: TaskResult) => {
             const taskCode = taskResult.task_code;
             const taskInfo = newTasks.get(taskCode);
 
             if (taskInfo) {
               taskInfo.id = taskResult.task_id;
               taskInfo.name = taskResult.task_name;
-              taskInfo.result = {
-                task_id: taskResult.task_id,
-                task_code: taskResult.task_code,
-                task_name: taskResult.task_name,
-                validation_passed: taskResult.validation_passed,
-                findings_count: taskResult.findings_count,
-                investigation_summary: taskResult.investigation_summary,
-              };
+              taskInfo.result = taskResult;
               taskInfo.status = taskResult.validation_passed
                 ? "completed"
                 : "failed";
@@ -184,14 +211,7 @@ export function Detail() {
                 name: taskResult.task_name,
                 severity: "Unknown", // Not available in result
                 events: [],
-                result: {
-                  task_id: taskResult.task_id,
-                  task_code: taskResult.task_code,
-                  task_name: taskResult.task_name,
-                  validation_passed: taskResult.validation_passed,
-                  findings_count: taskResult.findings_count,
-                  investigation_summary: taskResult.investigation_summary,
-                },
+                result: taskResult,
                 status: taskResult.validation_passed ? "completed" : "failed",
               });
             }
@@ -203,6 +223,7 @@ export function Detail() {
 
       // If we receive a result or error, stop investigating
       if (log.type === "result" || log.type === "error") {
+        streamDoneRef.current = true;
         setIsInvestigating(false);
       }
     };
@@ -213,6 +234,14 @@ export function Detail() {
 
     ws.onclose = () => {
       console.log("WebSocket disconnected");
+      // Resume from the last event_id unless the investigation is over
+      if (!streamDoneRef.current && wsRef.current === ws) {
+        setTimeout(() => {
+          if (!streamDoneRef.current && wsRef.current === ws) {
+            connectWebSocket(sessionId);
+          }
+        }, 1000);
+      }
     };
 
     wsRef.current = ws;
@@ -223,6 +252,8 @@ export function Detail() {
     setIsInvestigating(true);
     setLogs([]);
     setTasks(new Map());
+    lastEventIdRef.current = undefined;
+    streamDoneRef.current = false;
 
     try {
       const response = await fetch(endpoints.investigate, {
@@ -367,6 +398,8 @@ export function Detail() {
                             ? ""
                             : log.type === "result"
                             ? "[RESULT]"
+                            : log.type === "task_result"
+                            ? "[TASK]"
                             : "[ERROR]"}
                         </span>
                         <span className="node-message">{log.message}</span>